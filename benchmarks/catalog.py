@@ -0,0 +1,86 @@
+"""Time radius and text lookups in a `StoreCatalog` against a get_items call.
+
+The catalog holds `--items` items spread over a 200 km wide region. The
+call goes to the local stub server, so it has no network latency at all.
+
+    python benchmarks/catalog.py --items 20000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.stub_server import StubServer, fake_item  # noqa: E402
+from tgtg import TgtgClient  # noqa: E402
+from tgtg.catalog import StoreCatalog, distance  # noqa: E402
+
+CENTER = 37.88, -4.78
+
+
+def spread(item, rng):
+    location = item["store"]["store_location"]["location"]
+    location["latitude"] = CENTER[0] + rng.uniform(-0.9, 0.9)
+    location["longitude"] = CENTER[1] + rng.uniform(-1.1, 1.1)
+    return item
+
+
+def per_call(function, runs):
+    function()
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    items = [spread(fake_item(index, rng), rng) for index in range(args.items)]
+    catalog = StoreCatalog()
+    catalog.add(items)
+    locations = [(item["store"]["store_location"]["location"], item) for item in items]
+
+    def full_scan(radius):
+        return [
+            item
+            for location, item in locations
+            if distance(*CENTER, location["latitude"], location["longitude"]) <= radius
+        ]
+
+    for radius in (1, 5, 21):
+        found = len(catalog.nearby(*CENTER, radius))
+        print(
+            f"nearby {radius:>2} km ({found:>4} items) "
+            f"{per_call(lambda: catalog.nearby(*CENTER, radius), args.runs):9.0f} us, "
+            f"full scan {per_call(lambda: full_scan(radius), 5):9.0f} us"
+        )
+    print(
+        f"search in 5 km       "
+        f"{per_call(lambda: catalog.search('store 1', *CENTER, 5), args.runs):9.0f} us"
+    )
+
+    with StubServer(catalog_size=20) as server:
+        client = TgtgClient(
+            url=server.url,
+            user_agent="test",
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            last_time_token_refreshed=datetime.datetime.now(),
+        )
+        print(
+            f"get_items, local stub {per_call(lambda: client.get_items(page_size=20), 50):9.0f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Decode a large `get_items` response with each available codec.
+
+Times the full response handling of `TgtgClient` (status check, decode,
+parse) and the encoding of a request body.
+
+    python benchmarks/codec.py
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.constants import make_item  # noqa: E402
+from tgtg import TgtgClient, _parse_items  # noqa: E402
+from tgtg.codec import JsonCodec, OrjsonCodec, orjson  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    codecs = [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    content = JsonCodec().dumps({"items": [make_item(i) for i in range(args.items)]})
+    payload = {"origin": {"latitude": 1.0, "longitude": 2.0}, "radius": 30}
+    print(f"get_items response: {args.items} items, {len(content) / 1024:.0f} KiB")
+
+    for codec in codecs:
+        client = TgtgClient(user_agent="benchmark", codec=codec)
+        decode = timeit.timeit(
+            lambda: client._handle_response(200, content, _parse_items),
+            number=args.repeat,
+        )
+        encode = timeit.timeit(lambda: client._encode(payload), number=10000)
+        print(
+            f"{codec.name:<8} decode {decode / args.repeat * 1000:7.2f} ms"
+            f"  encode {encode / 10000 * 1e6:5.2f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare printing every favorite on each poll with printing snapshot changes.
+
+Each poll sees `--favorites` items, of which `--changes` changed their stock.
+Reports the CPU time spent and the output written per poll.
+
+    python benchmarks/favorites.py --favorites 500
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.stub_server import fake_item  # noqa: E402
+from tgtg.favorites import FavoritesSnapshot  # noqa: E402
+
+
+def print_everything(polls, output):
+    # what show_favorites.py does
+    for favorites in polls:
+        for store in favorites:
+            print("DEBUG: Store object:", store, file=output)
+            display_name = store.get("display_name", "Unknown Store")
+            store_id = store.get("store_id", "Unknown ID")
+            print(f"- {display_name} (Store ID: {store_id})", file=output)
+
+
+def print_changes(polls, output):
+    snapshot = FavoritesSnapshot()
+    for favorites in polls:
+        for event in snapshot.update(favorites):
+            print(event, file=output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--favorites", type=int, default=500)
+    parser.add_argument("--changes", type=int, default=2)
+    parser.add_argument("--polls", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    favorites = [fake_item(index, rng) for index in range(args.favorites)]
+    polls = []
+    for _ in range(args.polls):
+        favorites = list(favorites)
+        for index in rng.sample(range(args.favorites), args.changes):
+            favorites[index] = dict(favorites[index], items_available=rng.randint(0, 5))
+        polls.append(favorites)
+
+    for name, run in (
+        ("print everything", print_everything),
+        ("print changes", print_changes),
+    ):
+        output = io.StringIO()
+        start = time.process_time()
+        run(polls, output)
+        elapsed = (time.process_time() - start) / args.polls
+        size = len(output.getvalue()) / args.polls
+        print(f"{name:<18} {elapsed * 1e6:9.0f} us/poll  {size / 1024:9.1f} KiB/poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Memory held by the 5000 items of a response, as plain dicts and as models.
+
+The baseline is what `TgtgClient` returns without models: the decoded dicts.
+With `models=True`, list endpoints build each `Item` from its JSON text and
+keep that text instead of the dict until `raw` or a nested model is read.
+
+python benchmarks/models.py
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.constants import make_item  # noqa: E402
+from tgtg import _decode_models, _parse_items  # noqa: E402
+from tgtg.models import Item  # noqa: E402
+
+KEYS = ("items",)
+
+
+def raw_dicts(content):
+    return _parse_items(json.loads(content))
+
+
+def models(content):
+    return _parse_items(_decode_models(content, KEYS, Item))
+
+
+def models_fields_read(content):
+    items = models(content)
+    for item in items:
+        item.item_id, item.display_name, item.items_available
+    return items
+
+
+def models_nested_read(content):
+    items = models(content)
+    for item in items:
+        item.store, item.price, item.pickup_interval.start
+    return items
+
+
+def measure(build, content):
+    gc.collect()
+    tracemalloc.start()
+    result = build(content)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def best_time(build, content, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        build(content)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    args = parser.parse_args()
+
+    content = json.dumps({"items": [make_item(i) for i in range(args.items)]}).encode()
+    print(f"response body {len(content) / 1024:.0f} KiB, {args.items} items")
+    baseline = measure(raw_dicts, content)
+    for name, build in (
+        ("dicts (models=False)", raw_dicts),
+        ("Item, untouched", models),
+        ("Item, top-level fields read", models_fields_read),
+        ("Item, nested fields read", models_nested_read),
+    ):
+        size = measure(build, content)
+        elapsed = best_time(build, content)
+        print(
+            f"{name:<28} {size / 1024:8.0f} KiB  {size / args.items:6.0f} B per item  "
+            f"{100 * (size - baseline) / baseline:+6.1f}% vs the dicts  "
+            f"{elapsed * 1000:5.0f} ms to build"
+        )
+
+
+if __name__ == "__main__":
+    main()
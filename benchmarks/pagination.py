@@ -0,0 +1,86 @@
+"""Compare ways of reading a 50-page order history from the local stub server.
+
+Every page answers after `--latency` seconds and each order costs
+`--work` seconds to process, like a caller doing something with it.
+
+    python benchmarks/pagination.py
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.stub_server import StubServer  # noqa: E402
+from tgtg import INACTIVE_ORDER_ENDPOINT, TgtgClient  # noqa: E402
+
+
+def history(pages, page_size):
+    def inactive(path, body):
+        page = body["paging"]["page"]
+        orders = [
+            {"order_id": f"{page}-{index}", "state": "REDEEMED", "padding": "x" * 500}
+            for index in range(page_size)
+        ]
+        return 200, {"orders": orders, "has_more": page + 1 < pages}, {}
+
+    return inactive
+
+
+def manual_loop(client, page_size, work):
+    page = 0
+    while True:
+        inactive = client.get_inactive(page=page, page_size=page_size)
+        for _ in inactive["orders"]:
+            time.sleep(work)
+        if not inactive["has_more"]:
+            return
+        page += 1
+
+
+def iterator(prefetch):
+    def run(client, page_size, work):
+        for _ in client.iter_inactive(page_size=page_size, prefetch=prefetch):
+            time.sleep(work)
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--work", type=float, default=0.001)
+    args = parser.parse_args()
+
+    routes = {INACTIVE_ORDER_ENDPOINT: history(args.pages, args.page_size)}
+    with StubServer(routes, latency=args.latency) as server:
+        client = TgtgClient(
+            url=server.url,
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            user_agent="benchmark",
+            last_time_token_refreshed=datetime.datetime.now(),
+        )
+        for name, run in (
+            ("manual loop", manual_loop),
+            ("iter_inactive", iterator(prefetch=False)),
+            ("iter_inactive(prefetch)", iterator(prefetch=True)),
+        ):
+            tracemalloc.start()
+            start = time.perf_counter()
+            run(client, args.page_size, args.work)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<24} {elapsed:6.2f} s  peak {peak / 1024:7.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
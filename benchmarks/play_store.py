@@ -0,0 +1,83 @@
+"""Compare the old and the streaming scan of the Play Store page for the version.
+
+    python benchmarks/play_store.py                  # on a synthetic page
+    python benchmarks/play_store.py --html page.html # on pages saved from the Play Store
+
+The old scan ran a regex over the whole page and decoded the whole ds:5 data.
+The streaming one reads the page in 64 KiB chunks, stops after the ds:5 data
+and decodes only what comes before the version.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.play_store import play_store_page  # noqa: E402
+from tgtg.google_play_scraper import (  # noqa: E402
+    CHUNK_SIZE,
+    RE_SCRIPT,
+    VERSION_PATH,
+    find_apk_version,
+)
+
+
+def full_scan(page):
+    data = json.loads(RE_SCRIPT.search(page).group(1))
+    for index in VERSION_PATH:
+        data = data[index]
+    return data, len(page)
+
+
+def streaming_scan(page):
+    read = 0
+
+    def chunks():
+        nonlocal read
+        for start in range(0, len(page), CHUNK_SIZE):
+            read = start + CHUNK_SIZE
+            yield page[start:read]
+
+    return find_apk_version(chunks()), min(read, len(page))
+
+
+def measure(scan, page, runs):
+    version, read = scan(page)
+    start = time.perf_counter()
+    for _ in range(runs):
+        scan(page)
+    elapsed = (time.perf_counter() - start) / runs
+    tracemalloc.start()
+    scan(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return version, elapsed, read, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--html", nargs="*", help="saved Play Store pages")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    pages = {"synthetic": play_store_page("24.11.0")}
+    for path in args.html or ():
+        with open(path, encoding="utf-8") as html_file:
+            pages[os.path.basename(path)] = html_file.read()
+
+    for name, page in pages.items():
+        print(f"{name}: {len(page) / 1024:.0f} KiB")
+        for scan_name, scan in (("full", full_scan), ("streaming", streaming_scan)):
+            version, elapsed, read, peak = measure(scan, page, args.runs)
+            print(
+                f"  {scan_name:<10} {version}  {elapsed * 1000:6.2f} ms  "
+                f"read {read / 1024:5.0f} KiB  peak {peak / 1024:6.0f} KiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
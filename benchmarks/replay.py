@@ -0,0 +1,79 @@
+"""Time a recorded session replayed at full speed and with its original timing.
+
+    python benchmarks/replay.py                        # records one from the stub server
+    python benchmarks/replay.py --cassette real.json   # replays a session you recorded
+
+A session is `get_items`, `get_favorites` and the whole `iter_inactive`
+history. Record one against the real API with `tgtg.cassette.record` to
+benchmark on real-sized payloads without touching the network again.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.stub_server import StubServer  # noqa: E402
+from tgtg import BASE_URL, TgtgClient  # noqa: E402
+from tgtg.cassette import record, replay  # noqa: E402
+
+
+def client(url=BASE_URL):
+    return TgtgClient(
+        url=url,
+        access_token="access_token",
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="benchmark",
+    )
+
+
+def session(client, page_size):
+    client.get_items(page_size=page_size)
+    client.get_favorites(page_size=page_size)
+    for _ in client.iter_inactive(page_size=page_size):
+        pass
+
+
+def record_stub(path, page_size, latency):
+    with StubServer(
+        latency=latency, catalog_size=page_size, history_size=page_size * 5, seed=1
+    ) as server:
+        recorded = client(server.url)
+        with record(recorded, path):
+            session(recorded, page_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cassette", help="recorded session, default: record one")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.cassette
+        if path is None:
+            path = os.path.join(directory, "session.json")
+            record_stub(path, args.page_size, args.latency)
+        print(f"cassette {os.path.getsize(path) / 1024:.0f} KiB")
+
+        for name, realtime, runs in (
+            ("full speed", False, args.runs),
+            ("original timing", True, 1),
+        ):
+            replayed = client()
+            with replay(replayed, path, realtime=realtime):
+                start = time.perf_counter()
+                for _ in range(runs):
+                    session(replayed, args.page_size)
+                elapsed = (time.perf_counter() - start) / runs
+            print(f"{name:<16} {elapsed * 1000:8.1f} ms per session")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Measure the client-side CPU and allocation cost of one API call.
+
+The HTTP round-trip is replaced by an in-process adapter answering a canned
+response, so only the work done by `TgtgClient` and `requests` is measured.
+
+    python benchmarks/request_overhead.py
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+import requests
+from requests.adapters import BaseAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tgtg import TgtgClient  # noqa: E402
+
+
+class CannedAdapter(BaseAdapter):
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = self.body
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def make_client():
+    client = TgtgClient(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="TGTG/24.11.0 Dalvik/2.1.0 (Linux; U; Android 9; Nexus 5)",
+        last_time_token_refreshed=datetime.datetime.now(),
+    )
+    client.session.mount("https://", CannedAdapter(b'{"items": [], "orders": []}'))
+    return client
+
+
+def measure(name, call, runs):
+    for _ in range(min(runs, 1000)):
+        call()
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        call()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(1000):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    print(
+        f"{name:<14} {elapsed / runs * 1e6:9.2f} us/call "
+        f"{sum(peaks) / len(peaks):10.0f} B peak allocated/call"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20_000)
+    args = parser.parse_args()
+
+    client = make_client()
+    measure("_headers", lambda: client._headers, args.runs * 10)
+    measure("get_items", client.get_items, args.runs)
+    measure("get_active", client.get_active, args.runs)
+    measure("get_inactive", client.get_inactive, args.runs)
+
+
+if __name__ == "__main__":
+    main()
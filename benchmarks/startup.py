@@ -0,0 +1,78 @@
+"""Measure `TgtgClient()` construction time with a cold and a warm apk version cache.
+
+python benchmarks/startup.py             # cold lookups hit the real Play Store
+python benchmarks/startup.py --local 0.8  # serve a fake Play Store page locally,
+                                          # answering after 0.8 seconds
+"""
+
+import argparse
+import http.server
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tgtg import TgtgClient, google_play_scraper  # noqa: E402
+
+TOKENS = {"access_token": "a", "refresh_token": "r", "cookie": "c"}
+
+
+def fake_play_store(latency):
+    data = [None, [None, None, [None] * 140 + [[[["99.0.0"]]]]]]
+    page = (
+        "<html>" + "<div>padding</div>" * 50_000 + "<script>AF_initDataCallback("
+        f"{{key: 'ds:5', hash: '7', data:{json.dumps(data)}, sideChannel: {{}}}});"
+        "</script></html>"
+    ).encode()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/"
+
+
+def construct(cache_dir):
+    os.environ["TGTG_CACHE_DIR"] = cache_dir
+    start = time.perf_counter()
+    TgtgClient(**TOKENS)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--local", type=float, metavar="LATENCY", default=None)
+    args = parser.parse_args()
+
+    if args.local is not None:
+        google_play_scraper.PLAY_STORE_URL = fake_play_store(args.local)
+
+    cold = [construct(tempfile.mkdtemp()) for _ in range(args.runs)]
+    warm_dir = tempfile.mkdtemp()
+    construct(warm_dir)
+    warm = [construct(warm_dir) for _ in range(args.runs)]
+
+    for name, timings in (("cold cache", cold), ("warm cache", warm)):
+        print(
+            f"{name}: median {statistics.median(timings) * 1000:.2f} ms, "
+            f"max {max(timings) * 1000:.2f} ms over {args.runs} runs"
+        )
+
+
+if __name__ == "__main__":
+    main()
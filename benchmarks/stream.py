@@ -0,0 +1,95 @@
+"""Compare `get_items` with `get_items(stream=True)` on large pages.
+
+Serves one page of `--page-size` items at `--bandwidth` bytes per second and
+reports the time until the first item is available, the total time and the
+peak memory allocated by the client while reading the page.
+
+    python benchmarks/stream.py --page-size 2000
+"""
+
+import argparse
+import datetime
+import http.server
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tests.stub_server import fake_item  # noqa: E402
+from tgtg import TgtgClient  # noqa: E402
+
+SLICE = 16 * 1024
+
+
+def serve(body, bandwidth):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            view = memoryview(body)
+            for start in range(0, len(body), SLICE):
+                self.wfile.write(view[start:][:SLICE])
+                time.sleep(SLICE / bandwidth)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def decoded(client, page_size):
+    return iter(client.get_items(page_size=page_size))
+
+
+def streamed(client, page_size):
+    return client.get_items(page_size=page_size, stream=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page-size", type=int, default=2000)
+    parser.add_argument("--bandwidth", type=float, default=20e6)
+    args = parser.parse_args()
+
+    items = [fake_item(index) for index in range(args.page_size)]
+    body = json.dumps({"items": items}).encode()
+    del items
+    server = serve(body, args.bandwidth)
+    client = TgtgClient(
+        url=f"http://127.0.0.1:{server.server_port}/api/",
+        access_token="access_token",
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="benchmark",
+        last_time_token_refreshed=datetime.datetime.now(),
+    )
+    print(f"{args.page_size} items, {len(body) / 1024:.0f} KiB")
+    for name, read in (("get_items", decoded), ("stream=True", streamed)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        items = read(client, args.page_size)
+        next(items)
+        first = time.perf_counter() - start
+        # items are dropped as they are read, like a caller processing them
+        sum(1 for _ in items)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            f"{name:<12} first item {first * 1000:7.1f} ms  "
+            f"all {elapsed * 1000:7.1f} ms  peak {peak / 1024:8.0f} KiB"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Run every client benchmark and save the results as JSON.
+
+    python benchmarks/suite.py                       # writes benchmarks/results/<commit>.json
+    python benchmarks/suite.py --compare old.json    # also prints the change against old.json
+
+Measures client construction, the client-side overhead of a call (headers,
+URL, JSON encoding and decoding, on a canned response) and the sustained
+read throughput against the local stub server, sequential, threaded and
+async. Nothing goes to the real API.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from request_overhead import CannedAdapter  # noqa: E402
+
+from tests.stub_server import StubServer  # noqa: E402
+from tgtg import API_ITEM_ENDPOINT, BASE_URL, TgtgClient, _join_url  # noqa: E402
+from tgtg.codec import default_codec  # noqa: E402
+
+TOKENS = {
+    "access_token": "access_token",
+    "refresh_token": "refresh_token",
+    "cookie": "cookie",
+}
+USER_AGENT = "TGTG/24.11.0 Dalvik/2.1.0 (Linux; U; Android 9; Nexus 5 Build/M4B30Z)"
+
+
+def per_call(function, runs):
+    """Microseconds per call of `function`, after a warm-up."""
+    for _ in range(min(runs, 1000)):
+        function()
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1e6
+
+
+def logged_client(**kwargs):
+    return TgtgClient(
+        user_agent=USER_AGENT,
+        last_time_token_refreshed=datetime.datetime.now(),
+        **TOKENS,
+        **kwargs,
+    )
+
+
+def construction(runs):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["TGTG_CACHE_DIR"] = cache_dir
+        with open(os.path.join(cache_dir, "apk_version.json"), "w") as cache_file:
+            json.dump({"version": "24.11.0", "fetched_at": time.time()}, cache_file)
+        return {
+            "with_user_agent_us": per_call(
+                lambda: TgtgClient(user_agent=USER_AGENT, **TOKENS), runs
+            ),
+            "warm_version_cache_us": per_call(lambda: TgtgClient(**TOKENS), runs),
+        }
+
+
+def call_overhead(runs):
+    page = {"items": [], "orders": []}
+    client = logged_client()
+    client.session.mount("https://", CannedAdapter(json.dumps(page).encode()))
+    payload = {
+        "origin": {"latitude": 1.0, "longitude": 2.0},
+        "radius": 21,
+        "page_size": 20,
+    }
+    codec = default_codec()
+    encoded = codec.dumps(payload)
+
+    def build_headers():
+        client._cached_headers = None
+        return client._headers
+
+    return {
+        "codec": codec.name,
+        "headers_cached_us": per_call(lambda: client._headers, runs * 10),
+        "headers_built_us": per_call(build_headers, runs),
+        "join_url_us": per_call(
+            lambda: _join_url(BASE_URL, API_ITEM_ENDPOINT), runs * 10
+        ),
+        "encode_us": per_call(lambda: codec.dumps(payload), runs * 10),
+        "decode_us": per_call(lambda: codec.loads(encoded), runs * 10),
+        "get_items_us": per_call(client.get_items, runs),
+        "get_active_us": per_call(client.get_active, runs),
+    }
+
+
+def sync_throughput(server, calls):
+    client = logged_client(url=server.url)
+    start = time.perf_counter()
+    for index in range(calls):
+        client.get_item(index)
+    return calls / (time.perf_counter() - start)
+
+
+def threaded_throughput(server, calls, workers):
+    client = logged_client(url=server.url, thread_safe=True, max_workers=workers)
+    with ThreadPoolExecutor(workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(client.get_item, range(calls)))
+        return calls / (time.perf_counter() - start)
+
+
+def async_throughput(server, calls, concurrency):
+    from tgtg import AsyncTgtgClient
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get_item(client, item_id):
+            async with semaphore:
+                return await client.get_item(item_id)
+
+        async with AsyncTgtgClient(
+            url=server.url,
+            user_agent=USER_AGENT,
+            last_time_token_refreshed=datetime.datetime.now(),
+            **TOKENS,
+        ) as client:
+            await client.get_item(0)
+            start = time.perf_counter()
+            await asyncio.gather(*(get_item(client, index) for index in range(calls)))
+            return calls / (time.perf_counter() - start)
+
+    return asyncio.run(run())
+
+
+def throughput(calls, workers, latency):
+    results = {"latency_s": latency, "calls": calls, "workers": workers}
+    with StubServer(latency=latency) as server:
+        results["sync_calls_per_s"] = sync_throughput(server, calls)
+        results["threaded_calls_per_s"] = threaded_throughput(server, calls, workers)
+        try:
+            results["async_calls_per_s"] = async_throughput(server, calls, workers)
+        except ImportError:
+            results["async_calls_per_s"] = None
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, previous, prefix=""):
+    for key, value in results.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict):
+            compare(value, old, f"{prefix}{key}.")
+        elif isinstance(value, float) and isinstance(old, (int, float)) and old:
+            print(
+                f"  {prefix + key:<40} {old:12.2f} -> {value:12.2f}  ({value / old - 1:+.1%})"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--runs", type=int, default=5000, help="runs of each micro benchmark"
+    )
+    parser.add_argument(
+        "--calls", type=int, default=400, help="calls of each throughput benchmark"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="threads, or concurrent async calls"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.005, help="stub server latency in seconds"
+    )
+    parser.add_argument(
+        "--output", help="JSON file to write, default benchmarks/results/<commit>.json"
+    )
+    parser.add_argument("--compare", help="results of a previous run to compare with")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "construction": construction(args.runs // 10),
+        "call_overhead": call_overhead(args.runs),
+        "throughput": throughput(args.calls, args.workers, args.latency),
+    }
+    print(json.dumps(results, indent=2))
+
+    output = args.output or os.path.join(
+        ROOT, "benchmarks", "results", f"{results['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+        print(f"Compared with {previous.get('commit')} ({previous.get('date')}):")
+        compare(results, previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import json
 from tgtg import TgtgClient
+from tgtg.favorites import FavoritesSnapshot
 
 # Load credentials from the saved file
 with open("credentials.json", "r") as f:
@@ -12,16 +13,12 @@ client = TgtgClient(
     cookie=credentials['cookie']
 )
 
-# Fetch and display favorite stores
-favorites = client.get_favorites()
+# Compare the favorite stores with the previous run, saved in favorites_snapshot.json
+snapshot = FavoritesSnapshot.load("favorites_snapshot.json")
+events = snapshot.poll(client)
+snapshot.save("favorites_snapshot.json")
 
-print("Your Favorite Stores:")
-for store in favorites:
-    # Debug: Print the full store object to inspect its structure
-    print("DEBUG: Store object:", store)
-
-    # Safely access keys with .get() to avoid KeyError
-    display_name = store.get('display_name', 'Unknown Store')
-    store_id = store.get('store_id', 'Unknown ID')
-
-    print(f"- {display_name} (Store ID: {store_id})")
\ No newline at end of file
+# Only added, removed and changed stores are printed, everything on the first run
+print(f"Your Favorite Stores: {len(snapshot)}, {len(events)} changed")
+for event in events:
+    print(event)
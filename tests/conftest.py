@@ -1,3 +1,4 @@
+import datetime
 from urllib.parse import urljoin
 
 import pytest
@@ -12,6 +13,21 @@ from tgtg import (
 )
 
 from .constants import tgtg_client_fake_tokens
+from .stub_server import StubServer
+
+
+def pytest_collection_modifyitems(items):
+    # a StubServer is reached over real sockets, not the `responses` mock
+    for item in items:
+        if "stub_server" in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.withoutresponses)
+
+
+@pytest.fixture(autouse=True)
+def apk_version_cache_dir(tmp_path, monkeypatch):
+    # never share the apk version cache of the machine running the tests
+    monkeypatch.setenv("TGTG_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
 
 
 @pytest.fixture(scope="function")
@@ -51,3 +67,25 @@ def refresh_tokens_response():
 @pytest.fixture(scope="function")
 def client(refresh_tokens_response):
     yield TgtgClient(**tgtg_client_fake_tokens)
+
+
+@pytest.fixture
+def make_client():
+    """Factory of `client_class` clients for a `StubServer`, tokens already fresh."""
+
+    def make_client(server=None, client_class=TgtgClient, **kwargs):
+        kwargs.setdefault("last_time_token_refreshed", datetime.datetime.now())
+        return client_class(
+            url=BASE_URL if server is None else server.url,
+            user_agent="test",
+            **tgtg_client_fake_tokens,
+            **kwargs,
+        )
+
+    return make_client
+
+
+@pytest.fixture
+def stub_server():
+    """`StubServer`, for tests that run it instead of mocking `requests`."""
+    return StubServer
@@ -1,3 +1,6 @@
+import base64
+import json
+
 GLOBAL_PROPERTIES = [
     "item",
     "store",
@@ -61,3 +64,90 @@ tgtg_client_fake_tokens = {
     "refresh_token": "refresh_token",
     "cookie": "cookie",
 }
+
+
+def make_jwt(expires_at):
+    """Unsigned JWT whose `exp` claim is the `expires_at` datetime."""
+    claims = json.dumps({"sub": "1", "exp": int(expires_at.timestamp())}).encode()
+    payload = base64.urlsafe_b64encode(claims).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.signature"
+
+
+def make_item(item_id="64346", items_available=2):
+    """An entry of `get_items`, shaped like a real one."""
+    price = {"code": "EUR", "minor_units": 499, "decimals": 2}
+    value = {"code": "EUR", "minor_units": 1500, "decimals": 2}
+    address = {
+        "address": {
+            "country": {"iso_code": "ES", "name": "Spain"},
+            "address_line": "Av. de los Piconeros, S/N, 14001 Córdoba, España",
+            "city": "",
+            "postal_code": "",
+        },
+        "location": {"longitude": -4.776045, "latitude": 37.894249},
+    }
+    picture = {
+        "picture_id": "110618",
+        "current_url": "https://images.tgtg.ninja/store/fb893813-a775.png",
+    }
+    return {
+        "item": {
+            "item_id": str(item_id),
+            "item_price": price,
+            "sales_taxes": [],
+            "tax_amount": {"code": "EUR", "minor_units": 0, "decimals": 2},
+            "price_excluding_taxes": price,
+            "price_including_taxes": price,
+            "value_excluding_taxes": value,
+            "value_including_taxes": value,
+            "taxation_policy": "PRICE_INCLUDES_TAXES",
+            "show_sales_taxes": False,
+            "value": value,
+            "cover_picture": picture,
+            "logo_picture": picture,
+            "name": "",
+            "description": "Salva comida en Ecofamily Bufé y tu pack podrá contener: "
+            "comidas caseras.",
+            "can_user_supply_packaging": False,
+            "packaging_option": "MUST_BRING_BAG",
+            "collection_info": "",
+            "diet_categories": [],
+            "item_category": "MEAL",
+            "badges": [
+                {
+                    "badge_type": "SERVICE_RATING_SCORE",
+                    "rating_group": "LIKED",
+                    "percentage": 93,
+                    "user_count": 178,
+                    "month_count": 5,
+                }
+            ],
+            "favorite_count": 0,
+            "buffet": False,
+        },
+        "store": {
+            "store_id": f"{item_id}s",
+            "store_name": "Ecofamily Bufé - Centro",
+            "branch": "",
+            "description": "",
+            "tax_identifier": "",
+            "website": "",
+            "store_location": address,
+            "logo_picture": picture,
+            "store_time_zone": "Europe/Madrid",
+            "hidden": False,
+            "favorite_count": 0,
+            "we_care": False,
+        },
+        "display_name": "Ecofamily Bufé - Centro",
+        "pickup_interval": {
+            "start": "2022-11-04T11:00:00Z",
+            "end": "2022-11-04T15:00:00Z",
+        },
+        "pickup_location": address,
+        "items_available": items_available,
+        "distance": 4241.995584076078,
+        "favorite": True,
+        "in_sales_window": False,
+        "new_item": False,
+    }
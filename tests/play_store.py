@@ -0,0 +1,52 @@
+"""Synthetic Play Store pages, laid out like the real one.
+
+The app details page is a megabyte or two of HTML where the data of each
+section is inlined as `AF_initDataCallback({key: 'ds:N', ..., data:[...],
+sideChannel: {}})`. The version is at `data[1][2][140][0][0][0]` of ds:5,
+which comes about a third of the way through the page.
+"""
+
+import json
+import random
+
+
+def _noise(rng, size):
+    """Nested JSON data with strings holding brackets, quotes and escapes."""
+    words = ['Magic "Bag"', "[tgtg]", "{food}", "a,b", "Ünïcode ✓", "path\\to", "x"]
+    data = []
+    length = 2
+    while length < size:
+        value = [
+            rng.choice(words),
+            rng.randint(0, 10**6),
+            [rng.random(), None, True, [rng.choice(words)]],
+            {"k": rng.choice(words)},
+        ]
+        data.append(value)
+        length += len(json.dumps(value)) + 1
+    return data
+
+
+def _callback(key, data):
+    return (
+        f'<script class="{key}" nonce="n0nce">AF_initDataCallback({{key: \'{key}\', '
+        f"hash: '{len(key)}', data:{json.dumps(data, ensure_ascii=False)}, "
+        "sideChannel: {}});</script>"
+    )
+
+
+def play_store_page(version, size=1_500_000, seed=1):
+    rng = random.Random(seed)
+    details = [_noise(rng, 500) for _ in range(140)]
+    details.append([[[version]]])
+    details += [_noise(rng, 500) for _ in range(60)]
+    ds5 = [_noise(rng, 20_000), [None, _noise(rng, 5_000), details], None]
+
+    head = "<!doctype html><html><head><style>" + "a{color:red}" * (size // 60)
+    parts = [head + "</style></head><body>"]
+    parts += [_callback(f"ds:{index}", _noise(rng, size // 40)) for index in range(5)]
+    parts.append(_callback("ds:5", ds5))
+    page = "".join(parts)
+    tail = [_callback(f"ds:{index}", _noise(rng, size // 20)) for index in range(6, 12)]
+    scripts = "<script>" + "function f(a){return [a,{b:a}]};" * (size // 80)
+    return page + "".join(tail) + scripts + "</script></body></html>"
@@ -0,0 +1,374 @@
+"""A TooGoodToGo API stand-in listening on a real local socket.
+
+Unlike the `responses` fixtures it goes through real connections, which is
+needed for the asyncio client and anything about pooling, retries or
+concurrency. Every endpoint of `tgtg` is served with payloads shaped and
+sized like the real ones, and latency, server errors and 429s can be
+injected. Run it on its own to point a client at it:
+
+    python -m tests.stub_server --port 8000 --latency 0.05 --throttle-rate 0.1
+"""
+
+import argparse
+import copy
+import http.server
+import json
+import random
+import threading
+import time
+import uuid
+
+from tgtg import (
+    ACTIVE_ORDER_ENDPOINT,
+    API_BUCKET_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    AUTH_BY_EMAIL_ENDPOINT,
+    AUTH_POLLING_ENDPOINT,
+    INACTIVE_ORDER_ENDPOINT,
+    REFRESH_ENDPOINT,
+    SIGNUP_BY_EMAIL_ENDPOINT,
+)
+
+from .constants import make_item
+
+ORDER_PREFIX = "order/v8/"
+FAVORITE_PREFIX = "user/favorite/v1/"
+TOKENS = {"access_token": "an_access_token", "refresh_token": "a_refresh_token"}
+COOKIE = {"Set-Cookie": "sweet sweet cookie"}
+
+
+def fake_item(item_id, rng=None):
+    """A realistic item, with its store spread around Córdoba by `rng`."""
+    item = make_item(item_id, items_available=rng.randint(0, 5) if rng else 1)
+    item["item"]["name"] = f"Magic bag {item_id}"
+    item["store"]["store_name"] = item["display_name"] = f"Store {item_id}"
+    if rng:
+        item["store"]["store_location"] = copy.deepcopy(item["store"]["store_location"])
+        item["store"]["store_location"]["location"] = {
+            "latitude": 37.88 + rng.uniform(-0.05, 0.05),
+            "longitude": -4.78 + rng.uniform(-0.05, 0.05),
+        }
+    return item
+
+
+def fake_order(order_id, item, state="RESERVED", quantity=1):
+    return {
+        "order_id": str(order_id),
+        "state": state,
+        "cancel_until": "2022-11-04T10:00:00Z",
+        "redeem_interval": item["pickup_interval"],
+        "pickup_interval": item["pickup_interval"],
+        "store_time_zone": item["store"]["store_time_zone"],
+        "quantity": quantity,
+        "price_including_taxes": item["item"]["price_including_taxes"],
+        "price_excluding_taxes": item["item"]["price_excluding_taxes"],
+        "price_total_sales_taxes": item["item"]["tax_amount"],
+        "item_id": item["item"]["item_id"],
+        "item_name": item["item"]["name"],
+        "item_cover_image": item["item"]["cover_picture"],
+        "store_id": item["store"]["store_id"],
+        "store_name": item["store"]["store_name"],
+        "store_branch": item["store"]["branch"],
+        "store_logo": item["store"]["logo_picture"],
+        "pickup_location": item["pickup_location"],
+        "is_rated": False,
+        "time_of_purchase": "2022-11-04T08:00:00Z",
+        "can_user_supply_packaging": False,
+        "packaging_option": item["item"]["packaging_option"],
+        "is_buffet": False,
+        "food_handling_instructions": "",
+        "order_type": "MAGICBAG",
+    }
+
+
+class StubServer:
+    """Serve the API on 127.0.0.1, use it as a context manager.
+
+    The catalog listed by `get_items` holds `catalog_size` items, all
+    favorites, though `get_item` answers for any id. The order history holds
+    `history_size` redeemed orders. Polling answers 202 to the first
+    `polling_pending` requests of each login. `latency` is a delay in
+    seconds, or a dict of delays by endpoint path prefix. A request fails with
+    a 500 with probability `error_rate` and with a 429 (and `Retry-After`)
+    with probability `throttle_rate`, drawn from `seed`.
+
+    `routes` map an endpoint path to `handler(path, body) -> (status,
+    payload, headers)` and replace the default ones; a route ending with "/"
+    also serves every path below it. Every received request is recorded in
+    `requests` as `(path, headers, body)`.
+    """
+
+    def __init__(
+        self,
+        routes=None,
+        latency=0,
+        catalog_size=2,
+        history_size=0,
+        polling_pending=0,
+        error_rate=0,
+        throttle_rate=0,
+        retry_after=1,
+        seed=None,
+        port=0,
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.polling_pending = polling_pending
+        self.port = port
+        self.requests = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+        self.items = {}
+        for index in range(1, catalog_size + 1):
+            self.items[str(index)] = fake_item(index, self._rng if seed else None)
+        self.favorites = set(self.items)
+        self.orders = {}
+        items = list(self.items.values()) or [fake_item(1)]
+        self.history = [
+            fake_order(f"h{index}", items[index % len(items)], state="REDEEMED")
+            for index in range(history_size)
+        ]
+        self._polls = {}
+
+        self.routes = {
+            AUTH_BY_EMAIL_ENDPOINT: self.auth_by_email,
+            AUTH_POLLING_ENDPOINT: self.poll,
+            SIGNUP_BY_EMAIL_ENDPOINT: self.signup,
+            REFRESH_ENDPOINT: self.refresh,
+            API_ITEM_ENDPOINT: self.item,
+            API_BUCKET_ENDPOINT: self.bucket,
+            FAVORITE_PREFIX: self.set_favorite,
+            ACTIVE_ORDER_ENDPOINT: self.active,
+            INACTIVE_ORDER_ENDPOINT: self.inactive,
+            ORDER_PREFIX: self.order,
+            **(routes or {}),
+        }
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/api/"
+
+    def __enter__(self):
+        self._server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", self.port), self._make_handler()
+        )
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # endpoints
+
+    def auth_by_email(self, path, body):
+        polling_id = str(uuid.uuid4())
+        with self._lock:
+            self._polls[polling_id] = 0
+        return 200, {"state": "WAIT", "polling_id": polling_id}, {}
+
+    def poll(self, path, body):
+        polling_id = body.get("request_polling_id")
+        with self._lock:
+            if polling_id not in self._polls:
+                return 400, {"errors": [{"code": "UNKNOWN_POLLING_ID"}]}, {}
+            self._polls[polling_id] += 1
+            if self._polls[polling_id] <= self.polling_pending:
+                return 202, {}, {}
+        return 200, {**TOKENS, "startup_data": {"user": {"user_id": "1"}}}, COOKIE
+
+    def signup(self, path, body):
+        return 200, {"login_response": TOKENS}, COOKIE
+
+    def refresh(self, path, body):
+        return 200, TOKENS, COOKIE
+
+    def item(self, path, body):
+        if path == API_ITEM_ENDPOINT:
+            items = list(self.items.values())
+            if body.get("favorites_only"):
+                items = [
+                    item for item in items if item["item"]["item_id"] in self.favorites
+                ]
+            size = body.get("page_size", 20)
+            start = (body.get("page", 1) - 1) * size
+            return 200, {"items": items[start:][:size]}, {}
+        # items out of the listed catalog exist too, like far away ones
+        item_id = path.removeprefix(API_ITEM_ENDPOINT)
+        return 200, self.items.get(item_id) or fake_item(item_id), {}
+
+    def bucket(self, path, body):
+        paging = body.get("paging", {})
+        size = paging.get("size", 50)
+        start = paging.get("page", 0) * size
+        items = [self.items[item_id] for item_id in sorted(self.favorites, key=int)]
+        bucket = {"filler_type": "Favorites", "items": items[start:][:size]}
+        return 200, {"mobile_bucket": bucket}, {}
+
+    def set_favorite(self, path, body):
+        item_id = path.removeprefix(FAVORITE_PREFIX).split("/", 1)[0]
+        with self._lock:
+            if body.get("is_favorite"):
+                self.favorites.add(item_id)
+            else:
+                self.favorites.discard(item_id)
+        return 200, {}, {}
+
+    def active(self, path, body):
+        orders = [
+            order for order in self.orders.values() if order["state"] == "RESERVED"
+        ]
+        return 200, {"orders": orders}, {}
+
+    def inactive(self, path, body):
+        paging = body.get("paging", {})
+        size = paging.get("size", 20)
+        start = paging.get("page", 0) * size
+        orders = self.history[start:][:size]
+        return 200, {"orders": orders, "has_more": start + size < len(self.history)}, {}
+
+    def order(self, path, body):
+        rest = path.removeprefix(ORDER_PREFIX)
+        if rest.startswith("create/"):
+            return self._create_order(rest.removeprefix("create/"), body)
+        order_id, _, action = rest.partition("/")
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return 404, {"errors": [{"code": "ORDER_NOT_FOUND"}]}, {}
+            if action == "status":
+                return 200, {"id": order_id, "state": order["state"]}, {}
+            if action == "abort":
+                if order["state"] != "RESERVED":
+                    return 200, {"state": "ALREADY_ABORTED"}, {}
+                order["state"] = "CANCELLED"
+                self.items[order["item_id"]]["items_available"] += order["quantity"]
+                return 200, {"state": "SUCCESS"}, {}
+        return 404, {}, {}
+
+    def _create_order(self, item_id, body):
+        quantity = body.get("item_count", 1)
+        with self._lock:
+            item = self.items.get(item_id)
+            if item is None:
+                return 404, {"errors": [{"code": "ITEM_NOT_FOUND"}]}, {}
+            if item["items_available"] < quantity:
+                return 200, {"state": "SOLD_OUT"}, {}
+            item["items_available"] -= quantity
+            order = fake_order(uuid.uuid4().hex[:12], item, quantity=quantity)
+            self.orders[order["order_id"]] = order
+        return (
+            200,
+            {"state": "SUCCESS", "order": {"id": order["order_id"], **order}},
+            {},
+        )
+
+    # plumbing
+
+    def _route(self, path):
+        if path in self.routes:
+            return self.routes[path]
+        for prefix, handler in self.routes.items():
+            if prefix.endswith("/") and path.startswith(prefix):
+                return handler
+        return None
+
+    def _latency(self, path):
+        if not isinstance(self.latency, dict):
+            return self.latency
+        for prefix, latency in self.latency.items():
+            if path.startswith(prefix):
+                return latency
+        return 0
+
+    def _fault(self):
+        with self._lock:
+            draw = self._rng.random()
+        if draw < self.error_rate:
+            return 500, {"errors": [{"code": "INTERNAL_ERROR"}]}, {}
+        if draw < self.error_rate + self.throttle_rate:
+            return 429, {}, {"Retry-After": str(self.retry_after)}
+        return None
+
+    def handle(self, path, body):
+        latency = self._latency(path)
+        if latency:
+            time.sleep(latency)
+        answer = self._fault() if self.error_rate or self.throttle_rate else None
+        if answer is not None:
+            return answer
+        handler = self._route(path)
+        if handler is None:
+            return 404, {}, {}
+        return handler(path, body or {})
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # headers and body are separate writes, avoid delayed ACK stalls
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw_body = self.rfile.read(length) if length else b""
+                body = json.loads(raw_body) if raw_body else None
+                path = self.path.split("/api/", 1)[-1]
+                stub.requests.append((path, dict(self.headers), body))
+
+                status, payload, headers = stub.handle(path, body)
+
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake TooGoodToGo API.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--history-size", type=int, default=500)
+    parser.add_argument("--polling-pending", type=int, default=1)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--throttle-rate", type=float, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    with StubServer(
+        latency=args.latency,
+        catalog_size=args.catalog_size,
+        history_size=args.history_size,
+        polling_pending=args.polling_pending,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        port=args.port,
+    ) as server:
+        print(f"Serving on {server.url}, e.g. TgtgClient(url={server.url!r}, ...)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import asyncio
+import datetime
+import functools
+import threading
+import time
+
+import pytest
+
+from tgtg import (
+    ACTIVE_ORDER_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    AUTH_BY_EMAIL_ENDPOINT,
+    AUTH_POLLING_ENDPOINT,
+    INACTIVE_ORDER_ENDPOINT,
+    REFRESH_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.cache import ResponseCache
+from tgtg.catalog import StoreCatalog
+from tgtg.exceptions import TgtgAPIError
+from tgtg.token_store import FileTokenStore
+
+from .constants import make_jwt
+from .stub_server import StubServer
+
+pytest.importorskip("aiohttp")
+
+from tgtg import AsyncTgtgClient  # noqa: E402
+
+
+@pytest.fixture
+def make_client(make_client):
+    return functools.partial(make_client, client_class=AsyncTgtgClient)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_shares_endpoints_with_sync_client():
+    assert AsyncTgtgClient.get_items is TgtgClient.get_items
+    assert AsyncTgtgClient.get_inactive is TgtgClient.get_inactive
+
+
+def test_read_endpoints(make_client):
+    async def scenario(server):
+        async with make_client(server, last_time_token_refreshed=None) as client:
+            return (
+                await client.get_items(),
+                await client.get_item(42),
+                await client.get_favorites(),
+                await client.get_active(),
+                await client.get_inactive(page=1),
+            )
+
+    with StubServer() as server:
+        items, item, favorites, active, inactive = run(scenario(server))
+
+    assert [item["item"]["item_id"] for item in items] == ["1", "2"]
+    assert item["item"]["item_id"] == "42"
+    assert favorites[0]["item"]["item_id"] == "1"
+    assert active == {"orders": []}
+    assert inactive == {"orders": [], "has_more": False}
+    paths = [path for path, _, _ in server.requests]
+    assert paths.count(REFRESH_ENDPOINT) == 1
+    assert server.requests[-1][2] == {"paging": {"page": 1, "size": 20}}
+    assert server.requests[-1][1]["authorization"] == "Bearer an_access_token"
+
+
+def test_concurrent_calls_share_one_refresh(make_client):
+    async def scenario(server):
+        async with make_client(server, last_time_token_refreshed=None) as client:
+            return await asyncio.gather(*(client.get_item(i) for i in range(20)))
+
+    with StubServer(latency=0.1) as server:
+        start = time.perf_counter()
+        items = run(scenario(server))
+        elapsed = time.perf_counter() - start
+
+    assert [item["item"]["item_id"] for item in items] == [str(i) for i in range(20)]
+    assert [path for path, _, _ in server.requests].count(REFRESH_ENDPOINT) == 1
+    # refresh + one round of concurrent calls, far from 21 sequential calls
+    assert elapsed < 1
+
+
+def test_api_error(make_client):
+    async def scenario(server):
+        async with make_client(server) as client:
+            await client.get_items()
+
+    routes = {API_ITEM_ENDPOINT: lambda path, body: (400, {"errors": []}, {})}
+    with StubServer(routes) as server:
+        with pytest.raises(TgtgAPIError):
+            run(scenario(server))
+
+
+def test_login_with_email():
+    async def scenario(server):
+        async with AsyncTgtgClient(
+            url=server.url, email="test@test.com", user_agent="test"
+        ) as client:
+            return await client.get_credentials()
+
+    routes = {
+        AUTH_BY_EMAIL_ENDPOINT: lambda path, body: (
+            200,
+            {"state": "WAIT", "polling_id": "polling"},
+            {},
+        ),
+        AUTH_POLLING_ENDPOINT: lambda path, body: (
+            200,
+            {"access_token": "an_access_token", "refresh_token": "a_refresh_token"},
+            {"Set-Cookie": "sweet sweet cookie"},
+        ),
+    }
+    with StubServer(routes) as server:
+        credentials = run(scenario(server))
+
+    assert credentials == {
+        "access_token": "an_access_token",
+        "refresh_token": "a_refresh_token",
+        "cookie": "sweet sweet cookie",
+    }
+    assert server.requests[1][2]["request_polling_id"] == "polling"
+
+
+def test_background_refresh():
+    async def scenario(server):
+        async with AsyncTgtgClient(
+            url=server.url,
+            user_agent="test",
+            access_token=make_jwt(
+                datetime.datetime.now() + datetime.timedelta(seconds=3)
+            ),
+            refresh_token="refresh_token",
+            cookie="cookie",
+            refresh_lead_time=1.5,
+        ) as client:
+            await client.get_active()
+            assert [path for path, _, _ in server.requests] == [ACTIVE_ORDER_ENDPOINT]
+            await asyncio.sleep(2)
+            return client.access_token
+
+    with StubServer() as server:
+        assert run(scenario(server)) == "an_access_token"
+    assert [path for path, _, _ in server.requests] == [
+        ACTIVE_ORDER_ENDPOINT,
+        REFRESH_ENDPOINT,
+    ]
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_inactive(prefetch, make_client):
+    def inactive(path, body):
+        page = body["paging"]["page"]
+        return 200, {"orders": [{"id": page}], "has_more": page < 4}, {}
+
+    async def scenario(server):
+        async with make_client(server) as client:
+            return [
+                order["id"]
+                async for order in client.iter_inactive(page_size=1, prefetch=prefetch)
+            ]
+
+    with StubServer({INACTIVE_ORDER_ENDPOINT: inactive}) as server:
+        assert run(scenario(server)) == [0, 1, 2, 3, 4]
+    assert [path for path, _, _ in server.requests].count(INACTIVE_ORDER_ENDPOINT) == 5
+
+
+def test_response_cache(make_client):
+    async def scenario(server):
+        async with make_client(server, cache=ResponseCache()) as client:
+            return [await client.get_item(1) for _ in range(3)], client.cache.hits
+
+    with StubServer() as server:
+        items, hits = run(scenario(server))
+    assert items[0] == items[2]
+    assert hits == 2
+    assert [path for path, _, _ in server.requests].count(API_ITEM_ENDPOINT + "1") == 1
+
+
+def test_stream(make_client):
+    async def scenario(server):
+        async with make_client(server) as client:
+            return [
+                item["item"]["item_id"]
+                async for item in client.get_items(page_size=30, stream=True)
+            ], [
+                order["order_id"]
+                async for order in client.get_inactive(page_size=5, stream=True)
+            ]
+
+    with StubServer(catalog_size=30, history_size=5) as server:
+        items, orders = run(scenario(server))
+    assert items == [str(index) for index in range(1, 31)]
+    assert orders == ["h0", "h1", "h2", "h3", "h4"]
+
+
+def test_stream_fail(make_client):
+    async def scenario(server):
+        async with make_client(server) as client:
+            return [item async for item in client.get_items(stream=True)]
+
+    def fail(path, body):
+        return 400, {"errors": []}, {}
+
+    with StubServer({API_ITEM_ENDPOINT: fail}) as server:
+        with pytest.raises(TgtgAPIError):
+            run(scenario(server))
+
+
+def test_concurrent_identical_calls_share_one_request(make_client):
+    async def scenario(server):
+        async with make_client(server, coalesce=True) as client:
+            items = await asyncio.gather(*(client.get_item(1) for _ in range(10)))
+            items += await asyncio.gather(client.get_item(2), client.get_item(3))
+            return items, client.single_flight.stats()
+
+    with StubServer(latency=0.1) as server:
+        items, stats = run(scenario(server))
+
+    paths = sorted(path for path, _, _ in server.requests)
+    assert paths == [f"{API_ITEM_ENDPOINT}{item_id}" for item_id in (1, 2, 3)]
+    assert [item["item"]["item_id"] for item in items] == ["1"] * 10 + ["2", "3"]
+    assert stats == {"sent": 3, "coalesced": 9, "in_flight": 0}
+
+
+def test_cancelled_caller_does_not_cancel_shared_request(make_client):
+    async def scenario(server):
+        async with make_client(server, coalesce=True) as client:
+            first = asyncio.ensure_future(client.get_item(1))
+            second = asyncio.ensure_future(client.get_item(1))
+            await asyncio.sleep(0.02)
+            first.cancel()
+            return await second
+
+    with StubServer(latency=0.1) as server:
+        item = run(scenario(server))
+
+    assert item["item"]["item_id"] == "1"
+    assert len(server.requests) == 1
+
+
+def test_catalog_is_written_off_the_event_loop(make_client):
+    class Catalog(StoreCatalog):
+        def add(self, items):
+            threads.append(threading.get_ident())
+            return super().add(items)
+
+    async def main(server):
+        async with make_client(server, catalog=catalog) as client:
+            await client.get_items(page_size=10)
+            return threading.get_ident()
+
+    threads = []
+    catalog = Catalog()
+    with StubServer(catalog_size=10) as server:
+        loop_thread = run(main(server))
+    assert threads and loop_thread not in threads
+    assert len(catalog) == 10
+
+
+def test_blocking_work_runs_off_the_event_loop(tmp_path):
+    class Store(FileTokenStore):
+        def load(self):
+            threads.append(("load", threading.get_ident()))
+            return super().load()
+
+        def save(self, credentials):
+            threads.append(("save", threading.get_ident()))
+            super().save(credentials)
+
+    class Client(AsyncTgtgClient):
+        def _get_user_agent(self):
+            threads.append(("user_agent", threading.get_ident()))
+            return "test"
+
+    async def main(server):
+        async with await Client.create(
+            url=server.url,
+            access_token=make_jwt(
+                datetime.datetime.now() - datetime.timedelta(minutes=1)
+            ),
+            refresh_token="refresh_token",
+            cookie="cookie",
+            token_store=store,
+            background_refresh=False,
+        ) as client:
+            await client.get_active()
+        return threading.get_ident()
+
+    threads = []
+    store = Store(tmp_path / "tokens.json")
+    with StubServer() as server:
+        loop_thread = run(main(server))
+    assert [name for name, _ in threads] == ["user_agent", "load", "load", "save"]
+    assert loop_thread not in [thread for _, thread in threads]
+    assert store.load()["access_token"] == "an_access_token"
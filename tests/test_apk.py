@@ -1,8 +1,181 @@
+import json
+import os
+import time
+
+import pytest
+import requests
 import responses
 
-from tgtg.google_play_scraper import get_last_apk_version
+from tgtg import DEFAULT_APK_VERSION, TgtgClient
+from tgtg.exceptions import TgtgPlayStoreError
+from tgtg.google_play_scraper import (
+    PLAY_STORE_URL,
+    default_cache_path,
+    find_apk_version,
+    get_cached_apk_version,
+    get_last_apk_version,
+)
+
+from .constants import tgtg_client_fake_tokens
+from .play_store import play_store_page as realistic_play_store_page
+
+
+def play_store_page(version):
+    data = [None, [None, None, [None] * 140 + [[[[version]]]]]]
+    return (
+        "<html><script>AF_initDataCallback({key: 'ds:5', hash: '7', "
+        f"data:{json.dumps(data)}, sideChannel: {{}}}});</script></html>"
+    )
 
 
 def test_get_latest_apk_version():
     responses.add_passthru("https://play.google.com/store/apps/details")
     get_last_apk_version()
+
+
+def test_get_cached_apk_version_fetches_once(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.1.0"))
+    cache_path = str(tmp_path / "apk_version.json")
+
+    assert get_cached_apk_version(cache_path=cache_path) == "25.1.0"
+    assert get_cached_apk_version(cache_path=cache_path) == "25.1.0"
+    assert len(responses.calls) == 1
+    with open(cache_path) as cache_file:
+        assert json.load(cache_file)["version"] == "25.1.0"
+
+
+def test_get_cached_apk_version_expired(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.2.0"))
+    cache_path = str(tmp_path / "apk_version.json")
+    with open(cache_path, "w") as cache_file:
+        json.dump({"version": "24.0.0", "fetched_at": time.time() - 61}, cache_file)
+
+    assert get_cached_apk_version(cache_path=cache_path, ttl=60) == "25.2.0"
+    assert len(responses.calls) == 1
+
+
+def test_get_cached_apk_version_corrupted_cache(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.3.0"))
+    cache_path = str(tmp_path / "apk_version.json")
+    with open(cache_path, "w") as cache_file:
+        cache_file.write("{not json")
+
+    assert get_cached_apk_version(cache_path=cache_path) == "25.3.0"
+
+
+def test_get_cached_apk_version_disabled(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.4.0"))
+    cache_path = str(tmp_path / "apk_version.json")
+
+    assert get_cached_apk_version(cache_path=cache_path, ttl=0) == "25.4.0"
+    assert not os.path.exists(cache_path)
+
+
+def test_get_cached_apk_version_fetch_fail(tmp_path):
+    responses.add(
+        responses.GET, PLAY_STORE_URL, body=requests.exceptions.ConnectTimeout()
+    )
+    cache_path = str(tmp_path / "apk_version.json")
+
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        get_cached_apk_version(cache_path=cache_path)
+    # the failure is remembered, the next calls do not wait for the store again
+    with pytest.raises(TgtgPlayStoreError):
+        get_cached_apk_version(cache_path=cache_path)
+    assert len(responses.calls) == 1
+
+
+def test_get_cached_apk_version_failure_expired(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.2.0"))
+    cache_path = str(tmp_path / "apk_version.json")
+    with open(cache_path, "w") as cache_file:
+        json.dump({"failed_at": time.time() - 61}, cache_file)
+
+    assert get_cached_apk_version(cache_path=cache_path, failure_ttl=60) == "25.2.0"
+    with open(cache_path) as cache_file:
+        assert "failed_at" not in json.load(cache_file)
+
+
+def test_get_cached_apk_version_failure_not_cached(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, status=500)
+    cache_path = str(tmp_path / "apk_version.json")
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            get_cached_apk_version(cache_path=cache_path, failure_ttl=0)
+    assert not os.path.exists(cache_path)
+
+
+def test_get_last_apk_version_deadline():
+    page = realistic_play_store_page("24.11.0")
+    responses.add(responses.GET, PLAY_STORE_URL, body=page)
+
+    with pytest.raises(TgtgPlayStoreError, match="deadline"):
+        get_last_apk_version(deadline=0)
+
+
+def test_client_uses_cached_apk_version(apk_version_cache_dir):
+    responses.add(responses.GET, PLAY_STORE_URL, body=play_store_page("25.5.0"))
+
+    assert default_cache_path().startswith(str(apk_version_cache_dir))
+    assert TgtgClient(**tgtg_client_fake_tokens).version == "25.5.0"
+    assert TgtgClient(**tgtg_client_fake_tokens).version == "25.5.0"
+    assert len(responses.calls) == 1
+
+
+def test_client_apk_version_fallback():
+    responses.add(responses.GET, PLAY_STORE_URL, status=500)
+
+    assert TgtgClient(**tgtg_client_fake_tokens).version == DEFAULT_APK_VERSION
+    assert TgtgClient(**tgtg_client_fake_tokens).version == DEFAULT_APK_VERSION
+    assert len(responses.calls) == 1
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 64 * 1024])
+def test_find_apk_version_stops_after_ds5(chunk_size):
+    page = realistic_play_store_page("24.11.0")
+    starts = []
+
+    def chunks():
+        for start in range(0, len(page), chunk_size):
+            starts.append(start)
+            end = start + chunk_size
+            yield page[start:end]
+
+    assert find_apk_version(chunks()) == "24.11.0"
+    ds5_end = page.index("sideChannel", page.index("'ds:5'"))
+    assert ds5_end <= starts[-1] + chunk_size < ds5_end + chunk_size
+    assert starts[-1] + chunk_size < len(page) / 2
+
+
+def test_get_last_apk_version_realistic_page():
+    responses.add(
+        responses.GET, PLAY_STORE_URL, body=realistic_play_store_page("24.12.1")
+    )
+    assert get_last_apk_version() == "24.12.1"
+
+
+@pytest.mark.parametrize(
+    "page",
+    [
+        "<html>no data</html>",
+        play_store_page("1.0").replace("'ds:5'", "'ds:6'"),
+        play_store_page("1.0").split(", sideChannel")[0],
+        play_store_page("1.0").replace('[[["1.0"]]]', "[]"),
+        play_store_page("1.0").replace('[[["1.0"]]]', "[[[12]]]"),
+        play_store_page("1.0").replace("data:[null", "data:{null"),
+        play_store_page("1.0").replace("data:[null, [null, null", "data:[null, [nul"),
+    ],
+)
+def test_find_apk_version_layout_changed(page):
+    with pytest.raises(TgtgPlayStoreError):
+        find_apk_version(page)
+
+
+def test_layout_change_falls_back_to_default_version(tmp_path):
+    responses.add(responses.GET, PLAY_STORE_URL, body="<html>new layout</html>")
+    client = TgtgClient(
+        version_cache_path=str(tmp_path / "apk_version.json"),
+        **tgtg_client_fake_tokens,
+    )
+    assert client.version == DEFAULT_APK_VERSION
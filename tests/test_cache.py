@@ -0,0 +1,118 @@
+import json
+from urllib.parse import urljoin
+
+import pytest
+import responses
+from freezegun import freeze_time
+
+from tgtg import (
+    API_BUCKET_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    BASE_URL,
+    FAVORITE_ITEM_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.cache import ResponseCache
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+
+@pytest.fixture
+def cached_client(refresh_tokens_response):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT) + "1",
+        json=make_item(1),
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_BUCKET_ENDPOINT),
+        json={"mobile_bucket": {"items": [make_item(1)]}},
+        status=200,
+    )
+    client = TgtgClient(
+        cache=ResponseCache(stock_ttl=30, static_ttl=3600), **tgtg_client_fake_tokens
+    )
+    client.login()
+    return client
+
+
+def item_calls():
+    return sum(
+        call.request.url.endswith(API_ITEM_ENDPOINT + "1") for call in responses.calls
+    )
+
+
+def test_cache_hit(cached_client):
+    first = cached_client.get_item(1)
+    first["items_available"] = 0
+    assert cached_client.get_item(1) == make_item(1)
+    assert item_calls() == 1
+    assert cached_client.cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "size": 1,
+    }
+
+
+def test_stock_and_static_ttl(cached_client):
+    with freeze_time() as frozen:
+        cached_client.get_item(1)
+        frozen.tick(60)
+        cached_client.get_item(1, stock=False)
+        assert item_calls() == 1
+        cached_client.get_item(1)
+        assert item_calls() == 2
+        frozen.tick(3600)
+        cached_client.get_item(1, stock=False)
+        assert item_calls() == 3
+
+
+def test_cache_key_is_request_body(cached_client):
+    cached_client.get_favorites()
+    cached_client.get_favorites()
+    cached_client.get_favorites(page=1)
+    bucket_calls = [
+        json.loads(call.request.body)["paging"]
+        for call in responses.calls
+        if call.request.url.endswith(API_BUCKET_ENDPOINT)
+    ]
+    assert bucket_calls == [{"page": 0, "size": 50}, {"page": 1, "size": 50}]
+
+
+def test_set_favorite_invalidates(cached_client):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, FAVORITE_ITEM_ENDPOINT.format(1)),
+        status=200,
+    )
+    cached_client.get_favorites()
+    cached_client.get_item(1)
+    cached_client.set_favorite(1, False)
+    assert len(cached_client.cache) == 0
+    cached_client.get_favorites()
+    cached_client.get_item(1)
+    assert cached_client.cache.misses == 4
+
+
+def test_errors_are_not_cached(cached_client):
+    responses.replace(
+        responses.POST, urljoin(BASE_URL, API_ITEM_ENDPOINT) + "1", status=400
+    )
+    for _ in range(2):
+        with pytest.raises(Exception):
+            cached_client.get_item(1)
+    assert item_calls() == 2
+
+
+def test_lru_eviction():
+    cache = ResponseCache(maxsize=2)
+    cache.set(("a", ""), b"a")
+    cache.set(("b", ""), b"b")
+    assert cache.get(("a", ""), cache.stock_ttl) == b"a"
+    cache.set(("c", ""), b"c")
+    assert cache.get(("b", ""), cache.stock_ttl) is None
+    assert cache.get(("a", ""), cache.stock_ttl) == b"a"
+    assert cache.evictions == 1
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from tgtg import TgtgClient
+from tgtg.cassette import REDACTED, Cassette, record, redact, replay
+from tgtg.exceptions import TgtgCassetteError
+
+
+def session(client):
+    client.get_credentials()
+    return (
+        client.get_items(page_size=20),
+        client.get_favorites(page_size=20),
+        list(client.iter_inactive(page_size=10)),
+    )
+
+
+def test_record_and_replay(monkeypatch, tmp_path, stub_server):
+    monkeypatch.setattr("tgtg.POLLING_WAIT_TIME", 0)
+    path = tmp_path / "session.json"
+    with stub_server(catalog_size=20, history_size=25) as server:
+        client = TgtgClient(url=server.url, email="test@example.com", user_agent="test")
+        with record(client, path):
+            recorded = session(client)
+        url = server.url
+
+    content = path.read_text()
+    for secret in ("an_access_token", "a_refresh_token", "test@example.com"):
+        assert secret not in content
+    assert len(Cassette.load(path).interactions) == 7
+    assert recorded[0][0]["item"]["name"] in content
+
+    # the server is gone, everything is served from the cassette
+    client = TgtgClient(url=url, email="test@example.com", user_agent="test")
+    with replay(client, path):
+        assert session(client) == recorded
+    assert client.access_token == REDACTED
+
+
+def test_replay_stream(tmp_path, stub_server):
+    path = tmp_path / "session.json"
+    with stub_server(catalog_size=20) as server:
+        client = TgtgClient(
+            url=server.url,
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            user_agent="test",
+        )
+        with record(client, path):
+            recorded = list(client.get_items(page_size=20, stream=True))
+
+    with replay(client, path):
+        assert list(client.get_items(page_size=20, stream=True)) == recorded
+    assert len(recorded) == 20
+
+
+def test_replay_realtime(tmp_path, stub_server):
+    path = tmp_path / "session.json"
+    with stub_server(latency=0.05) as server:
+        client = TgtgClient(
+            url=server.url,
+            access_token="access_token",
+            refresh_token="refresh_token",
+            cookie="cookie",
+            user_agent="test",
+        )
+        with record(client, path):
+            client.get_item(1)
+
+    start = time.perf_counter()
+    with replay(client, path):
+        client.get_item(1)
+    assert time.perf_counter() - start < 0.05
+
+    start = time.perf_counter()
+    with replay(client, path, realtime=True):
+        client.get_item(1)
+    assert time.perf_counter() - start >= 0.05
+
+
+def test_replay_miss(tmp_path):
+    path = tmp_path / "session.json"
+    Cassette(path).save()
+    client = TgtgClient(
+        url="https://example.com/api/",
+        access_token="access_token",
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="test",
+    )
+    with replay(client, path), pytest.raises(TgtgCassetteError):
+        client.get_active()
+
+
+def test_redact():
+    data = {
+        "access_token": "secret",
+        "startup_data": {"user": {"name": "Jane", "email": "jane@example.com"}},
+        "items": [{"item": {"name": "Magic Box"}}],
+    }
+    assert redact(data) == {
+        "access_token": REDACTED,
+        "startup_data": {"user": REDACTED},
+        "items": [{"item": {"name": "Magic Box"}}],
+    }
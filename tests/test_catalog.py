@@ -0,0 +1,170 @@
+import copy
+import random
+from urllib.parse import urljoin
+
+import pytest
+import responses
+from freezegun import freeze_time
+
+from tgtg import API_BUCKET_ENDPOINT, API_ITEM_ENDPOINT, BASE_URL, TgtgClient
+from tgtg.catalog import StoreCatalog, cell_ranges, distance
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+CORDOBA = 37.894249, -4.776045
+
+
+def located_item(item_id, latitude, longitude, name=None):
+    item = make_item(item_id)
+    item["store"]["store_location"] = copy.deepcopy(item["store"]["store_location"])
+    item["store"]["store_location"]["location"] = {
+        "latitude": latitude,
+        "longitude": longitude,
+    }
+    if name:
+        item["store"]["store_name"] = item["display_name"] = name
+    return item
+
+
+@pytest.fixture
+def catalog():
+    catalog = StoreCatalog()
+    yield catalog
+    catalog.close()
+
+
+def ids(entries):
+    return [entry.item_id for entry in entries]
+
+
+def test_nearby(catalog):
+    catalog.add(
+        [
+            located_item(1, 37.90, -4.78),  # about 700 m away
+            located_item(2, 37.94, -4.78),  # about 5 km away
+            located_item(3, 38.10, -4.78),  # about 23 km away
+        ]
+    )
+
+    assert ids(catalog.nearby(*CORDOBA, radius=1)) == ["1"]
+    items = catalog.nearby(*CORDOBA, radius=10)
+    assert ids(items) == ["1", "2"]
+    assert 600 < items[0].distance < 800
+    assert items[0].store_id == "1s"
+    assert items[0].raw["item"]["item_id"] == "1"
+    assert "items_available" not in items[0].raw
+
+
+def test_nearby_across_the_date_line(catalog):
+    catalog.add([located_item(1, 0, 179.99), located_item(2, 0, -179.99)])
+
+    assert ids(catalog.nearby(0, -179.999, radius=5)) == ["2", "1"]
+
+
+def test_grid_matches_a_full_scan(catalog):
+    rng = random.Random(3)
+    items = [
+        located_item(index, rng.uniform(36, 40), rng.uniform(-7, -2))
+        for index in range(2000)
+    ]
+    catalog.add(items)
+
+    for _ in range(20):
+        latitude, longitude = rng.uniform(36, 40), rng.uniform(-7, -2)
+        radius = rng.choice((1, 5, 21, 100, 3000))
+        expected = {
+            item["item"]["item_id"]
+            for item in items
+            if distance(
+                latitude,
+                longitude,
+                *_coordinates(item),
+            )
+            <= radius
+        }
+        assert set(ids(catalog.nearby(latitude, longitude, radius))) == expected
+
+
+def _coordinates(item):
+    location = item["store"]["store_location"]["location"]
+    return location["latitude"], location["longitude"]
+
+
+def test_cell_ranges_stay_bounded():
+    assert len(cell_ranges(*CORDOBA, 21)) == 8
+    assert len(cell_ranges(*CORDOBA, 5000)) == 1
+    assert len(cell_ranges(89.99, 0, 10)) == 1
+
+
+def test_search(catalog):
+    catalog.add(
+        [
+            located_item(1, 37.90, -4.78, name="Panadería Córdoba"),
+            located_item(2, 38.10, -4.78, name="Panadería del Sur"),
+            located_item(3, 37.90, -4.78, name="100% Fruta"),
+        ]
+    )
+
+    assert sorted(ids(catalog.search("PANADERÍA"))) == ["1", "2"]
+    assert ids(catalog.search("panadería", *CORDOBA, radius=10)) == ["1"]
+    assert ids(catalog.search("100%")) == ["3"]
+    # "%" and "_" are not wildcards
+    assert catalog.search("1%a") == []
+    assert catalog.search("1_0") == []
+
+
+def test_get_replaces_older_entries(catalog):
+    catalog.add([located_item(1, 37.90, -4.78, name="Before")])
+    catalog.add([located_item(1, 37.90, -4.78, name="After")])
+
+    assert len(catalog) == 1
+    assert catalog.get(1)["display_name"] == "After"
+    assert catalog.get(2) is None
+
+
+def test_max_age_and_prune(catalog):
+    with freeze_time("2022-11-04 10:00:00"):
+        catalog.add([located_item(1, 37.90, -4.78)])
+    with freeze_time("2022-11-04 11:00:00"):
+        catalog.add([located_item(2, 37.90, -4.78)])
+
+        assert ids(catalog.nearby(*CORDOBA, radius=5, max_age=600)) == ["2"]
+        assert catalog.prune(600) == 1
+        assert len(catalog) == 1
+
+
+def test_persisted(tmp_path):
+    catalog = StoreCatalog(tmp_path / "stores.db")
+    catalog.add([located_item(1, 37.90, -4.78)])
+    catalog.close()
+
+    catalog = StoreCatalog(tmp_path / "stores.db")
+    assert ids(catalog.nearby(*CORDOBA, radius=5)) == ["1"]
+    catalog.close()
+
+
+@pytest.mark.parametrize("models", [False, True])
+def test_client_fills_the_catalog(refresh_tokens_response, catalog, models):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        json={"items": [located_item(1, 37.90, -4.78)]},
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT) + "2",
+        json=located_item(2, 37.91, -4.78),
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_BUCKET_ENDPOINT),
+        json={"mobile_bucket": {"items": [located_item(3, 38.5, -4.78)]}},
+    )
+    client = TgtgClient(catalog=catalog, models=models, **tgtg_client_fake_tokens)
+
+    client.get_items()
+    client.get_item(2)
+    client.get_favorites()
+
+    assert ids(catalog.nearby(*CORDOBA, radius=5)) == ["1", "2"]
+    assert len(catalog) == 3
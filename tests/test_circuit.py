@@ -0,0 +1,111 @@
+from urllib.parse import urljoin
+
+import pytest
+import requests
+import responses
+from freezegun import freeze_time
+
+from tgtg import ACTIVE_ORDER_ENDPOINT, API_ITEM_ENDPOINT, BASE_URL, TgtgClient
+from tgtg.circuit import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, endpoint_family
+from tgtg.exceptions import TgtgAPIError, TgtgCircuitOpenError
+
+from .constants import tgtg_client_fake_tokens
+
+
+@pytest.fixture
+def transitions():
+    return []
+
+
+@pytest.fixture
+def breaker_client(refresh_tokens_response, transitions):
+    client = TgtgClient(
+        retry=None,
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=3,
+            recovery_time=30,
+            on_transition=lambda *transition: transitions.append(transition),
+        ),
+        **tgtg_client_fake_tokens,
+    )
+    client.login()
+    return client
+
+
+def item_calls():
+    items_url = urljoin(BASE_URL, API_ITEM_ENDPOINT)
+    return sum(call.request.url == items_url for call in responses.calls)
+
+
+def test_endpoint_family():
+    assert endpoint_family("auth/v5/authByEmail") == "auth"
+    assert endpoint_family("token/v1/refresh") == "auth"
+    assert endpoint_family("item/v8/42") == "item"
+    assert endpoint_family("user/favorite/v1/42/update") == "item"
+    assert endpoint_family("order/v8/active") == "order"
+    assert endpoint_family("discover/v1/bucket") == "bucket"
+
+
+def test_opens_after_failures(breaker_client, transitions):
+    responses.add(responses.POST, urljoin(BASE_URL, API_ITEM_ENDPOINT), status=503)
+    responses.add(
+        responses.POST, urljoin(BASE_URL, ACTIVE_ORDER_ENDPOINT), json={}, status=200
+    )
+    for _ in range(3):
+        with pytest.raises(TgtgAPIError):
+            breaker_client.get_items()
+    assert breaker_client.circuit_states() == {"item": OPEN}
+
+    with pytest.raises(TgtgCircuitOpenError):
+        breaker_client.get_items()
+    assert item_calls() == 3
+    # other families are not affected
+    assert breaker_client.get_active() == {}
+    assert transitions == [("item", CLOSED, OPEN)]
+
+
+def test_probe_after_recovery_time(breaker_client, transitions):
+    items_url = urljoin(BASE_URL, API_ITEM_ENDPOINT)
+    responses.add(responses.POST, items_url, body=requests.ConnectionError())
+    with freeze_time() as frozen:
+        for _ in range(3):
+            with pytest.raises(requests.ConnectionError):
+                breaker_client.get_items()
+
+        frozen.tick(31)
+        # failed probe: open again for a whole recovery time
+        with pytest.raises(requests.ConnectionError):
+            breaker_client.get_items()
+        with pytest.raises(TgtgCircuitOpenError):
+            breaker_client.get_items()
+
+        frozen.tick(31)
+        responses.replace(responses.POST, items_url, json={"items": []}, status=200)
+        assert breaker_client.get_items() == []
+        assert breaker_client.circuit_states() == {"item": CLOSED}
+
+    assert transitions == [
+        ("item", CLOSED, OPEN),
+        ("item", OPEN, HALF_OPEN),
+        ("item", HALF_OPEN, OPEN),
+        ("item", OPEN, HALF_OPEN),
+        ("item", HALF_OPEN, CLOSED),
+    ]
+
+
+def test_single_probe_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=30)
+    with freeze_time() as frozen:
+        breaker.record("item", 500)
+        frozen.tick(31)
+        assert breaker.allow("item")
+        assert not breaker.allow("item")
+        assert breaker.state("item") == HALF_OPEN
+
+
+def test_client_errors_do_not_count(breaker_client):
+    responses.add(responses.POST, urljoin(BASE_URL, API_ITEM_ENDPOINT), status=400)
+    for _ in range(5):
+        with pytest.raises(TgtgAPIError):
+            breaker_client.get_items()
+    assert breaker_client.circuit_states() == {}
@@ -0,0 +1,95 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tgtg import API_ITEM_ENDPOINT
+from tgtg.coalesce import SingleFlight
+from tgtg.exceptions import TgtgAPIError
+
+WORKERS = 8
+
+
+@pytest.fixture
+def make_client(make_client):
+    return functools.partial(make_client, thread_safe=True, max_workers=WORKERS)
+
+
+def item_requests(server):
+    return [
+        path for path, _, _ in server.requests if path.startswith(API_ITEM_ENDPOINT)
+    ]
+
+
+def concurrently(function, *args):
+    # all callers are started before the first request can be answered
+    barrier = threading.Barrier(WORKERS)
+
+    def call(arg):
+        barrier.wait()
+        return function(arg)
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        return list(executor.map(call, args))
+
+
+def test_concurrent_identical_calls_share_one_request(make_client, stub_server):
+    with stub_server(latency=0.2) as server:
+        client = make_client(server, coalesce=True)
+        items = concurrently(client.get_item, *[1] * WORKERS)
+
+    assert item_requests(server) == [f"{API_ITEM_ENDPOINT}1"]
+    assert all(item == items[0] for item in items)
+    # decoded for each caller, none sees what another one changes
+    assert len({id(item) for item in items}) == WORKERS
+    assert client.single_flight.stats() == {
+        "sent": 1,
+        "coalesced": WORKERS - 1,
+        "in_flight": 0,
+    }
+
+
+def test_different_calls_are_not_coalesced(make_client, stub_server):
+    with stub_server(latency=0.2) as server:
+        client = make_client(server, coalesce=True)
+        concurrently(client.get_item, *range(WORKERS))
+
+    assert len(item_requests(server)) == WORKERS
+    assert client.single_flight.stats()["coalesced"] == 0
+
+
+def test_coalescing_is_opt_in(make_client, stub_server):
+    with stub_server(latency=0.2) as server:
+        client = make_client(server)
+        concurrently(client.get_item, *[1] * WORKERS)
+
+    assert len(item_requests(server)) == WORKERS
+    assert client.single_flight is None
+
+
+def test_error_is_raised_to_every_caller(make_client, stub_server):
+    def fail(path, body):
+        return 400, {"errors": []}, {}
+
+    with stub_server({API_ITEM_ENDPOINT: fail}, latency=0.2) as server:
+        client = make_client(server, coalesce=True)
+        errors = concurrently(lambda item_id: catch(client.get_item, item_id), *[1] * 8)
+
+    assert len(item_requests(server)) == 1
+    assert all(isinstance(error, TgtgAPIError) for error in errors)
+
+
+def catch(function, *args):
+    try:
+        function(*args)
+    except TgtgAPIError as exc:
+        return exc
+
+
+def test_completed_calls_are_not_shared():
+    flight = SingleFlight()
+    results = [flight.do("key", lambda: object()) for _ in range(3)]
+
+    assert len(set(map(id, results))) == 3
+    assert flight.stats() == {"sent": 3, "coalesced": 0, "in_flight": 0}
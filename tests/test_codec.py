@@ -0,0 +1,65 @@
+import json
+from urllib.parse import urljoin
+
+import pytest
+import responses
+
+from tgtg import API_ITEM_ENDPOINT, BASE_URL, TgtgClient
+from tgtg.codec import JsonCodec, OrjsonCodec, default_codec
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+orjson = pytest.importorskip("orjson")
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), OrjsonCodec()], ids=lambda c: c.name)
+def test_codec_round_trip(codec):
+    payload = {"items": [make_item(1)], "unicode": "Córdoba"}
+    encoded = codec.dumps(payload)
+    assert isinstance(encoded, bytes)
+    assert json.loads(encoded) == payload
+    assert codec.loads(encoded) == payload
+    assert codec.loads(encoded.decode()) == payload
+
+
+def test_default_codec_prefers_orjson():
+    assert isinstance(default_codec(), OrjsonCodec)
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), OrjsonCodec()], ids=lambda c: c.name)
+def test_client_codec(codec, refresh_tokens_response):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        json={"items": [make_item(1)]},
+        status=200,
+    )
+    client = TgtgClient(codec=codec, **tgtg_client_fake_tokens)
+    assert client.get_items(favorites_only=False, latitude=1, longitude=2) == [
+        make_item(1)
+    ]
+    request = responses.calls[-1].request
+    assert isinstance(request.body, bytes)
+    assert json.loads(request.body)["origin"] == {"latitude": 1, "longitude": 2}
+    assert request.headers["content-type"] == "application/json; charset=utf-8"
+
+
+def test_custom_codec(refresh_tokens_response):
+    class CountingCodec(JsonCodec):
+        decoded = 0
+
+        def loads(self, content):
+            CountingCodec.decoded += 1
+            return super().loads(content)
+
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT) + "1",
+        json=make_item(1),
+        status=200,
+    )
+    client = TgtgClient(codec=CountingCodec(), **tgtg_client_fake_tokens)
+    client.login()
+    CountingCodec.decoded = 0
+    client.get_item(1)
+    assert CountingCodec.decoded == 1
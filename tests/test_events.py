@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from urllib.parse import urljoin
+
+import pytest
+import requests
+import responses
+
+from tgtg import (
+    API_ITEM_ENDPOINT,
+    AUTH_BY_EMAIL_ENDPOINT,
+    AUTH_POLLING_ENDPOINT,
+    BASE_URL,
+    ORDER_STATUS_ENDPOINT,
+    REFRESH_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.events import LatencyStats, RequestEvent, endpoint_name
+
+from .constants import tgtg_client_fake_tokens
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def observed_client(refresh_tokens_response, events):
+    return TgtgClient(
+        user_agent="test", listeners=[events.append], **tgtg_client_fake_tokens
+    )
+
+
+def test_endpoint_name():
+    assert endpoint_name("item/v8/") == "item/v8/"
+    assert endpoint_name("item/v8/64346") == "item/v8/{id}"
+    assert endpoint_name(ORDER_STATUS_ENDPOINT.format("1x2y")) == "order/v8/{id}/status"
+
+
+def test_request_events(observed_client, events):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        json={"items": []},
+        status=200,
+    )
+    observed_client.get_items()
+    observed_client.get_items()
+
+    refresh, first, second = events
+    assert refresh.endpoint == REFRESH_ENDPOINT
+    assert refresh.request_size > 0
+    assert (first.endpoint, first.status_code, first.retries) == (
+        API_ITEM_ENDPOINT,
+        200,
+        0,
+    )
+    assert first.refreshed and not second.refreshed
+    assert first.response_size == len(b'{"items": []}')
+    assert first.total >= first.ttfb >= 0
+    assert first.dns is None and first.error is None
+
+
+def test_retries_and_errors(observed_client, events, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    items_url = urljoin(BASE_URL, API_ITEM_ENDPOINT)
+    responses.add(responses.POST, items_url, status=429)
+    responses.add(responses.POST, items_url, body=requests.ConnectionError("down"))
+    responses.add(responses.POST, items_url, body=requests.ConnectionError("down"))
+
+    with pytest.raises(requests.ConnectionError):
+        observed_client.get_items()
+    event = events[-1]
+    assert event.attempts == 3 and event.retries == 2
+    assert event.status_code is None
+    assert isinstance(event.error, requests.ConnectionError)
+
+
+def test_failing_listener(observed_client, events, caplog):
+    def broken(event):
+        raise ValueError
+
+    observed_client.add_listener(broken)
+    observed_client.login()
+    observed_client.remove_listener(broken)
+    assert len(events) == 1
+    assert "listener" in caplog.text
+
+
+def test_latency_stats():
+    stats = LatencyStats(window=100)
+    for total in range(1, 201):
+        event = RequestEvent("item/v8/1", 0)
+        event.total = total / 1000
+        stats(event)
+    assert stats.report() == {
+        "item/v8/{id}": {"count": 100, "p50": 0.15, "p95": 0.195, "p99": 0.199}
+    }
+
+
+def test_login_messages_are_logged(caplog):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, AUTH_BY_EMAIL_ENDPOINT),
+        json={"state": "WAIT", "polling_id": "009350f7"},
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, AUTH_POLLING_ENDPOINT),
+        json={"access_token": "an_access_token", "refresh_token": "a_refresh_token"},
+        status=200,
+        headers={"set-cookie": "cookie"},
+    )
+    caplog.set_level(logging.INFO, logger="tgtg")
+    TgtgClient(email="test@example.com", user_agent="test").login()
+    assert caplog.messages == ["Logged in!"]
+
+
+def test_async_timings(stub_server):
+    pytest.importorskip("aiohttp")
+    from tgtg import AsyncTgtgClient
+
+    events = []
+
+    async def scenario(server):
+        async with AsyncTgtgClient(
+            url=server.url,
+            user_agent="test",
+            listeners=[events.append],
+            **tgtg_client_fake_tokens,
+        ) as client:
+            await client.get_item(1)
+
+    with stub_server(latency=0.05) as server:
+        asyncio.run(scenario(server))
+
+    refresh, item = events
+    assert item.endpoint == "item/v8/{id}"
+    assert item.status_code == 200 and item.refreshed
+    assert refresh.connect is not None and item.connect is None
+    assert item.total >= item.ttfb >= 0.05
@@ -0,0 +1,121 @@
+import csv
+import json
+
+import pytest
+
+from tgtg.export import CSV_FIELDS, export_orders
+
+from .stub_server import fake_order
+
+
+@pytest.fixture
+def server(stub_server):
+    with stub_server(catalog_size=3, history_size=45) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server, make_client):
+    return make_client(server)
+
+
+def exported_ids(path):
+    with open(path) as export_file:
+        return [json.loads(line)["order_id"] for line in export_file]
+
+
+def test_export_jsonl(server, client, tmp_path):
+    path = tmp_path / "orders.jsonl"
+    assert export_orders(client, path, page_size=10) == 45
+    assert exported_ids(path) == [f"h{index}" for index in range(45)]
+    with open(path) as export_file:
+        assert json.loads(export_file.readline()) == server.history[0]
+
+    # only newer orders on the next runs
+    assert export_orders(client, path, page_size=10) == 0
+    server.history[:0] = [
+        fake_order(f"n{index}", server.items["1"]) for index in range(12)
+    ]
+    assert export_orders(client, path, page_size=10) == 12
+    assert exported_ids(path)[45:] == [f"n{index}" for index in range(12)]
+
+
+def test_export_resumes(server, client, tmp_path, monkeypatch):
+    path = tmp_path / "orders.jsonl"
+    get_inactive = client.get_inactive
+    pages = []
+
+    def interrupted(page, page_size):
+        pages.append(page)
+        if len(pages) == 3:
+            raise KeyboardInterrupt
+        return get_inactive(page=page, page_size=page_size)
+
+    monkeypatch.setattr(client, "get_inactive", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        export_orders(client, path, page_size=10)
+    assert len(exported_ids(path)) == 20
+
+    # a new order shifts the pages, the page in progress is not written twice
+    server.history.insert(0, fake_order("n0", server.items["1"]))
+    monkeypatch.setattr(client, "get_inactive", get_inactive)
+    assert export_orders(client, path, page_size=10) == 25
+    assert exported_ids(path) == [f"h{index}" for index in range(45)]
+    assert export_orders(client, path, page_size=10) == 1
+
+
+def test_export_resumes_after_a_partial_write(server, client, tmp_path, monkeypatch):
+    path = tmp_path / "orders.jsonl"
+    get_inactive = client.get_inactive
+
+    def interrupt_at(page_number):
+        def interrupted(page, page_size):
+            if page == page_number:
+                raise KeyboardInterrupt
+            return get_inactive(page=page, page_size=page_size)
+
+        return interrupted
+
+    monkeypatch.setattr(client, "get_inactive", interrupt_at(2))
+    with pytest.raises(KeyboardInterrupt):
+        export_orders(client, path, page_size=10)
+    # killed in the middle of writing the next page
+    with open(path, "a") as export_file:
+        export_file.write('{"order_id": "h2')
+
+    # new orders push the exported ones to the page in progress, which adds nothing
+    server.history[:0] = [
+        fake_order(f"n{index}", server.items["1"]) for index in range(10)
+    ]
+    monkeypatch.setattr(client, "get_inactive", interrupt_at(3))
+    with pytest.raises(KeyboardInterrupt):
+        export_orders(client, path, page_size=10)
+    with open(f"{path}.checkpoint") as checkpoint_file:
+        assert json.load(checkpoint_file)["run"]["offset"] == path.stat().st_size
+
+    monkeypatch.setattr(client, "get_inactive", get_inactive)
+    export_orders(client, path, page_size=10)
+    assert exported_ids(path) == [f"h{index}" for index in range(45)]
+
+
+def test_export_csv_with_active_orders(client, tmp_path):
+    path = tmp_path / "orders.csv"
+    order_id = client.create_order("1", 1)["id"]
+    assert export_orders(client, path) == 46
+    assert export_orders(client, path) == 0
+
+    with open(path, newline="") as export_file:
+        rows = list(csv.DictReader(export_file))
+    assert tuple(rows[0]) == CSV_FIELDS
+    assert len(rows) == 46
+    assert rows[0]["order_id"] == order_id
+    assert rows[0]["state"] == "RESERVED"
+    assert rows[1]["order_id"] == "h0"
+    assert rows[1]["store_name"]
+    assert rows[1]["price"]
+    assert rows[1]["pickup_start"].startswith("20")
+
+
+def test_export_unknown_format(client, tmp_path):
+    with pytest.raises(ValueError):
+        export_orders(client, tmp_path / "orders.xml", file_format="xml")
@@ -0,0 +1,137 @@
+import tracemalloc
+
+import pytest
+
+from tgtg import TgtgAPIError, TgtgClient
+from tgtg.favorites import (
+    ADDED,
+    CHANGED,
+    REMOVED,
+    FavoritesSnapshot,
+    fingerprint,
+)
+from tgtg.models import Item
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+
+def favorites(count=3):
+    items = [make_item(str(index)) for index in range(count)]
+    for item in items:
+        item["display_name"] = f"Store {item['item']['item_id']}"
+    return items
+
+
+def test_first_poll_adds_everything():
+    snapshot = FavoritesSnapshot()
+    events = snapshot.update(favorites())
+    assert [(event.kind, event.item_id) for event in events] == [
+        (ADDED, "0"),
+        (ADDED, "1"),
+        (ADDED, "2"),
+    ]
+    assert str(events[0]) == "+ Store 0 (0): 2 available"
+    assert len(snapshot) == 3
+
+
+def test_changes():
+    snapshot = FavoritesSnapshot()
+    snapshot.update(favorites())
+    assert snapshot.update(favorites()) == []
+
+    items = favorites()
+    items[0]["items_available"] = 0
+    items[1]["item"]["item_price"] = {"code": "EUR", "minor_units": 399, "decimals": 2}
+    items[2]["display_name"] = "Renamed"  # not part of the fingerprint
+    events = snapshot.update(items)
+    assert [(event.kind, event.item_id) for event in events] == [
+        (CHANGED, "0"),
+        (CHANGED, "1"),
+    ]
+    assert events[0].changes == {"items_available": (2, 0)}
+    assert events[1].changes == {"price_minor_units": (499, 399)}
+    assert str(events[0]) == "~ Store 0 (0): items_available 2 -> 0"
+
+    events = snapshot.update(items[1:] + favorites(4)[3:])
+    assert [(event.kind, event.item_id) for event in events] == [
+        (ADDED, "3"),
+        (REMOVED, "0"),
+    ]
+    assert events[1].item is None
+    assert str(events[1]) == "- Store 0 (0)"
+
+
+def test_models():
+    snapshot = FavoritesSnapshot()
+    assert len(snapshot.update(Item.wrap(favorites()))) == 3
+    assert snapshot.update(Item.wrap(favorites())) == []
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "favorites.json"
+    assert len(FavoritesSnapshot.load(path)) == 0
+    snapshot = FavoritesSnapshot()
+    snapshot.update(favorites())
+    snapshot.save(path)
+
+    loaded = FavoritesSnapshot.load(path)
+    assert loaded.fingerprints() == snapshot.fingerprints()
+    assert loaded.update(favorites()[1:]) != []
+    assert [str(event) for event in loaded.update(favorites()[1:])] == []
+
+
+def test_unchanged_poll_does_not_allocate_per_item():
+    items = favorites(1000)
+    snapshot = FavoritesSnapshot()
+    snapshot.update(items)
+    snapshot.update(items)
+
+    tracemalloc.start()
+    snapshot.update(items)
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert allocated < 2048
+
+
+def test_fingerprint():
+    item = make_item("1")
+    assert fingerprint(item) == (
+        2,
+        499,
+        2,
+        "EUR",
+        item["pickup_interval"]["start"],
+        item["pickup_interval"]["end"],
+    )
+    assert fingerprint({}) == (0, None, None, None, None, None)
+
+
+def test_poll(stub_server):
+    with stub_server(catalog_size=30) as server:
+        client = TgtgClient(
+            url=server.url, user_agent="test", **tgtg_client_fake_tokens
+        )
+        snapshot = FavoritesSnapshot()
+        assert len(snapshot.poll(client, page_size=20)) == 30
+        assert snapshot.poll(client, page_size=20) == []
+
+        server.items["3"]["items_available"] = 0
+        client.set_favorite(7, False)
+        events = snapshot.poll(client, page_size=20)
+    assert [(event.kind, event.item_id) for event in events] == [
+        (CHANGED, "3"),
+        (REMOVED, "7"),
+    ]
+
+
+def test_failed_poll_keeps_snapshot():
+    class FailingClient:
+        def iter_favorites(self, **kwargs):
+            yield from favorites(2)
+            raise TgtgAPIError(500, "second page failed")
+
+    snapshot = FavoritesSnapshot()
+    with pytest.raises(TgtgAPIError):
+        snapshot.poll(FailingClient())
+    assert len(snapshot) == 0
+    assert [event.kind for event in snapshot.update(favorites(2))] == [ADDED, ADDED]
@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+
+# heavy modules that `import tgtg` must leave to the code using them
+DEFERRED_MODULES = (
+    "requests",
+    "urllib3",
+    "asyncio",
+    "concurrent.futures",
+    "aiohttp",
+    "orjson",
+    "uuid",
+    "random",
+    "email.utils",
+    "decimal",
+)
+# cumulative `-X importtime` of tgtg with a warm bytecode cache, it was about
+# 10 times more when requests was imported eagerly
+IMPORT_TIME_BUDGET_US = int(os.environ.get("TGTG_IMPORT_TIME_BUDGET_US", 80_000))
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def python(tmp_path, *args, code):
+    # -I -S: no site, so .pth files can't preload modules tgtg should defer,
+    # the search path is handed over explicitly instead
+    search_path = [ROOT] + [path for path in sys.path if path]
+    return subprocess.run(
+        [
+            sys.executable,
+            "-I",
+            "-S",
+            "-X",
+            f"pycache_prefix={tmp_path}",
+            *args,
+            "-c",
+            f"import sys; sys.path[:0] = {search_path!r}; {code}",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    )
+
+
+def test_import_defers_heavy_modules(tmp_path):
+    loaded = python(
+        tmp_path,
+        code="before = set(sys.modules); import tgtg; print(' '.join(set(sys.modules) - before))",
+    ).stdout.split()
+    assert [name for name in DEFERRED_MODULES if name in loaded] == []
+
+
+def test_import_time_budget(tmp_path):
+    python(tmp_path, code="import tgtg")  # fill the bytecode cache
+    timings = []
+    for _ in range(3):
+        stderr = python(tmp_path, "-X", "importtime", code="import tgtg").stderr
+        line = next(line for line in stderr.splitlines() if line.endswith("| tgtg"))
+        timings.append(int(line.split("|")[1]))
+    assert min(timings) < IMPORT_TIME_BUDGET_US
@@ -1,14 +1,21 @@
 import datetime
+import time
 from urllib.parse import urljoin
 
 import pytest
 import responses
 from freezegun import freeze_time
 
-from tgtg import BASE_URL, DEFAULT_ACCESS_TOKEN_LIFETIME, REFRESH_ENDPOINT, TgtgClient
+from tgtg import (
+    ACTIVE_ORDER_ENDPOINT,
+    BASE_URL,
+    DEFAULT_ACCESS_TOKEN_LIFETIME,
+    REFRESH_ENDPOINT,
+    TgtgClient,
+)
 from tgtg.exceptions import TgtgAPIError
 
-from .constants import tgtg_client_fake_tokens
+from .constants import make_jwt, tgtg_client_fake_tokens
 
 
 def test_login_with_tokens():
@@ -95,3 +102,92 @@ def test_get_credentials(client):
         "cookie": "sweet sweet cookie",
         "refresh_token": "a_refresh_token",
     }
+
+
+def test_headers_cached_until_tokens_change(client):
+    headers = client._headers
+    assert client._headers is headers
+
+    client.login()
+    assert client._headers is not headers
+    assert client._headers["authorization"] == "Bearer an_access_token"
+    assert client._headers["Cookie"] == "sweet sweet cookie"
+
+
+def test_requests_use_refreshed_headers(client):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, ACTIVE_ORDER_ENDPOINT),
+        json={"orders": []},
+        status=200,
+    )
+    client.get_active()
+
+    active_call = responses.calls[-1]
+    assert active_call.request.headers["authorization"] == "Bearer an_access_token"
+    assert active_call.request.headers["Cookie"] == "sweet sweet cookie"
+
+
+def test_refresh_token_older_than_a_day(client):
+    client.login()
+    responses.replace(
+        responses.POST,
+        urljoin(BASE_URL, REFRESH_ENDPOINT),
+        json={"access_token": "new_access_token", "refresh_token": "new_token"},
+        status=200,
+        headers={"set-cookie": "sweet sweet cookie"},
+    )
+
+    with freeze_time(datetime.datetime.now() + datetime.timedelta(days=1, seconds=10)):
+        client.login()
+        assert client.access_token == "new_access_token"
+
+
+def test_jwt_expiry_without_request():
+    now = datetime.datetime.now()
+    client = TgtgClient(
+        access_token=make_jwt(now + datetime.timedelta(minutes=10)),
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="test",
+    )
+    assert client.access_token_expires_at == now.replace(
+        microsecond=0
+    ) + datetime.timedelta(minutes=10)
+
+    client.login()
+    assert len(responses.calls) == 0
+
+
+def test_expired_jwt_is_refreshed(refresh_tokens_response):
+    client = TgtgClient(
+        access_token=make_jwt(datetime.datetime.now() - datetime.timedelta(minutes=1)),
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="test",
+        last_time_token_refreshed=datetime.datetime.now(),
+    )
+    client.login()
+    assert client.access_token == "an_access_token"
+    assert len(responses.calls) == 1
+
+
+def test_background_refresh(refresh_tokens_response):
+    client = TgtgClient(
+        access_token=make_jwt(datetime.datetime.now() + datetime.timedelta(seconds=3)),
+        refresh_token="refresh_token",
+        cookie="cookie",
+        user_agent="test",
+        refresh_lead_time=1.5,
+        background_refresh=True,
+    )
+    try:
+        for _ in range(30):
+            if client.access_token == "an_access_token":
+                break
+            time.sleep(0.1)
+        assert client.access_token == "an_access_token"
+        assert client._token_is_fresh()
+    finally:
+        client.close()
+    assert len(responses.calls) == 1
@@ -0,0 +1,155 @@
+import datetime
+import json
+import tracemalloc
+from decimal import Decimal
+from urllib.parse import urljoin
+
+import responses
+
+from tgtg import (
+    API_ITEM_ENDPOINT,
+    BASE_URL,
+    CREATE_ORDER_ENDPOINT,
+    INACTIVE_ORDER_ENDPOINT,
+    TgtgClient,
+    _decode_models,
+)
+from tgtg.models import Item, Order, PickupInterval, Price, Store
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+
+def test_item():
+    raw = make_item()
+    item = Item(raw)
+
+    assert item.raw is raw
+    assert item.item_id == "64346"
+    assert item.display_name == "Ecofamily Bufé - Centro"
+    assert item.items_available == 2
+    assert item.price == Price({"code": "EUR", "minor_units": 499, "decimals": 2})
+    assert item.price.amount == Decimal("4.99")
+    assert str(item.value) == "15.00 EUR"
+    assert item.pickup_interval.start == datetime.datetime(
+        2022, 11, 4, 11, tzinfo=datetime.timezone.utc
+    )
+    assert item.store.store_id == "64346s"
+    assert item.store.location == (37.894249, -4.776045)
+    assert item.store.address.startswith("Av. de los Piconeros")
+
+
+def test_nested_models_are_lazy():
+    item = Item(make_item())
+    assert Item.__slots__ and not hasattr(item, "__dict__")
+    assert item._store is not item.store
+    assert item.store is item.store
+    assert isinstance(item.store, Store)
+    assert isinstance(item.pickup_interval, PickupInterval)
+
+
+def test_item_from_source():
+    raw = make_item()
+    source = json.dumps(raw).encode()
+    item = Item(raw, source)
+    del raw["item"]
+
+    # only the text and the top-level values are kept
+    assert item._raw is None
+    assert (item.item_id, item.display_name, item.items_available) == (
+        "64346",
+        "Ecofamily Bufé - Centro",
+        2,
+    )
+    assert item.store.store_id == "64346s"
+    assert item.price.amount == Decimal("4.99")
+    assert item._raw is None
+    assert item.raw == json.loads(source)
+    assert item._source is None
+
+
+def test_items_from_source_take_less_memory():
+    body = json.dumps({"items": [make_item(index) for index in range(200)]}).encode()
+
+    def held(decode):
+        tracemalloc.start()
+        result = decode(body)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del result
+        return size
+
+    dicts = held(json.loads)
+    models = held(lambda body: _decode_models(body, ("items",), Item))
+    assert models < dicts * 0.75
+
+
+def test_missing_fields():
+    item = Item({"item": {"item_id": "1"}})
+    assert item.store is None
+    assert item.price is None
+    assert item.pickup_interval is None
+    assert Item.wrap(None) is None
+
+
+def test_order():
+    order = Order(
+        {
+            "order_id": "42",
+            "state": "REDEEMED",
+            "quantity": 1,
+            "price_including_taxes": {"code": "EUR", "minor_units": 350, "decimals": 2},
+            "pickup_interval": {"start": "2023-01-01T10:00:00Z", "end": None},
+        }
+    )
+    assert order.order_id == "42"
+    assert order.price.amount == Decimal("3.50")
+    assert order.pickup_interval.end is None
+
+    created = Order({"id": "43", "order_line": {"quantity": 2}})
+    assert created.order_id == "43"
+    assert created.quantity == 2
+
+
+def test_client_models(refresh_tokens_response):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        json={"items": [make_item(1), make_item(2)]},
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT) + "1",
+        json=make_item(1),
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, CREATE_ORDER_ENDPOINT) + "1",
+        json={"state": "SUCCESS", "order": {"id": "42", "state": "RESERVED"}},
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, INACTIVE_ORDER_ENDPOINT),
+        json={"orders": [{"order_id": "40"}], "has_more": False},
+        status=200,
+    )
+    client = TgtgClient(models=True, **tgtg_client_fake_tokens)
+
+    items = client.get_items()
+    assert [item.item_id for item in items] == ["1", "2"]
+    assert items[0]._raw is None and items[0].raw == make_item(1)
+    assert client.get_item(1) == Item(make_item(1))
+    assert client.create_order(1, 1).order_id == "42"
+    assert [order.order_id for order in client.iter_inactive()] == ["40"]
+
+
+def test_client_without_models(client):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        body=json.dumps({"items": [make_item(1)]}),
+        status=200,
+    )
+    assert client.get_items() == [make_item(1)]
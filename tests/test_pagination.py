@@ -0,0 +1,98 @@
+import json
+from urllib.parse import urljoin
+
+import pytest
+import responses
+
+from tgtg import (
+    API_BUCKET_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    BASE_URL,
+    INACTIVE_ORDER_ENDPOINT,
+)
+
+
+def paged_callback(pages, wrap):
+    def callback(request):
+        body = json.loads(request.body)
+        page = body["page"] if "page" in body else body["paging"]["page"]
+        return 200, {}, json.dumps(wrap(pages.get(page, []), page, pages))
+
+    return callback
+
+
+def request_pages(endpoint):
+    pages = []
+    for call in responses.calls:
+        if endpoint in call.request.url:
+            body = json.loads(call.request.body)
+            pages.append(body["page"] if "page" in body else body["paging"]["page"])
+    return pages
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_items(client, prefetch):
+    pages = {1: [{"id": 1}, {"id": 2}], 2: [{"id": 3}, {"id": 4}], 3: [{"id": 5}]}
+    responses.add_callback(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        paged_callback(pages, lambda items, page, pages: {"items": items}),
+    )
+
+    items = list(client.iter_items(page_size=2, prefetch=prefetch))
+    assert [item["id"] for item in items] == [1, 2, 3, 4, 5]
+    assert request_pages(API_ITEM_ENDPOINT) == [1, 2, 3]
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_favorites(client, prefetch):
+    pages = {0: [{"id": 1}, {"id": 2}], 1: [{"id": 3}, {"id": 4}]}
+    responses.add_callback(
+        responses.POST,
+        urljoin(BASE_URL, API_BUCKET_ENDPOINT),
+        paged_callback(
+            pages, lambda items, page, pages: {"mobile_bucket": {"items": items}}
+        ),
+    )
+
+    items = list(client.iter_favorites(page_size=2, prefetch=prefetch))
+    assert [item["id"] for item in items] == [1, 2, 3, 4]
+    # the last page is only known to be the last one once it comes back empty
+    assert request_pages(API_BUCKET_ENDPOINT) == [0, 1, 2]
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_inactive(client, prefetch):
+    pages = {0: [{"id": 1}, {"id": 2}], 1: [{"id": 3}, {"id": 4}]}
+    responses.add_callback(
+        responses.POST,
+        urljoin(BASE_URL, INACTIVE_ORDER_ENDPOINT),
+        paged_callback(
+            pages,
+            lambda orders, page, pages: {
+                "orders": orders,
+                "has_more": page + 1 in pages,
+            },
+        ),
+    )
+
+    orders = list(client.iter_inactive(page_size=2, prefetch=prefetch))
+    assert [order["id"] for order in orders] == [1, 2, 3, 4]
+    assert request_pages(INACTIVE_ORDER_ENDPOINT) == [0, 1]
+
+
+def test_iter_stops_when_consumer_stops(client):
+    pages = {page: [{"id": page}] for page in range(100)}
+    responses.add_callback(
+        responses.POST,
+        urljoin(BASE_URL, INACTIVE_ORDER_ENDPOINT),
+        paged_callback(
+            pages,
+            lambda orders, page, pages: {"orders": orders, "has_more": True},
+        ),
+    )
+
+    for order in client.iter_inactive(page_size=1):
+        if order["id"] == 3:
+            break
+    assert request_pages(INACTIVE_ORDER_ENDPOINT) == [0, 1, 2, 3]
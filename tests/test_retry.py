@@ -0,0 +1,159 @@
+import datetime
+from email.utils import format_datetime
+from urllib.parse import urljoin
+
+import pytest
+import requests
+import responses
+
+from tgtg import (
+    API_ITEM_ENDPOINT,
+    AUTH_BY_EMAIL_ENDPOINT,
+    AUTH_POLLING_ENDPOINT,
+    BASE_URL,
+    CREATE_ORDER_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.exceptions import TgtgAPIError
+from tgtg.retry import RetryPolicy, parse_retry_after
+
+from .constants import tgtg_client_fake_tokens
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+    return sleeps
+
+
+def items_url():
+    return urljoin(BASE_URL, API_ITEM_ENDPOINT)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    in_a_minute = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        minutes=1
+    )
+    assert 55 < parse_retry_after(format_datetime(in_a_minute, usegmt=True)) <= 60
+
+
+def test_policy_delay():
+    policy = RetryPolicy(max_attempts=3, max_elapsed=10, backoff=1, max_backoff=3)
+    assert policy.delay(1, 0, idempotent=False, status_code=503) is None
+    assert policy.delay(1, 0, idempotent=False, status_code=429) is None
+    assert 0 <= policy.delay(1, 0, False, 429, retry_throttled=True) <= 1
+    assert policy.delay(1, 0, idempotent=True, status_code=400) is None
+    assert 0 <= policy.delay(2, 0, idempotent=True, status_code=503) <= 2
+    assert policy.delay(3, 0, idempotent=True, status_code=503) is None
+    assert 4 <= policy.delay(1, 0, True, 429, {"Retry-After": "4"}) <= 5
+    assert policy.delay(1, 8, True, 429, {"Retry-After": "4"}) is None
+    assert RetryPolicy(retry_non_idempotent=True).delay(1, 0, False, 503) is not None
+
+
+def test_retry_after_429(client, sleeps):
+    responses.add(responses.POST, items_url(), status=429, headers={"Retry-After": "2"})
+    responses.add(responses.POST, items_url(), json={"items": []}, status=200)
+
+    assert client.get_items() == []
+    assert (
+        len([call for call in responses.calls if call.request.url == items_url()]) == 2
+    )
+    assert len(sleeps) == 1 and sleeps[0] >= 2
+
+
+def test_gives_up_after_max_attempts(refresh_tokens_response, sleeps):
+    responses.add(responses.POST, items_url(), status=503)
+    client = TgtgClient(retry=RetryPolicy(max_attempts=4), **tgtg_client_fake_tokens)
+
+    with pytest.raises(TgtgAPIError) as error:
+        client.get_items()
+    assert error.value.args[0] == 503
+    assert len(sleeps) == 3
+
+
+def test_retries_connection_errors(client, sleeps):
+    responses.add(responses.POST, items_url(), body=requests.ConnectionError())
+    responses.add(responses.POST, items_url(), json={"items": []}, status=200)
+
+    assert client.get_items() == []
+    assert len(sleeps) == 1
+
+
+def test_no_retry_for_orders(client, sleeps):
+    url = urljoin(BASE_URL, CREATE_ORDER_ENDPOINT) + "1"
+    responses.add(responses.POST, url, status=503)
+
+    with pytest.raises(TgtgAPIError):
+        client.create_order(1, 1)
+    assert [call.request.url for call in responses.calls].count(url) == 1
+    assert sleeps == []
+
+
+def test_no_retry_for_throttled_orders(client, sleeps):
+    url = urljoin(BASE_URL, CREATE_ORDER_ENDPOINT) + "1"
+    responses.add(responses.POST, url, status=429, headers={"Retry-After": "1"})
+
+    with pytest.raises(TgtgAPIError):
+        client.create_order(1, 1)
+    assert [call.request.url for call in responses.calls].count(url) == 1
+    assert sleeps == []
+
+
+def test_retry_disabled(refresh_tokens_response, sleeps):
+    responses.add(responses.POST, items_url(), status=503)
+    client = TgtgClient(retry=None, **tgtg_client_fake_tokens)
+
+    with pytest.raises(TgtgAPIError):
+        client.get_items()
+    assert sleeps == []
+
+
+def test_login_retries_429(sleeps):
+    login_url = urljoin(BASE_URL, AUTH_BY_EMAIL_ENDPOINT)
+    responses.add(responses.POST, login_url, status=429, headers={"Retry-After": "1"})
+    responses.add(
+        responses.POST,
+        login_url,
+        json={"state": "WAIT", "polling_id": "009350f7"},
+        status=200,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, AUTH_POLLING_ENDPOINT),
+        json={"access_token": "an_access_token", "refresh_token": "a_refresh_token"},
+        status=200,
+        headers={"set-cookie": "cookie"},
+    )
+    client = TgtgClient(email="test@example.com", user_agent="test")
+
+    client.login()
+    assert client.access_token == "an_access_token"
+    assert [call.request.url for call in responses.calls].count(login_url) == 2
+    assert len(sleeps) == 1 and sleeps[0] >= 1
+
+
+def test_polling_retries_429(sleeps):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, AUTH_BY_EMAIL_ENDPOINT),
+        json={"state": "WAIT", "polling_id": "009350f7"},
+        status=200,
+    )
+    polling_url = urljoin(BASE_URL, AUTH_POLLING_ENDPOINT)
+    responses.add(responses.POST, polling_url, status=429, headers={"Retry-After": "1"})
+    responses.add(
+        responses.POST,
+        polling_url,
+        json={"access_token": "an_access_token", "refresh_token": "a_refresh_token"},
+        status=200,
+        headers={"set-cookie": "cookie"},
+    )
+    client = TgtgClient(email="test@example.com", user_agent="test")
+
+    client.login()
+    assert client.access_token == "an_access_token"
+    assert len(sleeps) == 1
@@ -0,0 +1,178 @@
+import datetime
+import http.server
+import json
+import threading
+from urllib.parse import urljoin
+
+import pytest
+import responses
+from urllib3.response import HTTPResponse
+
+from tgtg import (
+    API_BUCKET_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    BASE_URL,
+    INACTIVE_ORDER_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.exceptions import TgtgAPIError
+from tgtg.models import Order
+from tgtg.stream import JsonStream
+
+from .constants import make_item, tgtg_client_fake_tokens
+
+
+def decode(document, path, chunk_size, sources=False):
+    raw = json.dumps(document, ensure_ascii=False).encode()
+    stream = JsonStream(path, sources)
+    elements = []
+    for start in range(0, len(raw), chunk_size):
+        elements += stream.feed(raw[start:][:chunk_size])
+    return elements + stream.close(), stream.rest
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000, 100000])
+def test_json_stream(chunk_size):
+    items = [make_item(str(index)) for index in range(20)]
+    items[3]["display_name"] = "Café « Bäckerei » 🥐"
+    document = {
+        "mobile_bucket": {"filler_type": "Favorites", "items": items, "total": 20.5},
+        "has_more": True,
+    }
+    elements, rest = decode(document, ("mobile_bucket", "items"), chunk_size)
+    assert elements == items
+    assert rest == {
+        "mobile_bucket": {"filler_type": "Favorites", "total": 20.5},
+        "has_more": True,
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100000])
+def test_json_stream_sources(chunk_size):
+    items = [make_item(str(index)) for index in range(3)]
+    items[1]["display_name"] = "Café « Bäckerei » 🥐"
+    elements, _ = decode({"items": items, "more": 12}, ("items",), chunk_size, True)
+    assert [element for element, _ in elements] == items
+    assert [json.loads(source) for _, source in elements] == items
+    assert elements[1][1] == json.dumps(items[1], ensure_ascii=False).encode()
+
+
+def test_json_stream_returns_complete_elements_only():
+    stream = JsonStream(("items",))
+    assert stream.feed(b'{"items": [{"a": 1}, {"a": 2}, 12') == [{"a": 1}, {"a": 2}]
+    assert stream.feed(b"3") == []
+    assert stream.feed(b"]}") == [123]
+    assert stream.close() == []
+
+
+@pytest.mark.parametrize(
+    "document, rest",
+    [
+        ({}, {}),
+        ({"items": None}, {"items": None}),
+        ({"items": {"a": 1}}, {"items": {"a": 1}}),
+        ({"items": []}, {}),
+    ],
+)
+def test_json_stream_without_elements(document, rest):
+    assert decode(document, ("items",), 3) == ([], rest)
+
+
+@pytest.mark.parametrize(
+    "body", [b'{"items": [1, 2', b'{"items": [1, 2}', b'{"items": []} {}', b"[]"]
+)
+def test_json_stream_invalid(body):
+    stream = JsonStream(("items",))
+    with pytest.raises(ValueError):
+        stream.feed(body)
+        stream.close()
+
+
+def test_get_items_stream(client):
+    items = [make_item(str(index)) for index in range(30)]
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_ITEM_ENDPOINT),
+        json={"items": items},
+        status=200,
+    )
+    stream = client.get_items(page_size=30, stream=True)
+    assert not [
+        call for call in responses.calls if API_ITEM_ENDPOINT in call.request.url
+    ]
+    assert list(stream) == items
+
+
+def test_get_favorites_stream(client):
+    items = [make_item(str(index)) for index in range(3)]
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, API_BUCKET_ENDPOINT),
+        json={"mobile_bucket": {"filler_type": "Favorites", "items": items}},
+        status=200,
+    )
+    assert list(client.get_favorites(stream=True)) == items
+
+
+def test_get_inactive_stream_models(refresh_tokens_response):
+    client = TgtgClient(models=True, **tgtg_client_fake_tokens)
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, INACTIVE_ORDER_ENDPOINT),
+        json={"orders": [{"order_id": "1"}, {"order_id": "2"}], "has_more": False},
+        status=200,
+    )
+    orders = list(client.get_inactive(stream=True))
+    assert orders == [Order({"order_id": "1"}), Order({"order_id": "2"})]
+
+
+def test_stream_fail(client):
+    responses.add(
+        responses.POST, urljoin(BASE_URL, API_ITEM_ENDPOINT), json={}, status=400
+    )
+    with pytest.raises(TgtgAPIError):
+        list(client.get_items(stream=True))
+
+
+@pytest.mark.withoutresponses
+@pytest.mark.skipif(
+    not hasattr(HTTPResponse, "read1"), reason="urllib3 < 2 reads whole chunks"
+)
+def test_first_item_before_whole_body():
+    rest_sent = threading.Event()
+    release = threading.Event()
+    first, second = json.dumps(make_item("1")), json.dumps(make_item("2"))
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(f'{{"items": [{first},'.encode())
+            self.wfile.flush()
+            release.wait(5)
+            self.wfile.write(f"{second}]}}".encode())
+            rest_sent.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = TgtgClient(
+            url=f"http://127.0.0.1:{server.server_port}/api/",
+            user_agent="test",
+            last_time_token_refreshed=datetime.datetime.now(),
+            **tgtg_client_fake_tokens,
+        )
+        stream = client.get_items(stream=True)
+        assert next(stream)["item"]["item_id"] == "1"
+        assert not rest_sent.is_set()
+        release.set()
+        assert [item["item"]["item_id"] for item in stream] == ["2"]
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,73 @@
+import pytest
+
+from tgtg import AUTH_POLLING_ENDPOINT, TgtgClient
+from tgtg.exceptions import TgtgAPIError
+from tgtg.retry import RetryPolicy
+
+from .constants import tgtg_client_fake_tokens
+
+
+def test_full_session(monkeypatch, stub_server):
+    monkeypatch.setattr("tgtg.POLLING_WAIT_TIME", 0)
+    with stub_server(catalog_size=30, history_size=45, polling_pending=2) as server:
+        client = TgtgClient(url=server.url, email="test@example.com", user_agent="test")
+
+        assert client.get_credentials()["access_token"] == "an_access_token"
+        polls = [path for path, _, _ in server.requests].count(AUTH_POLLING_ENDPOINT)
+        assert polls == 3
+
+        assert len(client.get_items(page_size=20)) == 20
+        assert len(client.get_items(page_size=20, page=2)) == 10
+        client.set_favorite(3, False)
+        assert len(list(client.iter_favorites(page_size=10))) == 29
+
+        item_id = next(
+            item["item"]["item_id"]
+            for item in client.get_items(page_size=30)
+            if item["items_available"]
+        )
+        order = client.create_order(item_id, 1)
+        assert client.get_order_status(order["id"])["state"] == "RESERVED"
+        assert [o["order_id"] for o in client.get_active()["orders"]] == [order["id"]]
+        client.abort_order(order["id"])
+        assert client.get_active()["orders"] == []
+
+        history = list(client.iter_inactive(page_size=20))
+        assert len(history) == 45
+        assert {order["state"] for order in history} == {"REDEEMED"}
+
+
+def test_payload_sizes(stub_server):
+    with stub_server(catalog_size=20) as server:
+        client = TgtgClient(
+            url=server.url,
+            user_agent="test",
+            **tgtg_client_fake_tokens,
+        )
+        events = []
+        client.add_listener(events.append)
+        client.get_items(page_size=20)
+    # a real page of 20 items is around 40 KiB
+    assert events[-1].response_size > 30_000
+
+
+def test_injected_faults(monkeypatch, stub_server):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    with stub_server(throttle_rate=0.5, retry_after=0, seed=3) as server:
+        client = TgtgClient(
+            url=server.url,
+            user_agent="test",
+            **tgtg_client_fake_tokens,
+            retry=RetryPolicy(max_attempts=20, retry_non_idempotent=True),
+        )
+        for _ in range(10):
+            assert client.get_active() == {"orders": []}
+        assert len(server.requests) > 11
+
+    with stub_server(error_rate=1) as server:
+        client = TgtgClient(
+            url=server.url, user_agent="test", retry=None, **tgtg_client_fake_tokens
+        )
+        with pytest.raises(TgtgAPIError) as error:
+            client.get_active()
+        assert error.value.args[0] == 500
@@ -0,0 +1,79 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import pytest
+import responses
+
+from tgtg import ACTIVE_ORDER_ENDPOINT, BASE_URL, REFRESH_ENDPOINT, TgtgClient
+from tgtg.exceptions import TgtgAPIError
+
+from .constants import tgtg_client_fake_tokens
+
+WORKERS = 8
+
+
+def slow_refresh(status):
+    def callback(request):
+        time.sleep(0.1)
+        return (
+            status,
+            {"set-cookie": "sweet sweet cookie"},
+            '{"access_token": "an_access_token", "refresh_token": "a_refresh_token"}',
+        )
+
+    return callback
+
+
+def count_calls(endpoint):
+    return len([call for call in responses.calls if endpoint in call.request.url])
+
+
+@pytest.fixture
+def thread_safe_client():
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, ACTIVE_ORDER_ENDPOINT),
+        json={"orders": []},
+        status=200,
+    )
+    return TgtgClient(thread_safe=True, max_workers=WORKERS, **tgtg_client_fake_tokens)
+
+
+def test_single_refresh_for_concurrent_calls(thread_safe_client):
+    responses.add_callback(
+        responses.POST, urljoin(BASE_URL, REFRESH_ENDPOINT), slow_refresh(200)
+    )
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        results = list(
+            executor.map(lambda _: thread_safe_client.get_active(), range(WORKERS * 4))
+        )
+
+    assert results == [{"orders": []}] * WORKERS * 4
+    assert count_calls(REFRESH_ENDPOINT) == 1
+    for call in responses.calls:
+        if ACTIVE_ORDER_ENDPOINT in call.request.url:
+            assert call.request.headers["authorization"] == "Bearer an_access_token"
+            assert call.request.headers["Cookie"] == "sweet sweet cookie"
+
+
+def test_waiting_threads_share_refresh_error(thread_safe_client):
+    responses.add_callback(
+        responses.POST, urljoin(BASE_URL, REFRESH_ENDPOINT), slow_refresh(500)
+    )
+
+    def get_active(_):
+        with pytest.raises(TgtgAPIError):
+            thread_safe_client.get_active()
+
+    with ThreadPoolExecutor(WORKERS) as executor:
+        list(executor.map(get_active, range(WORKERS)))
+
+    assert count_calls(REFRESH_ENDPOINT) == 1
+    assert count_calls(ACTIVE_ORDER_ENDPOINT) == 0
+
+
+def test_pool_sized_to_workers(thread_safe_client):
+    adapter = thread_safe_client.session.get_adapter(BASE_URL)
+    assert adapter._pool_maxsize == WORKERS
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from tgtg import (
+    ACTIVE_ORDER_ENDPOINT,
+    API_BUCKET_ENDPOINT,
+    API_ITEM_ENDPOINT,
+    DEFAULT_TIMEOUT,
+    REFRESH_ENDPOINT,
+    TgtgClient,
+)
+from tgtg.exceptions import TgtgAPIError, TgtgTimeoutError
+from tgtg.retry import RetryPolicy
+
+from .constants import tgtg_client_fake_tokens
+
+
+def test_default_timeouts():
+    client = TgtgClient(user_agent="test")
+    assert client.timeout == DEFAULT_TIMEOUT
+    assert client._endpoint_timeout(ACTIVE_ORDER_ENDPOINT) == DEFAULT_TIMEOUT
+    assert client._endpoint_timeout(API_ITEM_ENDPOINT)[1] > DEFAULT_TIMEOUT[1]
+
+
+def test_explicit_timeout_applies_to_every_endpoint():
+    for timeout in (2, (1, 5), None):
+        client = TgtgClient(user_agent="test", timeout=timeout)
+        assert client._endpoint_timeout(API_ITEM_ENDPOINT) == timeout
+        assert client._endpoint_timeout(ACTIVE_ORDER_ENDPOINT) == timeout
+
+    client = TgtgClient(
+        user_agent="test", timeout=2, endpoint_timeouts={API_ITEM_ENDPOINT: (1, 20)}
+    )
+    assert client._endpoint_timeout(API_ITEM_ENDPOINT) == (1, 20)
+    assert client._endpoint_timeout(API_BUCKET_ENDPOINT) == 2
+
+
+def test_endpoint_timeout(make_client, stub_server):
+    with stub_server(latency={API_ITEM_ENDPOINT: 0.5}) as server:
+        client = make_client(
+            server, retry=None, endpoint_timeouts={API_ITEM_ENDPOINT: (1, 0.1)}
+        )
+        with pytest.raises(TgtgTimeoutError):
+            client.get_items()
+        assert client.get_active() == {"orders": []}
+
+
+def test_deadline_covers_retries(make_client, stub_server):
+    routes = {ACTIVE_ORDER_ENDPOINT: lambda path, body: (503, {}, {})}
+    with stub_server(routes) as server:
+        client = make_client(
+            server, retry=RetryPolicy(max_attempts=100, backoff=0.1), deadline=0.5
+        )
+        start = time.perf_counter()
+        with pytest.raises(TgtgAPIError):
+            client.get_active()
+        assert time.perf_counter() - start < 0.6
+
+
+def test_deadline_covers_refresh(stub_server):
+    with stub_server(latency={REFRESH_ENDPOINT: 1}) as server:
+        client = TgtgClient(
+            url=server.url, user_agent="test", deadline=0.3, **tgtg_client_fake_tokens
+        )
+        start = time.perf_counter()
+        with pytest.raises(TgtgTimeoutError):
+            client.get_active()
+        assert time.perf_counter() - start < 0.6
+
+
+def test_async_deadline(stub_server):
+    pytest.importorskip("aiohttp")
+    from tgtg import AsyncTgtgClient
+
+    async def scenario(server):
+        async with AsyncTgtgClient(
+            url=server.url,
+            user_agent="test",
+            deadline=0.3,
+            **tgtg_client_fake_tokens,
+        ) as client:
+            await client.get_active()
+
+    with stub_server(latency={ACTIVE_ORDER_ENDPOINT: 1}) as server:
+        start = time.perf_counter()
+        with pytest.raises(TgtgTimeoutError):
+            asyncio.run(scenario(server))
+        assert time.perf_counter() - start < 0.6
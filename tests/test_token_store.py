@@ -0,0 +1,113 @@
+import datetime
+import os
+from urllib.parse import urljoin
+
+import pytest
+import responses
+
+from tgtg import BASE_URL, REFRESH_ENDPOINT, TgtgClient
+from tgtg.token_store import FileTokenStore, SQLiteTokenStore, TokenStore
+
+from .constants import tgtg_client_fake_tokens
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def token_store(request, tmp_path):
+    if request.param == "file":
+        return FileTokenStore(tmp_path / "tokens.json")
+    return SQLiteTokenStore(tmp_path / "tokens.db")
+
+
+def count_refresh_calls():
+    return len(
+        [call for call in responses.calls if REFRESH_ENDPOINT in call.request.url]
+    )
+
+
+def test_round_trip(token_store):
+    assert token_store.load() is None
+
+    credentials = {
+        "access_token": "access",
+        "refresh_token": "refresh",
+        "cookie": "cookie",
+        "last_time_token_refreshed": datetime.datetime(2024, 1, 2, 3, 4, 5),
+    }
+    token_store.save(credentials)
+    assert token_store.load() == credentials
+
+    token_store.save({**credentials, "refresh_token": "rotated"})
+    assert token_store.load()["refresh_token"] == "rotated"
+
+
+def test_file_store_leaves_no_temporary_file(tmp_path):
+    FileTokenStore(tmp_path / "tokens.json").save({"refresh_token": "refresh"})
+    assert os.listdir(tmp_path) == ["tokens.json"]
+
+
+@pytest.mark.parametrize("content", ["", '{"refresh_token": "ref', "[]"])
+def test_file_store_corrupt_file(tmp_path, caplog, content):
+    path = tmp_path / "tokens.json"
+    path.write_text(content)
+
+    assert FileTokenStore(path).load() is None
+    assert "unreadable token file" in caplog.text
+
+
+def test_token_store_is_abstract():
+    class Incomplete(TokenStore):
+        def load(self):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_sqlite_store_keys(tmp_path):
+    path = tmp_path / "tokens.db"
+    SQLiteTokenStore(path, key="alice").save({"refresh_token": "alice"})
+    SQLiteTokenStore(path, key="bob").save({"refresh_token": "bob"})
+
+    assert SQLiteTokenStore(path, key="alice").load() == {"refresh_token": "alice"}
+    assert SQLiteTokenStore(path, key="bob").load() == {"refresh_token": "bob"}
+
+
+def test_refresh_is_saved(refresh_tokens_response, token_store):
+    client = TgtgClient(token_store=token_store, **tgtg_client_fake_tokens)
+    client.login()
+
+    stored = token_store.load()
+    assert stored["access_token"] == "an_access_token"
+    assert stored["refresh_token"] == "a_refresh_token"
+    assert stored["cookie"] == "sweet sweet cookie"
+    assert stored["last_time_token_refreshed"] == client.last_time_token_refreshed
+
+
+def test_restart_skips_refresh(refresh_tokens_response, token_store):
+    TgtgClient(token_store=token_store, **tgtg_client_fake_tokens).login()
+    assert count_refresh_calls() == 1
+
+    # stale tokens given at startup are replaced by the stored ones
+    client = TgtgClient(token_store=token_store, **tgtg_client_fake_tokens)
+    assert client.refresh_token == "a_refresh_token"
+    client.login()
+    assert count_refresh_calls() == 1
+
+
+def test_adopt_tokens_rotated_by_another_client(token_store):
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, REFRESH_ENDPOINT),
+        json={"access_token": "second_access", "refresh_token": "second_refresh"},
+        status=200,
+        headers={"set-cookie": "second cookie"},
+    )
+    first = TgtgClient(token_store=token_store, **tgtg_client_fake_tokens)
+    second = TgtgClient(token_store=token_store, **tgtg_client_fake_tokens)
+    first.login()
+
+    # the second client must not refresh with its refresh token, now rotated
+    second.login()
+    assert count_refresh_calls() == 1
+    assert second.refresh_token == "second_refresh"
+    assert second.cookie == "second cookie"
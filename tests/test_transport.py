@@ -0,0 +1,138 @@
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from tgtg.transport import PooledTransport, build_session, keep_alive_options
+
+
+def test_sequential_calls_reuse_one_connection(make_client, stub_server):
+    with stub_server() as server:
+        client = make_client(server)
+        for item_id in range(10):
+            client.get_item(item_id)
+
+    assert client.transport.stats() == {
+        "requests": 10,
+        "opened": 1,
+        "reused": 9,
+        "discarded": 0,
+        "expired": 0,
+    }
+
+
+def test_concurrent_calls_within_max_per_host_are_not_churned(make_client, stub_server):
+    with stub_server(latency=0.02) as server:
+        client = make_client(server, thread_safe=True, max_workers=8)
+        with ThreadPoolExecutor(8) as executor:
+            for _ in range(4):
+                list(executor.map(client.get_item, range(8)))
+
+    stats = client.transport.stats()
+    assert stats["requests"] == 32
+    assert stats["opened"] <= 8
+    assert stats["discarded"] == 0
+
+
+def test_small_pool_discards_connections(make_client, stub_server):
+    transport = PooledTransport(max_per_host=1)
+    with stub_server(latency=0.05) as server:
+        client = make_client(server, thread_safe=True, transport=transport)
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(client.get_item, range(4)))
+
+    stats = transport.stats()
+    assert stats["opened"] == 4
+    assert stats["discarded"] == 3
+
+
+def test_blocking_pool_caps_connections_per_host(make_client, stub_server):
+    transport = PooledTransport(max_per_host=2, block=True)
+    with stub_server(latency=0.02) as server:
+        client = make_client(server, thread_safe=True, transport=transport)
+        with ThreadPoolExecutor(6) as executor:
+            list(executor.map(client.get_item, range(12)))
+
+    stats = transport.stats()
+    assert stats["opened"] == 2
+    assert stats["reused"] == 10
+
+
+def test_idle_connections_expire(make_client, stub_server):
+    transport = PooledTransport(idle_timeout=0)
+    with stub_server() as server:
+        client = make_client(server, transport=transport)
+        for item_id in range(3):
+            client.get_item(item_id)
+
+    stats = transport.stats()
+    assert stats["opened"] == 3
+    assert stats["expired"] == 2
+
+
+def test_keep_alive_socket_options():
+    transport = PooledTransport(keep_alive=30)
+    options = transport.poolmanager.connection_pool_kw["socket_options"]
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    assert set(keep_alive_options(30)) <= set(options)
+    assert "socket_options" not in PooledTransport().poolmanager.connection_pool_kw
+
+
+def test_injected_transport(make_client):
+    class CannedTransport(BaseAdapter):
+        def __init__(self):
+            super().__init__()
+            self.urls = []
+
+        def send(self, request, **kwargs):
+            self.urls.append(request.url)
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b'{"orders": []}'
+            response.request = request
+            return response
+
+        def close(self):
+            pass
+
+    transport = CannedTransport()
+    client = make_client(transport=transport)
+
+    assert client.get_active() == {"orders": []}
+    assert transport.urls == ["https://apptoogoodtogo.com/api/order/v8/active"]
+    assert client.transport is transport
+
+
+@pytest.fixture
+def proxy_environment(monkeypatch):
+    for name in ("HTTP_PROXY", "http_proxy", "ALL_PROXY", "all_proxy", "https_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("HTTPS_PROXY", "http://env-proxy:3128")
+    return monkeypatch
+
+
+def test_proxies_are_set_once(proxy_environment):
+    proxy_environment.setenv("NO_PROXY", "")
+    session = build_session(
+        PooledTransport(),
+        {"http": "http://proxy:8080"},
+        "https://apptoogoodtogo.com/api/",
+    )
+
+    assert session.proxies == {
+        "https": "http://env-proxy:3128",
+        "http": "http://proxy:8080",
+    }
+    # the environment is not read again for every request
+    assert not session.trust_env
+
+
+def test_no_proxy_of_the_environment(proxy_environment, make_client):
+    proxy_environment.setenv("NO_PROXY", "apptoogoodtogo.com")
+    proxy_environment.setenv("REQUESTS_CA_BUNDLE", "/etc/ssl/bundle.pem")
+    client = make_client()
+
+    assert client.session.proxies == {}
+    assert client.session.verify == "/etc/ssl/bundle.pem"
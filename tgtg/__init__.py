@@ -1,16 +1,32 @@
+import base64
+import contextlib
+import contextvars
 import datetime
-import random
-import sys
+import functools
+import json
+import logging
+import threading
 import time
-import uuid
+import weakref
 from http import HTTPStatus
 from urllib.parse import urljoin
 
-import requests
+from tgtg.google_play_scraper import DEFAULT_CACHE_TTL, get_cached_apk_version
 
-from tgtg.google_play_scraper import get_last_apk_version
-
-from .exceptions import TgtgAPIError, TgtgLoginError, TgtgPollingError
+from .circuit import endpoint_family
+from .codec import default_codec
+from .events import RequestEvent
+from .exceptions import (
+    TgtgAPIError,
+    TgtgCircuitOpenError,
+    TgtgLoginError,
+    TgtgPollingError,
+    TgtgTimeoutError,
+)
+from .models import Item, Order
+from .pagination import iter_pages
+from .retry import RetryPolicy
+from .stream import STREAM_CHUNK_SIZE, JsonStream
 
 BASE_URL = "https://apptoogoodtogo.com/api/"
 API_ITEM_ENDPOINT = "item/v8/"
@@ -32,11 +48,91 @@ USER_AGENTS = [
     "TGTG/{} Dalvik/2.1.0 (Linux; Android 12; SM-G920V Build/MMB29K)",
 ]
 DEFAULT_ACCESS_TOKEN_LIFETIME = 3600 * 4  # 4 hours
+TOKEN_REFRESH_LEAD_TIME = 300  # refresh in background 5 minutes before expiry
+MIN_BACKGROUND_REFRESH_INTERVAL = 10  # Seconds
+DEFAULT_RETRY = RetryPolicy()
+DEFAULT_TIMEOUT = (3.05, 10)  # Seconds to connect, then between received bytes
+# item lists can take a while to be computed
+DEFAULT_ENDPOINT_TIMEOUTS = {
+    API_ITEM_ENDPOINT: (3.05, 30),
+    API_BUCKET_ENDPOINT: (3.05, 30),
+}
+_UNSET = object()
+logger = logging.getLogger(__name__)
+
 MAX_POLLING_TRIES = 24  # 24 * POLLING_WAIT_TIME = 2 minutes
 POLLING_WAIT_TIME = 5  # Seconds
 
 
-class TgtgClient:
+# monotonic time at which the call being processed must be over
+_deadline = contextvars.ContextVar("tgtg_deadline", default=None)
+
+
+@contextlib.contextmanager
+def _deadline_scope(deadline):
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class _HeaderField:
+    """Attribute that drops the cached request headers whenever it is set."""
+
+    def __set_name__(self, owner, name):
+        self.name = f"_{name}"
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return getattr(instance, self.name, None)
+
+    def __set__(self, instance, value):
+        setattr(instance, self.name, value)
+        instance._cached_headers = None
+
+
+@functools.lru_cache(maxsize=1024)
+def _join_url(base_url, path):
+    return urljoin(base_url, path)
+
+
+def _identity(data):
+    return data
+
+
+def _jwt_expiry(token):
+    """Return the `exp` claim of a JWT as a timestamp, None if there is none."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(
+            base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        )
+        expiry = claims["exp"]
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+    return expiry if isinstance(expiry, (int, float)) else None
+
+
+class BaseTgtgClient:
+    """State, request building and response handling of the TooGoodToGo API.
+
+    Endpoint methods return whatever `_call` returns, so the very same methods
+    give results with `TgtgClient` and awaitables with `AsyncTgtgClient`.
+    Subclasses only implement the transport: `_call`, `login`, `start_polling`
+    and `_refresh_token`.
+    """
+
+    access_token = _HeaderField()
+    cookie = _HeaderField()
+    language = _HeaderField()
+    user_agent = _HeaderField()
+
+    # both are real locks in thread-safe mode only
+    _state_lock = contextlib.nullcontext()
+    _refresh_lock = contextlib.nullcontext()
+
     def __init__(
         self,
         url=BASE_URL,
@@ -46,13 +142,28 @@ class TgtgClient:
         user_agent=None,
         language="en-GB",
         proxies=None,
-        timeout=None,
+        timeout=_UNSET,
         last_time_token_refreshed=None,
         access_token_lifetime=DEFAULT_ACCESS_TOKEN_LIFETIME,
         device_type="ANDROID",
         cookie=None,
+        version_cache_ttl=DEFAULT_CACHE_TTL,
+        version_cache_path=None,
+        refresh_lead_time=TOKEN_REFRESH_LEAD_TIME,
+        token_store=None,
+        models=False,
+        codec=None,
+        cache=None,
+        retry=DEFAULT_RETRY,
+        endpoint_timeouts=None,
+        deadline=None,
+        circuit_breaker=None,
+        listeners=None,
+        coalesce=False,
+        catalog=None,
     ):
         self.base_url = url
+        self._cached_headers = None
 
         self.email = email
 
@@ -62,41 +173,64 @@ class TgtgClient:
 
         self.last_time_token_refreshed = last_time_token_refreshed
         self.access_token_lifetime = access_token_lifetime
-        self.correlation_id = str(uuid.uuid4())
+        self.refresh_lead_time = refresh_lead_time
+        self._token_expiry = (None, None)
+        self.correlation_id = _new_correlation_id()
 
         self.device_type = device_type
 
+        self.version_cache_ttl = version_cache_ttl
+        self.version_cache_path = version_cache_path
         self.user_agent = user_agent if user_agent else self._get_user_agent()
         self.language = language
         self.proxies = proxies
+        # the endpoint defaults only complete the default timeout, an explicit
+        # `timeout` applies to every call
+        if timeout is _UNSET:
+            timeout = DEFAULT_TIMEOUT
+            if endpoint_timeouts is None:
+                endpoint_timeouts = DEFAULT_ENDPOINT_TIMEOUTS
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers = self._headers
+        self.endpoint_timeouts = endpoint_timeouts or {}
+        self.deadline = deadline
+        self.circuit_breaker = circuit_breaker
+        self.listeners = list(listeners or ())
+
+        self.models = models
+        self.codec = codec or default_codec()
+        self.cache = cache
+        self.catalog = catalog
+        self.retry = retry
+        # set by the subclasses when `coalesce` is true
+        self.coalesce = coalesce
+        self.single_flight = None
+
+        # saved credentials are more recent than the ones we were given
+        self.token_store = token_store
+        if token_store:
+            stored = token_store.load()
+            if stored and stored.get("refresh_token"):
+                self._apply_stored_tokens(stored)
 
     def _get_user_agent(self):
         try:
-            self.version = get_last_apk_version()
-        except Exception:
+            self.version = get_cached_apk_version(
+                cache_path=self.version_cache_path, ttl=self.version_cache_ttl
+            )
+        except Exception as exc:
             self.version = DEFAULT_APK_VERSION
-            sys.stdout.write("Failed to get last version\n")
+            logger.warning("Failed to get last version: %s", exc)
+
+        logger.info("Using version %s", self.version)
 
-        sys.stdout.write(f"Using version {self.version}\n")
+        import random
 
         return random.choice(USER_AGENTS).format(self.version)
 
     def _get_url(self, path):
-        return urljoin(self.base_url, path)
-
-    def get_credentials(self):
-        self.login()
-        return {
-            "access_token": self.access_token,
-            "refresh_token": self.refresh_token,
-            "cookie": self.cookie,
-        }
+        return _join_url(self.base_url, path)
 
-    @property
-    def _headers(self):
+    def _build_headers(self):
         headers = {
             "accept": "application/json",
             "Accept-Encoding": "gzip",
@@ -111,110 +245,355 @@ class TgtgClient:
             headers["authorization"] = f"Bearer {self.access_token}"
         return headers
 
+    @property
+    def _headers(self):
+        # rebuilt only after access_token, cookie, language or user_agent changed
+        headers = self._cached_headers
+        if headers is None:
+            with self._state_lock:
+                headers = self._cached_headers
+                if headers is None:
+                    headers = self._cached_headers = self._build_headers()
+        return headers
+
     @property
     def _already_logged(self):
         return bool(self.access_token and self.refresh_token)
 
-    def _refresh_token(self):
+    def _set_tokens(self, login_response, cookie=None):
+        # requests built meanwhile wait for the lock instead of mixing old and
+        # new values, then all of them get the complete new header set
+        with self._state_lock:
+            self.access_token = login_response["access_token"]
+            self.refresh_token = login_response["refresh_token"]
+            if cookie is not None:
+                self.cookie = cookie
+            self._cached_headers = self._build_headers()
+            self.last_time_token_refreshed = datetime.datetime.now()
+        if self.token_store:
+            self._save_tokens(
+                {
+                    **self._credentials(),
+                    "last_time_token_refreshed": self.last_time_token_refreshed,
+                }
+            )
+
+    def _save_tokens(self, tokens):
+        self.token_store.save(tokens)
+
+    def _apply_stored_tokens(self, stored):
+        with self._state_lock:
+            self.access_token = stored.get("access_token")
+            self.refresh_token = stored["refresh_token"]
+            self.cookie = stored.get("cookie")
+            self._cached_headers = self._build_headers()
+            self.last_time_token_refreshed = stored.get("last_time_token_refreshed")
+
+    def _token_store_lock(self):
+        if self.token_store:
+            return self.token_store.lock()
+        return contextlib.nullcontext()
+
+    def _reload_stored_tokens(self, margin=0):
+        """Adopt tokens saved meanwhile by another process, True if still fresh.
+
+        The API rotates refresh tokens, so once another process refreshed,
+        ours is no longer valid and the stored one must be used.
+        """
+        if self.token_store:
+            return self._adopt_stored_tokens(self.token_store.load(), margin)
+        return False
+
+    def _adopt_stored_tokens(self, stored, margin=0):
         if (
-            self.last_time_token_refreshed
-            and (datetime.datetime.now() - self.last_time_token_refreshed).seconds
-            <= self.access_token_lifetime
+            stored
+            and stored.get("refresh_token")
+            and stored["refresh_token"] != self.refresh_token
         ):
-            return
+            self._apply_stored_tokens(stored)
+            return self._token_is_fresh(margin)
+        return False
 
-        response = self.session.post(
-            self._get_url(REFRESH_ENDPOINT),
-            json={"refresh_token": self.refresh_token},
-            headers=self._headers,
-            proxies=self.proxies,
-            timeout=self.timeout,
-        )
-        if response.status_code == HTTPStatus.OK:
-            self.access_token = response.json()["access_token"]
-            self.refresh_token = response.json()["refresh_token"]
-            self.last_time_token_refreshed = datetime.datetime.now()
-            self.cookie = response.headers["Set-Cookie"]
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
+    def _credentials(self):
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "cookie": self.cookie,
+        }
 
-    def login(self):
+    def _check_login_params(self):
         if not (self.email or self.access_token and self.refresh_token and self.cookie):
             raise TypeError(
                 "You must provide at least email or access_token, refresh_token and cookie"
             )
-        if self._already_logged:
-            self._refresh_token()
-        else:
-            response = self.session.post(
-                self._get_url(AUTH_BY_EMAIL_ENDPOINT),
-                headers=self._headers,
-                json={
-                    "device_type": self.device_type,
-                    "email": self.email,
-                },
-                proxies=self.proxies,
-                timeout=self.timeout,
+
+    @property
+    def access_token_expires_at(self):
+        """When the access token expires, computed without any request.
+
+        Taken from the `exp` claim of the token when it is a JWT, otherwise
+        `access_token_lifetime` after `last_time_token_refreshed`.
+        """
+        token, expiry = self._token_expiry
+        if token is not self.access_token:
+            token = self.access_token
+            expiry = _jwt_expiry(token)
+            self._token_expiry = (token, expiry)
+        if expiry is not None:
+            return datetime.datetime.fromtimestamp(expiry)
+        if self.last_time_token_refreshed:
+            # the lifetime counts whole seconds: valid during all of its last one
+            return self.last_time_token_refreshed + datetime.timedelta(
+                seconds=self.access_token_lifetime + 1
             )
-            if response.status_code == HTTPStatus.OK:
-                first_login_response = response.json()
-                if first_login_response["state"] == "TERMS":
-                    raise TgtgPollingError(
-                        f"This email {self.email} is not linked to a tgtg account. "
-                        "Please signup with this email first."
-                    )
-                elif first_login_response["state"] == "WAIT":
-                    self.start_polling(first_login_response["polling_id"])
-                else:
-                    raise TgtgLoginError(response.status_code, response.content)
-            else:
-                if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-                    raise TgtgAPIError(
-                        response.status_code, "Too many requests. Try again later."
-                    )
-                else:
-                    raise TgtgLoginError(response.status_code, response.content)
+        return None
 
-    def start_polling(self, polling_id):
-        for _ in range(MAX_POLLING_TRIES):
-            response = self.session.post(
-                self._get_url(AUTH_POLLING_ENDPOINT),
-                headers=self._headers,
-                json={
-                    "device_type": self.device_type,
-                    "email": self.email,
-                    "request_polling_id": polling_id,
-                },
-                proxies=self.proxies,
-                timeout=self.timeout,
+    def _token_is_fresh(self, margin=0):
+        """Whether the access token is still valid `margin` seconds from now."""
+        expires_at = self.access_token_expires_at
+        if not expires_at:
+            return False
+        return (expires_at - datetime.datetime.now()).total_seconds() > margin
+
+    def _seconds_until_background_refresh(self):
+        expires_at = self.access_token_expires_at
+        if not (self._already_logged and expires_at):
+            return MIN_BACKGROUND_REFRESH_INTERVAL
+        remaining = (expires_at - datetime.datetime.now()).total_seconds()
+        return max(remaining - self.refresh_lead_time, 0)
+
+    def _decode(self, content):
+        return self.codec.loads(content)
+
+    def _encode(self, payload):
+        return None if payload is None else self.codec.dumps(payload)
+
+    def _handle_response(self, status_code, content, parse):
+        """Check an endpoint response and return its decoded, parsed body.
+
+        Any status other than 200 raises `TgtgAPIError`. The body is decoded
+        once and handed to `parse`, or ignored when `parse` is None.
+        """
+        if status_code != HTTPStatus.OK:
+            raise TgtgAPIError(status_code, content)
+        if parse is None:
+            return None
+        if isinstance(parse, _SourceParser):
+            return parse.parse(content)
+        return parse(self._decode(content))
+
+    def _retry_delay(
+        self,
+        attempt,
+        started,
+        idempotent,
+        status_code=None,
+        headers=None,
+        retry_throttled=False,
+    ):
+        """Seconds to wait before sending a failed request again, None to give up."""
+        if self.retry is None or status_code == HTTPStatus.OK:
+            return None
+        delay = self.retry.delay(
+            attempt,
+            time.monotonic() - started,
+            idempotent,
+            status_code,
+            headers,
+            retry_throttled,
+        )
+        deadline = _deadline.get()
+        if delay is not None and deadline is not None:
+            if time.monotonic() + delay >= deadline:
+                return None
+        return delay
+
+    def add_listener(self, listener):
+        """Call `listener(event)` with a `RequestEvent` after every request."""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def _start_event(self, path, body, refreshed):
+        if not self.listeners:
+            return None
+        return RequestEvent(path, len(body) if body else 0, refreshed)
+
+    def _emit(self, event):
+        event.total = time.perf_counter() - event.started
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Request listener %r failed", listener)
+
+    def circuit_states(self):
+        """State of the circuit of each endpoint family that ever failed."""
+        if self.circuit_breaker is None:
+            return {}
+        return self.circuit_breaker.states()
+
+    def _circuit_check(self, path):
+        if self.circuit_breaker is None:
+            return
+        family = endpoint_family(path)
+        if not self.circuit_breaker.allow(family):
+            raise TgtgCircuitOpenError(
+                f"Circuit of {family} endpoints is open after repeated failures"
+            )
+
+    def _circuit_record(self, path, status_code=None):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(endpoint_family(path), status_code)
+
+    def _call_deadline(self):
+        """Bound the calls made within to `deadline` seconds, retries included."""
+        if self.deadline is None or _deadline.get() is not None:
+            return contextlib.nullcontext()
+        return _deadline_scope(time.monotonic() + self.deadline)
+
+    def _remaining_time(self):
+        """Seconds left before the deadline of the current call, if it has one."""
+        deadline = _deadline.get()
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TgtgTimeoutError(
+                f"Call did not complete within {self.deadline} seconds"
+            )
+        return remaining
+
+    def _endpoint_timeout(self, path):
+        """(connect, read) timeout of an endpoint, shortened to fit the deadline."""
+        timeout = self.timeout
+        for prefix, endpoint_timeout in self.endpoint_timeouts.items():
+            if path.startswith(prefix):
+                timeout = endpoint_timeout
+                break
+        remaining = self._remaining_time()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining, remaining
+        if not isinstance(timeout, tuple):
+            timeout = timeout, timeout
+        return tuple(None if t is None else min(t, remaining) for t in timeout)
+
+    def _cache_max_age(self, stock):
+        return None if self.cache is None else self.cache.max_age(stock)
+
+    def _request_key(self, path, payload):
+        """The endpoint and normalized body, equal for identical requests."""
+        return path, json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+    def _cache_lookup(self, path, payload, max_age):
+        """Return the cache key of a request and its cached content, if any."""
+        if max_age is None or self.cache is None:
+            return None, None
+        key = self._request_key(path, payload)
+        return key, self.cache.get(key, max_age)
+
+    def _cache_store(self, key, content, invalidates):
+        if self.cache is None:
+            return
+        if invalidates:
+            self.cache.invalidate(*invalidates)
+        if key is not None:
+            self.cache.set(key, content)
+
+    def _catalog_store(self, path, result):
+        """Save the items of a `get_items`, `get_item` or `get_favorites` answer."""
+        if self.catalog is None or not path.startswith(
+            (API_ITEM_ENDPOINT, API_BUCKET_ENDPOINT)
+        ):
+            return
+        self.catalog.add(result if isinstance(result, list) else [result])
+
+    def _wrap(self, parse, model, keys=None):
+        """Have `parse` return `model` instances when models are enabled.
+
+        With `keys`, the path of the array of models in the document, each
+        model is built from its JSON text and only keeps that text.
+        """
+        if not self.models:
+            return parse
+        if keys is not None:
+            return _SourceParser(
+                lambda content: parse(_decode_models(content, keys, model))
             )
-            if response.status_code == HTTPStatus.ACCEPTED:
-                sys.stdout.write(
-                    "Check your mailbox on PC to continue... "
-                    "(Opening email on mobile won't work, if you have installed tgtg app.)\n"
+        return lambda data: model.wrap(parse(data))
+
+    def _refresh_payload(self):
+        return {"refresh_token": self.refresh_token}
+
+    def _handle_refresh_response(self, status_code, content, headers):
+        if status_code == HTTPStatus.OK:
+            self._set_tokens(self._decode(content), headers["Set-Cookie"])
+        else:
+            raise TgtgAPIError(status_code, content)
+
+    def _auth_payload(self):
+        return {
+            "device_type": self.device_type,
+            "email": self.email,
+        }
+
+    def _handle_auth_response(self, status_code, content):
+        """Return the polling id to wait on after an authByEmail request."""
+        if status_code == HTTPStatus.OK:
+            first_login_response = self._decode(content)
+            if first_login_response["state"] == "TERMS":
+                raise TgtgPollingError(
+                    f"This email {self.email} is not linked to a tgtg account. "
+                    "Please signup with this email first."
                 )
-                time.sleep(POLLING_WAIT_TIME)
-                continue
-            elif response.status_code == HTTPStatus.OK:
-                sys.stdout.write("Logged in!\n")
-                login_response = response.json()
-                self.access_token = login_response["access_token"]
-                self.refresh_token = login_response["refresh_token"]
-                self.last_time_token_refreshed = datetime.datetime.now()
-                self.cookie = response.headers["Set-Cookie"]
-                return
+            elif first_login_response["state"] == "WAIT":
+                return first_login_response["polling_id"]
+            else:
+                raise TgtgLoginError(status_code, content)
+        else:
+            if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                raise TgtgAPIError(status_code, "Too many requests. Try again later.")
+            else:
+                raise TgtgLoginError(status_code, content)
+
+    def _polling_payload(self, polling_id):
+        return {
+            "device_type": self.device_type,
+            "email": self.email,
+            "request_polling_id": polling_id,
+        }
+
+    def _handle_polling_response(self, status_code, content, headers):
+        """Return True once logged in, False while the email is not validated."""
+        if status_code == HTTPStatus.ACCEPTED:
+            # shown without any logging configuration: the user has to act
+            logger.warning(
+                "Check your mailbox on PC to continue... "
+                "(Opening email on mobile won't work, if you have installed tgtg app.)"
+            )
+            return False
+        elif status_code == HTTPStatus.OK:
+            logger.info("Logged in!")
+            self._set_tokens(self._decode(content), headers["Set-Cookie"])
+            return True
+        else:
+            if status_code == HTTPStatus.TOO_MANY_REQUESTS:
+                raise TgtgAPIError(status_code, "Too many requests. Try again later.")
             else:
-                if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-                    raise TgtgAPIError(
-                        response.status_code, "Too many requests. Try again later."
-                    )
-                else:
-                    raise TgtgLoginError(response.status_code, response.content)
-
-        raise TgtgPollingError(
+                raise TgtgLoginError(status_code, content)
+
+    def _polling_error(self):
+        return TgtgPollingError(
             f"Max retries ({MAX_POLLING_TRIES * POLLING_WAIT_TIME} seconds) reached. Try again."
         )
 
+    def _handle_signup_response(self, data):
+        self._set_tokens(data["login_response"])
+        return self
+
     def get_items(
         self,
         *,
@@ -233,9 +612,9 @@ class TgtgClient:
         with_stock_only=False,
         hidden_only=False,
         we_care_only=False,
+        stream=False,
     ):
-        self.login()
-
+        """With `stream=True`, return an iterator decoding the items as they arrive."""
         # fields are sorted like in the app
         data = {
             "origin": {"latitude": latitude, "longitude": longitude},
@@ -253,31 +632,26 @@ class TgtgClient:
             "hidden_only": hidden_only,
             "we_care_only": we_care_only,
         }
-        response = self.session.post(
-            self._get_url(API_ITEM_ENDPOINT),
-            headers=self._headers,
-            json=data,
-            proxies=self.proxies,
-            timeout=self.timeout,
+        if stream:
+            return self._stream(API_ITEM_ENDPOINT, data, ("items",), Item)
+        return self._call(
+            API_ITEM_ENDPOINT,
+            data,
+            self._wrap(_parse_items, Item, ("items",)),
+            idempotent=True,
+            coalesce=True,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json()["items"]
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
-    def get_item(self, item_id):
-        self.login()
-        response = self.session.post(
-            urljoin(self._get_url(API_ITEM_ENDPOINT), str(item_id)),
-            headers=self._headers,
-            json={"origin": None},
-            proxies=self.proxies,
-            timeout=self.timeout,
+    def get_item(self, item_id, *, stock=True):
+        """With a `cache`, `stock=False` accepts an answer as old as its `static_ttl`."""
+        return self._call(
+            f"{API_ITEM_ENDPOINT}{item_id}",
+            {"origin": None},
+            self._wrap(_identity, Item),
+            max_age=self._cache_max_age(stock),
+            idempotent=True,
+            coalesce=True,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
     def get_favorites(
         self,
@@ -286,9 +660,11 @@ class TgtgClient:
         radius=21,
         page_size=50,
         page=0,
+        *,
+        stock=True,
+        stream=False,
     ):
-        self.login()
-
+        """With `stream=True`, return an iterator decoding the items as they arrive."""
         # fields are sorted like in the app
         data = {
             "origin": {"latitude": latitude, "longitude": longitude},
@@ -296,78 +672,50 @@ class TgtgClient:
             "paging": {"page": page, "size": page_size},
             "bucket": {"filler_type": "Favorites"},
         }
-        response = self.session.post(
-            self._get_url(API_BUCKET_ENDPOINT),
-            headers=self._headers,
-            json=data,
-            proxies=self.proxies,
-            timeout=self.timeout,
+        if stream:
+            return self._stream(
+                API_BUCKET_ENDPOINT, data, ("mobile_bucket", "items"), Item
+            )
+        return self._call(
+            API_BUCKET_ENDPOINT,
+            data,
+            self._wrap(_parse_favorites, Item, ("mobile_bucket", "items")),
+            max_age=self._cache_max_age(stock),
+            idempotent=True,
+            coalesce=True,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json().get("mobile_bucket", {}).get("items", [])
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
     def set_favorite(self, item_id, is_favorite):
-        self.login()
-        response = self.session.post(
-            self._get_url(FAVORITE_ITEM_ENDPOINT.format(item_id)),
-            headers=self._headers,
-            json={"is_favorite": is_favorite},
-            proxies=self.proxies,
-            timeout=self.timeout,
+        self._call(
+            FAVORITE_ITEM_ENDPOINT.format(item_id),
+            {"is_favorite": is_favorite},
+            parse=None,
+            invalidates=(API_BUCKET_ENDPOINT, f"{API_ITEM_ENDPOINT}{item_id}"),
+            idempotent=True,
         )
-        if response.status_code != HTTPStatus.OK:
-            raise TgtgAPIError(response.status_code, response.content)
 
     def create_order(self, item_id, item_count):
-        self.login()
-
-        response = self.session.post(
-            urljoin(self._get_url(CREATE_ORDER_ENDPOINT), str(item_id)),
-            headers=self._headers,
-            json={"item_count": item_count},
-            proxies=self.proxies,
-            timeout=self.timeout,
+        return self._call(
+            f"{CREATE_ORDER_ENDPOINT}{item_id}",
+            {"item_count": item_count},
+            self._wrap(_parse_order, Order),
         )
-        if response.status_code != HTTPStatus.OK:
-            raise TgtgAPIError(response.status_code, response.content)
-        elif response.json()["state"] != "SUCCESS":
-            raise TgtgAPIError(response.json()["state"], response.content)
-        else:
-            return response.json()["order"]
 
     def get_order_status(self, order_id):
-        self.login()
-
-        response = self.session.post(
-            self._get_url(ORDER_STATUS_ENDPOINT.format(order_id)),
-            headers=self._headers,
-            proxies=self.proxies,
-            timeout=self.timeout,
+        return self._call(
+            ORDER_STATUS_ENDPOINT.format(order_id),
+            parse=self._wrap(_identity, Order),
+            idempotent=True,
+            coalesce=True,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
     def abort_order(self, order_id):
         """Use this when your order is not yet paid"""
-        self.login()
-
-        response = self.session.post(
-            self._get_url(ABORT_ORDER_ENDPOINT.format(order_id)),
-            headers=self._headers,
-            json={"cancel_reason_id": 1},
-            proxies=self.proxies,
-            timeout=self.timeout,
+        self._call(
+            ABORT_ORDER_ENDPOINT.format(order_id),
+            {"cancel_reason_id": 1},
+            _check_order_state,
         )
-        if response.status_code != HTTPStatus.OK:
-            raise TgtgAPIError(response.status_code, response.content)
-        elif response.json()["state"] != "SUCCESS":
-            raise TgtgAPIError(response.json()["state"], response.content)
-        else:
-            return
 
     def signup_by_email(
         self,
@@ -378,10 +726,9 @@ class TgtgClient:
         newsletter_opt_in=False,
         push_notification_opt_in=True,
     ):
-        response = self.session.post(
-            self._get_url(SIGNUP_BY_EMAIL_ENDPOINT),
-            headers=self._headers,
-            json={
+        return self._call(
+            SIGNUP_BY_EMAIL_ENDPOINT,
+            {
                 "country_id": country_id,
                 "device_type": self.device_type,
                 "email": email,
@@ -389,42 +736,457 @@ class TgtgClient:
                 "newsletter_opt_in": newsletter_opt_in,
                 "push_notification_opt_in": push_notification_opt_in,
             },
-            proxies=self.proxies,
-            timeout=self.timeout,
+            self._handle_signup_response,
+            login=False,
         )
-        if response.status_code == HTTPStatus.OK:
-            self.access_token = response.json()["login_response"]["access_token"]
-            self.refresh_token = response.json()["login_response"]["refresh_token"]
-            self.last_time_token_refreshed = datetime.datetime.now()
-
-            return self
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
     def get_active(self):
-        self.login()
-        response = self.session.post(
-            self._get_url(ACTIVE_ORDER_ENDPOINT),
-            headers=self._headers,
-            json={},
-            proxies=self.proxies,
-            timeout=self.timeout,
+        return self._call(ACTIVE_ORDER_ENDPOINT, {}, idempotent=True, coalesce=True)
+
+    def get_inactive(self, page=0, page_size=20, *, stream=False):
+        """With `stream=True`, return an iterator decoding the orders as they arrive."""
+        data = {"paging": {"page": page, "size": page_size}}
+        if stream:
+            return self._stream(INACTIVE_ORDER_ENDPOINT, data, ("orders",), Order)
+        return self._call(INACTIVE_ORDER_ENDPOINT, data, idempotent=True, coalesce=True)
+
+    def iter_items(self, *, page=1, page_size=20, prefetch=False, **kwargs):
+        """Yield the items of every page of `get_items`, from `page` on.
+
+        With `prefetch`, the next page is requested while the current one is
+        consumed (from a thread with `TgtgClient`, use `thread_safe=True` if
+        other calls are made meanwhile).
+        """
+        return self._paginate(
+            lambda page: self.get_items(page=page, page_size=page_size, **kwargs),
+            page,
+            lambda items: (items, len(items) < page_size),
+            prefetch,
+        )
+
+    def iter_favorites(
+        self,
+        latitude=0.0,
+        longitude=0.0,
+        radius=21,
+        page_size=50,
+        page=0,
+        *,
+        prefetch=False,
+    ):
+        """Yield the items of every page of `get_favorites`, see `iter_items`."""
+        return self._paginate(
+            lambda page: self.get_favorites(
+                latitude, longitude, radius, page_size=page_size, page=page
+            ),
+            page,
+            lambda items: (items, len(items) < page_size),
+            prefetch,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        else:
-            raise TgtgAPIError(response.status_code, response.content)
 
-    def get_inactive(self, page=0, page_size=20):
+    def iter_inactive(self, page=0, page_size=20, *, prefetch=False):
+        """Yield every order of every page of `get_inactive`, see `iter_items`."""
+        return self._paginate(
+            lambda page: self._call(
+                INACTIVE_ORDER_ENDPOINT,
+                {"paging": {"page": page, "size": page_size}},
+                self._wrap(_split_inactive_page, Order, ("orders",)),
+                idempotent=True,
+                coalesce=True,
+            ),
+            page,
+            _identity,
+            prefetch,
+        )
+
+
+class TgtgClient(BaseTgtgClient):
+    """Blocking client built on a `requests.Session`.
+
+    With `thread_safe=True` one client can be shared by many threads: token
+    state is only updated under a lock, and when the access token expires a
+    single thread refreshes it while the others wait for its result. Set
+    `max_workers` to the number of threads so that each of them can keep its
+    own pooled connection.
+
+    Requests go through `transport`, a `requests` adapter, by default a
+    `tgtg.transport.PooledTransport` whose `stats()` tell how connections are
+    reused. `proxies` and those of the environment are set on the session once.
+
+    With `coalesce=True`, identical read calls made at once by several threads
+    share one request, counted by `single_flight.stats()`.
+
+    With `background_refresh=True` (which implies `thread_safe`) a daemon
+    thread renews the access token `refresh_lead_time` seconds before it
+    expires, so that no call has to wait for a refresh. Stop it with `close()`.
+    """
+
+    def __init__(
+        self,
+        *args,
+        thread_safe=False,
+        max_workers=None,
+        transport=None,
+        background_refresh=False,
+        **kwargs,
+    ):
+        thread_safe = thread_safe or background_refresh
+        self.thread_safe = thread_safe
+        if thread_safe:
+            self._state_lock = threading.Lock()
+            self._refresh_lock = threading.Lock()
+        self._refresh_generation = 0
+        self._refresh_error = None
+        super().__init__(*args, **kwargs)
+        if self.coalesce:
+            from .coalesce import SingleFlight
+
+            self.single_flight = SingleFlight()
+        from .transport import DEFAULT_MAX_PER_HOST, PooledTransport, build_session
+
+        if transport is None:
+            transport = PooledTransport(
+                max_per_host=max_workers or DEFAULT_MAX_PER_HOST
+            )
+        self.transport = transport
+        self.session = build_session(transport, self.proxies, self.base_url)
+        self.session.headers = self._headers
+
+        self._stop_background_refresh = threading.Event()
+        if background_refresh:
+            # the thread only holds a weak reference, it never keeps the client alive
+            threading.Thread(
+                target=_background_refresh,
+                args=(weakref.ref(self), self._stop_background_refresh),
+                name="tgtg-token-refresh",
+                daemon=True,
+            ).start()
+
+    def close(self):
+        self._stop_background_refresh.set()
+        self.session.close()
+
+    def get_credentials(self):
         self.login()
-        response = self.session.post(
-            self._get_url(INACTIVE_ORDER_ENDPOINT),
-            headers=self._headers,
-            json={"paging": {"page": page, "size": page_size}},
-            proxies=self.proxies,
-            timeout=self.timeout,
+        return self._credentials()
+
+    def _post(self, path, body=None, stream=False):
+        headers = self._headers
+        if self.session.headers is not headers:
+            self.session.headers = headers
+        return self.session.post(
+            self._get_url(path),
+            data=body,
+            timeout=self._endpoint_timeout(path),
+            stream=stream,
         )
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
+
+    def _send(
+        self,
+        path,
+        payload=None,
+        idempotent=False,
+        refreshed=False,
+        stream=False,
+        retry_throttled=False,
+    ):
+        """`_post`, retried as allowed by the retry policy.
+
+        With `stream`, the body of the response is left unread.
+        """
+        body = self._encode(payload)
+        event = self._start_event(path, body, refreshed)
+        if event is None:
+            return self._send_retried(
+                path, body, idempotent, stream=stream, retry_throttled=retry_throttled
+            )
+        try:
+            response = self._send_retried(
+                path, body, idempotent, event, stream, retry_throttled
+            )
+            event.status_code = response.status_code
+            if not stream:
+                event.response_size = len(response.content)
+            event.ttfb = response.elapsed.total_seconds()
+            return response
+        except Exception as exc:
+            event.error = exc
+            raise
+        finally:
+            self._emit(event)
+
+    def _send_retried(
+        self, path, body, idempotent, event=None, stream=False, retry_throttled=False
+    ):
+        import requests
+
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            if event is not None:
+                event.attempts = attempt
+            self._circuit_check(path)
+            try:
+                response = self._post(path, body, stream)
+            except requests.Timeout as exc:
+                self._circuit_record(path)
+                delay = self._retry_delay(attempt, started, idempotent)
+                if delay is None:
+                    raise TgtgTimeoutError(f"{path} timed out: {exc}") from exc
+            except requests.ConnectionError:
+                self._circuit_record(path)
+                delay = self._retry_delay(attempt, started, idempotent)
+                if delay is None:
+                    raise
+            else:
+                self._circuit_record(path, response.status_code)
+                delay = self._retry_delay(
+                    attempt,
+                    started,
+                    idempotent,
+                    response.status_code,
+                    response.headers,
+                    retry_throttled,
+                )
+                if delay is None:
+                    return response
+                # a streamed response holds its connection until closed
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _call(
+        self,
+        path,
+        payload=None,
+        parse=_identity,
+        *,
+        login=True,
+        max_age=None,
+        invalidates=(),
+        idempotent=False,
+        coalesce=False,
+    ):
+        """Send a request and `parse` its answer.
+
+        With `coalesce` and a client built with `coalesce=True`, concurrent
+        calls making the same request share its answer.
+        """
+        key, content = self._cache_lookup(path, payload, max_age)
+        if content is not None:
+            return self._handle_response(HTTPStatus.OK, content, parse)
+        fetch = functools.partial(self._fetch, path, payload, login, idempotent)
+        if coalesce and self.single_flight is not None:
+            status_code, content = self.single_flight.do(
+                self._request_key(path, payload), fetch
+            )
         else:
-            raise TgtgAPIError(response.status_code, response.content)
+            status_code, content = fetch()
+        result = self._handle_response(status_code, content, parse)
+        self._cache_store(key, content, invalidates)
+        self._catalog_store(path, result)
+        return result
+
+    def _fetch(self, path, payload, login, idempotent):
+        """Status code and content of the answer to a request."""
+        with self._call_deadline():
+            refreshed_at = self.last_time_token_refreshed
+            if login:
+                self.login()
+            response = self._send(
+                path,
+                payload,
+                idempotent,
+                refreshed=self.last_time_token_refreshed is not refreshed_at,
+            )
+        return response.status_code, response.content
+
+    def _stream(self, path, payload, keys, model):
+        with self._call_deadline():
+            refreshed_at = self.last_time_token_refreshed
+            self.login()
+            response = self._send(
+                path,
+                payload,
+                idempotent=True,
+                refreshed=self.last_time_token_refreshed is not refreshed_at,
+                stream=True,
+            )
+        with response:
+            if response.status_code != HTTPStatus.OK:
+                raise TgtgAPIError(response.status_code, response.content)
+            parser = JsonStream(keys, sources=self.models)
+            wrap = _model_from_source(model) if self.models else _identity
+            for chunk in _iter_chunks(response):
+                yield from map(wrap, parser.feed(chunk))
+            yield from map(wrap, parser.close())
+
+    def _paginate(self, fetch, first_page, split, prefetch):
+        return iter_pages(fetch, first_page, split, prefetch)
+
+    def _refresh_token(self, margin=0):
+        if self._token_is_fresh(margin):
+            return
+
+        generation = self._refresh_generation
+        with self._refresh_lock:
+            # another thread refreshed while we were waiting: share its result
+            if self._token_is_fresh(margin):
+                return
+            if generation != self._refresh_generation and self._refresh_error:
+                raise self._refresh_error
+
+            try:
+                # the store lock also keeps other processes from rotating at once
+                with self._token_store_lock():
+                    if not self._reload_stored_tokens(margin):
+                        response = self._send(
+                            REFRESH_ENDPOINT,
+                            self._refresh_payload(),
+                            retry_throttled=True,
+                        )
+                        self._handle_refresh_response(
+                            response.status_code, response.content, response.headers
+                        )
+                self._refresh_error = None
+            except Exception as exc:
+                self._refresh_error = exc
+                raise
+            finally:
+                self._refresh_generation += 1
+
+    def login(self):
+        self._check_login_params()
+        if self._already_logged:
+            self._refresh_token()
+            return
+
+        with self._refresh_lock:
+            if self._already_logged:
+                return
+            response = self._send(
+                AUTH_BY_EMAIL_ENDPOINT, self._auth_payload(), retry_throttled=True
+            )
+            self.start_polling(
+                self._handle_auth_response(response.status_code, response.content)
+            )
+
+    def start_polling(self, polling_id):
+        for _ in range(MAX_POLLING_TRIES):
+            response = self._send(
+                AUTH_POLLING_ENDPOINT,
+                self._polling_payload(polling_id),
+                idempotent=True,
+            )
+            if self._handle_polling_response(
+                response.status_code, response.content, response.headers
+            ):
+                return
+            time.sleep(POLLING_WAIT_TIME)
+
+        raise self._polling_error()
+
+
+def _new_correlation_id():
+    import uuid
+
+    return str(uuid.uuid4())
+
+
+def _background_refresh(client_ref, stop):
+    attempted = False
+    while True:
+        client = client_ref()
+        if client is None:
+            return
+        delay = client._seconds_until_background_refresh()
+        if attempted:
+            # tokens shorter-lived than the lead time or failing refreshes
+            delay = max(delay, MIN_BACKGROUND_REFRESH_INTERVAL)
+        del client
+        if stop.wait(delay):
+            return
+
+        client = client_ref()
+        if client is None:
+            return
+        if client._already_logged:
+            attempted = True
+            try:
+                client._refresh_token(margin=client.refresh_lead_time)
+            except Exception as exc:
+                # calls will refresh inline if the token really expires
+                logger.warning("Background token refresh failed: %r", exc)
+        del client
+
+
+def _iter_chunks(response):
+    """Yield the body of a streamed response as it arrives."""
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None or response._content_consumed:
+        # older urllib3 has no read1, its reads wait for a full chunk; a body
+        # already read (recorded, replayed) is sliced from memory
+        yield from response.iter_content(STREAM_CHUNK_SIZE)
+        return
+    while True:
+        chunk = read1(STREAM_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse_items(data):
+    return data["items"]
+
+
+def _parse_favorites(data):
+    return data.get("mobile_bucket", {}).get("items", [])
+
+
+def _split_inactive_page(data):
+    orders = data.get("orders", [])
+    return orders, not (orders and data.get("has_more"))
+
+
+class _SourceParser:
+    """Parse function taking the undecoded body, see `BaseTgtgClient._wrap`."""
+
+    def __init__(self, parse):
+        self.parse = parse
+
+
+def _model_from_source(model):
+    return lambda element: model(*element)
+
+
+def _decode_models(content, keys, model):
+    """Decode `content`, with `model`s built from their JSON text at `keys`."""
+    stream = JsonStream(keys, sources=True)
+    models = list(map(_model_from_source(model), stream.feed(content)))
+    models += map(_model_from_source(model), stream.close())
+    document = node = stream.rest
+    for key in keys[:-1]:
+        node = node.get(key) if isinstance(node, dict) else None
+    # a missing or mistyped array was left in `rest` as it is
+    if isinstance(node, dict) and keys[-1] not in node:
+        node[keys[-1]] = models
+    return document
+
+
+def _check_order_state(data):
+    if data["state"] != "SUCCESS":
+        raise TgtgAPIError(data["state"], data)
+    return data
+
+
+def _parse_order(data):
+    return _check_order_state(data)["order"]
+
+
+def __getattr__(name):
+    # the asyncio client needs the optional aiohttp dependency
+    if name == "AsyncTgtgClient":
+        from .aio import AsyncTgtgClient
+
+        return AsyncTgtgClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,371 @@
+import asyncio
+import functools
+import logging
+import time
+from http import HTTPStatus
+
+try:
+    import aiohttp
+except ImportError as exc:  # pragma: no cover
+    raise ImportError(
+        "AsyncTgtgClient requires aiohttp, install it with `pip install tgtg[async]`"
+    ) from exc
+
+from . import (
+    AUTH_BY_EMAIL_ENDPOINT,
+    AUTH_POLLING_ENDPOINT,
+    MAX_POLLING_TRIES,
+    MIN_BACKGROUND_REFRESH_INTERVAL,
+    POLLING_WAIT_TIME,
+    REFRESH_ENDPOINT,
+    BaseTgtgClient,
+    _identity,
+    _model_from_source,
+)
+from .coalesce import AsyncSingleFlight
+from .exceptions import TgtgAPIError, TgtgTimeoutError
+from .pagination import aiter_pages
+from .stream import STREAM_CHUNK_SIZE, JsonStream
+
+DEFAULT_MAX_CONNECTIONS = 100
+
+logger = logging.getLogger(__name__)
+
+
+def _trace_config():
+    """Fill the `RequestEvent` given as `trace_request_ctx` with timings."""
+
+    def started(name):
+        async def callback(session, context, params):
+            setattr(context, name, time.perf_counter())
+
+        return callback
+
+    def ended(start_name, field):
+        async def callback(session, context, params):
+            event = context.trace_request_ctx
+            start = getattr(context, start_name, None)
+            if event is not None and start is not None:
+                setattr(event, field, time.perf_counter() - start)
+
+        return callback
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(started("request_start"))
+    config.on_dns_resolvehost_start.append(started("dns_start"))
+    config.on_dns_resolvehost_end.append(ended("dns_start", "dns"))
+    config.on_connection_create_start.append(started("connect_start"))
+    config.on_connection_create_end.append(ended("connect_start", "connect"))
+    # sent once the response headers are received, before the body is read
+    config.on_request_end.append(ended("request_start", "ttfb"))
+    return config
+
+
+class AsyncTgtgClient(BaseTgtgClient):
+    """asyncio version of `TgtgClient`, every endpoint method is a coroutine.
+
+    All calls share one aiohttp session whose connection pool holds up to
+    `max_connections` sockets, so many requests can be in flight at once.
+    Once logged in, a background task renews the access token
+    `refresh_lead_time` seconds before it expires, unless `background_refresh`
+    is False. Tokens saved in `token_store` by another process are picked up
+    before refreshing, but unlike `TgtgClient` the refresh itself does not hold
+    the store lock, which would block the event loop, and the store is read
+    and written from worker threads. Inside a running loop, build the client
+    with `await AsyncTgtgClient.create(...)`. Use the client as an
+    async context manager or `await client.close()`. With `coalesce=True`,
+    identical read calls made at once by several tasks share one request.
+    """
+
+    def __init__(
+        self,
+        *args,
+        max_connections=DEFAULT_MAX_CONNECTIONS,
+        session=None,
+        background_refresh=True,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        if self.coalesce:
+            self.single_flight = AsyncSingleFlight()
+        self.max_connections = max_connections
+        self.session = session
+        self.background_refresh = background_refresh
+        self._refresh_lock = None
+        self._refresh_task = None
+        # saved by `_flush_tokens`, off the event loop
+        self._unsaved_tokens = None
+
+    @classmethod
+    async def create(cls, *args, **kwargs):
+        """Build the client in a worker thread.
+
+        Without `user_agent`, the constructor looks up the app version, and
+        with `token_store` it reads the saved tokens: both block.
+        """
+        return await asyncio.to_thread(cls, *args, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        # created lazily so that it is bound to the running event loop
+        if self.session is None:
+            # tracing costs a few callbacks per request, only when observed
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                trace_configs=[_trace_config()] if self.listeners else None,
+            )
+        return self.session
+
+    def _client_timeout(self, path):
+        # same semantics as requests: one value or a (connect, read) tuple
+        timeout = self._endpoint_timeout(path)
+        total = self._remaining_time()
+        if timeout is None:
+            return aiohttp.ClientTimeout(total=total)
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect, sock_read=read)
+
+    async def get_credentials(self):
+        await self.login()
+        return self._credentials()
+
+    async def _post(self, path, body=None, event=None, stream=False):
+        """(status, body, headers), with `stream` the unread response instead of body."""
+        url = self._get_url(path)
+        request = self._get_session().post(
+            url,
+            data=body,
+            headers=self._headers,
+            proxy=(self.proxies or {}).get(url.split(":", 1)[0]),
+            timeout=self._client_timeout(path),
+            trace_request_ctx=event,
+        )
+        if stream:
+            response = await request
+            return response.status, response, response.headers
+        async with request as response:
+            return response.status, await response.read(), response.headers
+
+    async def _send(
+        self,
+        path,
+        payload=None,
+        idempotent=False,
+        refreshed=False,
+        stream=False,
+        retry_throttled=False,
+    ):
+        """`_post`, retried as allowed by the retry policy."""
+        body = self._encode(payload)
+        event = self._start_event(path, body, refreshed)
+        if event is None:
+            return await self._send_retried(
+                path, body, idempotent, stream=stream, retry_throttled=retry_throttled
+            )
+        try:
+            response = await self._send_retried(
+                path, body, idempotent, event, stream, retry_throttled
+            )
+            event.status_code = response[0]
+            if not stream:
+                event.response_size = len(response[1])
+            return response
+        except Exception as exc:
+            event.error = exc
+            raise
+        finally:
+            self._emit(event)
+
+    async def _send_retried(
+        self, path, body, idempotent, event=None, stream=False, retry_throttled=False
+    ):
+        started = time.monotonic()
+        attempt = 1
+        while True:
+            if event is not None:
+                event.attempts = attempt
+            self._circuit_check(path)
+            try:
+                response = await self._post(path, body, event, stream)
+            except asyncio.TimeoutError as exc:
+                self._circuit_record(path)
+                delay = self._retry_delay(attempt, started, idempotent)
+                if delay is None:
+                    raise TgtgTimeoutError(f"{path} timed out") from exc
+            except aiohttp.ClientConnectionError:
+                self._circuit_record(path)
+                delay = self._retry_delay(attempt, started, idempotent)
+                if delay is None:
+                    raise
+            else:
+                status_code, content, headers = response
+                self._circuit_record(path, status_code)
+                delay = self._retry_delay(
+                    attempt, started, idempotent, status_code, headers, retry_throttled
+                )
+                if delay is None:
+                    return response
+                if stream:
+                    content.release()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _call(
+        self,
+        path,
+        payload=None,
+        parse=_identity,
+        *,
+        login=True,
+        max_age=None,
+        invalidates=(),
+        idempotent=False,
+        coalesce=False,
+    ):
+        key, content = self._cache_lookup(path, payload, max_age)
+        if content is not None:
+            return self._handle_response(HTTPStatus.OK, content, parse)
+        fetch = functools.partial(self._fetch, path, payload, login, idempotent)
+        if coalesce and self.single_flight is not None:
+            status_code, content = await self.single_flight.do(
+                self._request_key(path, payload), fetch
+            )
+        else:
+            status_code, content = await fetch()
+        result = self._handle_response(status_code, content, parse)
+        # signup_by_email sets the tokens
+        await self._flush_tokens()
+        self._cache_store(key, content, invalidates)
+        if self.catalog is not None:
+            # SQLite writes block, keep them off the event loop
+            await asyncio.to_thread(self._catalog_store, path, result)
+        return result
+
+    async def _fetch(self, path, payload, login, idempotent):
+        with self._call_deadline():
+            refreshed_at = self.last_time_token_refreshed
+            if login:
+                await self.login()
+            status_code, content, _ = await self._send(
+                path,
+                payload,
+                idempotent,
+                refreshed=self.last_time_token_refreshed is not refreshed_at,
+            )
+        return status_code, content
+
+    async def _stream(self, path, payload, keys, model):
+        with self._call_deadline():
+            refreshed_at = self.last_time_token_refreshed
+            await self.login()
+            status_code, response, _ = await self._send(
+                path,
+                payload,
+                idempotent=True,
+                refreshed=self.last_time_token_refreshed is not refreshed_at,
+                stream=True,
+            )
+        try:
+            if status_code != HTTPStatus.OK:
+                raise TgtgAPIError(status_code, await response.read())
+            parser = JsonStream(keys, sources=self.models)
+            wrap = _model_from_source(model) if self.models else _identity
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                for element in parser.feed(chunk):
+                    yield wrap(element)
+            for element in parser.close():
+                yield wrap(element)
+        finally:
+            response.release()
+
+    def _save_tokens(self, tokens):
+        self._unsaved_tokens = tokens
+
+    async def _flush_tokens(self):
+        tokens, self._unsaved_tokens = self._unsaved_tokens, None
+        if tokens is not None:
+            await asyncio.to_thread(self.token_store.save, tokens)
+
+    async def _reload_stored_tokens(self, margin=0):
+        if self.token_store:
+            stored = await asyncio.to_thread(self.token_store.load)
+            return self._adopt_stored_tokens(stored, margin)
+        return False
+
+    def _paginate(self, fetch, first_page, split, prefetch):
+        return aiter_pages(fetch, first_page, split, prefetch)
+
+    async def _background_refresh(self):
+        await asyncio.sleep(self._seconds_until_background_refresh())
+        while True:
+            try:
+                await self._refresh_token(margin=self.refresh_lead_time)
+            except Exception as exc:
+                # calls will refresh inline if the token really expires
+                logger.warning("Background token refresh failed: %r", exc)
+            await asyncio.sleep(
+                max(
+                    self._seconds_until_background_refresh(),
+                    MIN_BACKGROUND_REFRESH_INTERVAL,
+                )
+            )
+
+    async def _refresh_token(self, margin=0):
+        if self._token_is_fresh(margin):
+            return
+
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            # concurrent calls wait for the first refresh instead of sending theirs
+            if self._token_is_fresh(margin) or await self._reload_stored_tokens(margin):
+                return
+            self._handle_refresh_response(
+                *await self._send(
+                    REFRESH_ENDPOINT, self._refresh_payload(), retry_throttled=True
+                )
+            )
+            await self._flush_tokens()
+
+    async def login(self):
+        self._check_login_params()
+        if self._already_logged:
+            await self._refresh_token()
+        else:
+            status_code, content, _ = await self._send(
+                AUTH_BY_EMAIL_ENDPOINT, self._auth_payload(), retry_throttled=True
+            )
+            await self.start_polling(self._handle_auth_response(status_code, content))
+        if self.background_refresh and self._refresh_task is None:
+            self._refresh_task = asyncio.ensure_future(self._background_refresh())
+
+    async def start_polling(self, polling_id):
+        for _ in range(MAX_POLLING_TRIES):
+            if self._handle_polling_response(
+                *await self._send(
+                    AUTH_POLLING_ENDPOINT,
+                    self._polling_payload(polling_id),
+                    idempotent=True,
+                )
+            ):
+                await self._flush_tokens()
+                return
+            await asyncio.sleep(POLLING_WAIT_TIME)
+
+        raise self._polling_error()
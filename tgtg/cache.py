@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_STOCK_TTL = 30
+DEFAULT_STATIC_TTL = 3600
+
+
+class ResponseCache:
+    """In-memory LRU cache of `get_item` and `get_favorites` responses.
+
+    Entries are keyed on the endpoint and the normalized request body, and
+    hold the raw response so each hit returns fresh objects. A response is
+    served for `stock_ttl` seconds to callers that need the current stock,
+    and for `static_ttl` seconds to callers that only read static fields
+    (store, address, description...). At most `maxsize` responses are kept,
+    the least recently used one is evicted first.
+    """
+
+    def __init__(
+        self,
+        maxsize=DEFAULT_CACHE_SIZE,
+        stock_ttl=DEFAULT_STOCK_TTL,
+        static_ttl=DEFAULT_STATIC_TTL,
+    ):
+        self.maxsize = maxsize
+        self.stock_ttl = stock_ttl
+        self.static_ttl = max(static_ttl, stock_ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def max_age(self, stock):
+        return self.stock_ttl if stock else self.static_ttl
+
+    def get(self, key, max_age):
+        """Return the content stored under `key` if younger than `max_age`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                if age >= self.static_ttl:
+                    del self._entries[key]
+                elif age < max_age:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+            self.misses += 1
+            return None
+
+    def set(self, key, content):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *paths):
+        """Drop every response of the given endpoint paths."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in paths]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
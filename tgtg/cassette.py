@@ -0,0 +1,231 @@
+"""Record the API traffic of a `TgtgClient` and replay it without network.
+
+    with record(client, "session.json"):
+        client.get_items()
+
+    with replay(client, "session.json"):
+        client.get_items()  # same answer, served from the file
+
+Tokens, cookies, emails, ids of the user and their profile are redacted
+before anything is written, in headers and JSON bodies alike. Pass other
+`fields` names to redact more, e.g. the name sent by `signup_by_email`.
+"""
+
+import contextlib
+import datetime
+import json
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from .exceptions import TgtgCassetteError
+from .filelock import atomic_write
+
+CASSETTE_VERSION = 1
+REDACTED = "REDACTED"
+REDACTED_HEADERS = frozenset(
+    ("authorization", "cookie", "set-cookie", "x-correlation-id")
+)
+REDACTED_FIELDS = frozenset(
+    (
+        "access_token",
+        "refresh_token",
+        "email",
+        "polling_id",
+        "request_polling_id",
+        "user_id",
+        # the profile sent back on login
+        "user",
+        "phone_number",
+    )
+)
+
+
+def redact(data, fields=REDACTED_FIELDS):
+    """Copy of a decoded JSON document with the values of `fields` redacted."""
+    if isinstance(data, dict):
+        return {
+            key: REDACTED if key in fields else redact(value, fields)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [redact(value, fields) for value in data]
+    return data
+
+
+def _redact_body(body, fields):
+    if not body:
+        return ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(redact(data, fields), separators=(",", ":"), sort_keys=True)
+
+
+def _redact_headers(headers):
+    return {
+        name: REDACTED if name.lower() in REDACTED_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def _request_key(request, fields):
+    return (
+        request.method,
+        urlsplit(request.url).path,
+        _redact_body(request.body, fields),
+    )
+
+
+class Cassette:
+    """Recorded interactions, loaded from and saved to a JSON file."""
+
+    def __init__(self, path, interactions=None, fields=REDACTED_FIELDS):
+        self.path = path
+        self.fields = fields
+        self.interactions = interactions if interactions is not None else []
+
+    @classmethod
+    def load(cls, path, fields=REDACTED_FIELDS):
+        with open(path) as cassette_file:
+            data = json.load(cassette_file)
+        if data.get("version") != CASSETTE_VERSION:
+            raise TgtgCassetteError(f"Unsupported cassette version in {path}")
+        return cls(path, data["interactions"], fields)
+
+    def save(self):
+        atomic_write(
+            self.path,
+            json.dumps(
+                {"version": CASSETTE_VERSION, "interactions": self.interactions},
+                indent=1,
+                ensure_ascii=False,
+            ),
+        )
+
+
+class RecordingAdapter(BaseAdapter):
+    """Send requests with `adapter` and record them, redacted, in `cassette`."""
+
+    def __init__(self, cassette, adapter):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        # the session only sets `response.elapsed` once the adapter returns
+        elapsed = time.perf_counter() - start
+        method, path, body = _request_key(request, self.cassette.fields)
+        interaction = {
+            "request": {
+                "method": method,
+                "path": path,
+                "headers": _redact_headers(request.headers),
+                "body": body,
+            },
+            "response": {
+                "status": response.status_code,
+                "headers": _redact_headers(response.headers),
+                "body": _redact_body(response.content, self.cassette.fields),
+                "elapsed": round(elapsed, 6),
+            },
+        }
+        with self._lock:
+            self.cassette.interactions.append(interaction)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answer requests with the responses recorded in `cassette`.
+
+    A request is matched on its method, path and redacted body. Identical
+    requests get the recorded answers in order, starting over once all were
+    served. With `realtime`, each answer waits as long as it originally took.
+    """
+
+    def __init__(self, cassette, realtime=False):
+        super().__init__()
+        self.cassette = cassette
+        self.realtime = realtime
+        self._answers = defaultdict(list)
+        for interaction in cassette.interactions:
+            request = interaction["request"]
+            key = request["method"], request["path"], request["body"]
+            self._answers[key].append(interaction["response"])
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        key = _request_key(request, self.cassette.fields)
+        answers = self._answers.get(key)
+        if not answers:
+            raise TgtgCassetteError(
+                f"No recorded answer for {key[0]} {key[1]} in {self.cassette.path}"
+            )
+        with self._lock:
+            recorded = answers[self._served[key] % len(answers)]
+            self._served[key] += 1
+        if self.realtime:
+            time.sleep(recorded["elapsed"])
+
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = recorded["body"].encode()
+        # there is no raw stream, readers must use the content above
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.elapsed = datetime.timedelta(seconds=recorded["elapsed"])
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def _mounted(client, adapter):
+    prefix = client.base_url
+    previous = client.session.adapters.get(prefix)
+    client.session.mount(prefix, adapter)
+    try:
+        yield adapter
+    finally:
+        if previous is None:
+            del client.session.adapters[prefix]
+        else:
+            client.session.mount(prefix, previous)
+
+
+@contextlib.contextmanager
+def record(client, path, fields=REDACTED_FIELDS):
+    """Record the requests `client` sends within the block to `path`."""
+    cassette = Cassette(path, fields=fields)
+    adapter = RecordingAdapter(cassette, client.session.get_adapter(client.base_url))
+    try:
+        with _mounted(client, adapter):
+            yield cassette
+    finally:
+        cassette.save()
+
+
+@contextlib.contextmanager
+def replay(client, path, realtime=False, fields=REDACTED_FIELDS):
+    """Serve the requests `client` sends within the block from `path`."""
+    with _mounted(client, ReplayAdapter(Cassette.load(path, fields), realtime)):
+        yield
@@ -0,0 +1,320 @@
+"""Local catalog of the stores and items seen in past responses.
+
+    catalog = StoreCatalog("stores.db")
+    client = TgtgClient(..., catalog=catalog)
+    client.get_items(favorites_only=False, latitude=48.126, longitude=-1.723, radius=10)
+
+    catalog.nearby(48.126, -1.723, radius=2)  # no request sent
+    catalog.search("bakery", latitude=48.126, longitude=-1.723, radius=5)
+
+Stores barely move, so their location, address and item descriptions are kept
+in SQLite and radius or text lookups are answered locally. The fields that
+change during the day (`LIVE_FIELDS`: stock, pickup interval...) are not
+kept: fetch them with `get_item` for the items found.
+
+Entries are indexed on a grid of `CELL_SIZE` degrees: a radius lookup only
+reads the cells overlapping the circle, then keeps the items within it.
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from .models import Model
+
+CELL_SIZE = 0.05  # degrees, about 5.5 km of latitude
+EARTH_RADIUS = 6371.0088  # km
+MAX_CELL_RANGES = 64  # per query, a radius of about 1500 km
+LIVE_FIELDS = frozenset(
+    (
+        "items_available",
+        "in_sales_window",
+        "new_item",
+        "pickup_interval",
+        "purchase_end",
+        "sold_out_at",
+        "distance",
+        "favorite",
+    )
+)
+
+_LATITUDE_CELLS = round(180 / CELL_SIZE)
+_LONGITUDE_CELLS = round(360 / CELL_SIZE)
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS items ("
+    "item_id TEXT PRIMARY KEY, store_id TEXT, display_name TEXT, cell INTEGER, "
+    "latitude REAL, longitude REAL, search_text TEXT NOT NULL, "
+    "data TEXT NOT NULL, updated_at REAL NOT NULL)",
+    # covering the lookups, the payloads are only read by `get`
+    "CREATE INDEX IF NOT EXISTS items_cell ON items "
+    "(cell, latitude, longitude, item_id, store_id, display_name, updated_at)",
+)
+
+
+def distance(latitude, longitude, other_latitude, other_longitude):
+    """Great-circle distance between two points, in km."""
+    latitude, longitude, other_latitude, other_longitude = map(
+        math.radians, (latitude, longitude, other_latitude, other_longitude)
+    )
+    a = (
+        math.sin((other_latitude - latitude) / 2) ** 2
+        + math.cos(latitude)
+        * math.cos(other_latitude)
+        * math.sin((other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _latitude_cell(latitude):
+    return min(int((latitude + 90) // CELL_SIZE), _LATITUDE_CELLS - 1)
+
+
+def _longitude_cell(longitude):
+    return int((longitude + 180) // CELL_SIZE) % _LONGITUDE_CELLS
+
+
+def cell(latitude, longitude):
+    """Grid cell of a point, rows of longitude cells from the south pole."""
+    return _latitude_cell(latitude) * _LONGITUDE_CELLS + _longitude_cell(longitude)
+
+
+def cell_ranges(latitude, longitude, radius):
+    """(first, last) cells covering the `radius` km around a point."""
+    delta = radius / _KM_PER_DEGREE
+    first_row = _latitude_cell(max(latitude - delta, -90))
+    last_row = _latitude_cell(min(latitude + delta, 90))
+    # degrees of longitude shrink towards the poles
+    widest = math.cos(math.radians(min(abs(latitude) + delta, 90)))
+    if widest * 180 <= delta:
+        columns = [(0, _LONGITUDE_CELLS - 1)]
+    else:
+        first = _longitude_cell(longitude - delta / widest)
+        last = _longitude_cell(longitude + delta / widest)
+        columns = (
+            [(first, last)]
+            if first <= last
+            else [(first, _LONGITUDE_CELLS - 1), (0, last)]
+        )
+    ranges = []
+    for row in range(first_row, last_row + 1):
+        for first, last in columns:
+            first, last = row * _LONGITUDE_CELLS + first, row * _LONGITUDE_CELLS + last
+            if ranges and ranges[-1][1] + 1 == first:
+                ranges[-1] = ranges[-1][0], last
+            else:
+                ranges.append((first, last))
+    if len(ranges) > MAX_CELL_RANGES:
+        # one range spanning them, the distance check drops the extra items
+        return [(min(first for first, _ in ranges), max(last for _, last in ranges))]
+    return ranges
+
+
+def _location(raw):
+    for key in ("store", "pickup_location"):
+        place = raw.get(key) or {}
+        location = (place.get("store_location") or place).get("location")
+        if location:
+            return location.get("latitude"), location.get("longitude")
+    return None, None
+
+
+def _search_text(raw):
+    item = raw.get("item") or {}
+    store = raw.get("store") or {}
+    address = ((store.get("store_location") or {}).get("address")) or {}
+    return " ".join(
+        filter(
+            None,
+            (
+                raw.get("display_name"),
+                store.get("store_name"),
+                store.get("branch"),
+                item.get("name"),
+                item.get("item_category"),
+                address.get("address_line"),
+                address.get("city"),
+            ),
+        )
+    ).casefold()
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class CatalogEntry:
+    """An item found in a `StoreCatalog`.
+
+    `distance` is in meters from the point of the lookup, like in the API
+    answers, None for text lookups without one. The payload, without its
+    `LIVE_FIELDS`, is only read and decoded when `raw` is first accessed.
+    """
+
+    __slots__ = (
+        "item_id",
+        "store_id",
+        "display_name",
+        "latitude",
+        "longitude",
+        "distance",
+        "_catalog",
+        "_raw",
+    )
+
+    def __init__(self, catalog, row, distance=None):
+        (
+            self.item_id,
+            self.store_id,
+            self.display_name,
+            self.latitude,
+            self.longitude,
+        ) = row
+        self.distance = distance
+        self._catalog = catalog
+        self._raw = None
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = self._catalog.get(self.item_id)
+        return self._raw
+
+    def __repr__(self):
+        return f"CatalogEntry({self.item_id!r}, {self.display_name!r})"
+
+
+class StoreCatalog:
+    """Items and their store kept in the SQLite database at `path`.
+
+    Lookups return `CatalogEntry`s, nearest first when made around a point.
+    `max_age` (seconds) skips the items not seen since.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = os.fspath(path)
+        # one connection shared by the threads of the client
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def add(self, items):
+        """Save the metadata of item payloads (or `Item`), replacing older ones."""
+        now = time.time()
+        rows = []
+        for item in items:
+            # decoded for the row only, an `Item` keeps its compact form
+            raw = item._payload() if isinstance(item, Model) else item
+            item_id = (raw.get("item") or {}).get("item_id")
+            if item_id is None:
+                continue
+            latitude, longitude = _location(raw)
+            located = latitude is not None and longitude is not None
+            rows.append(
+                (
+                    item_id,
+                    (raw.get("store") or {}).get("store_id"),
+                    raw.get("display_name"),
+                    cell(latitude, longitude) if located else None,
+                    latitude,
+                    longitude,
+                    _search_text(raw),
+                    json.dumps(
+                        {k: v for k, v in raw.items() if k not in LIVE_FIELDS},
+                        ensure_ascii=False,
+                    ),
+                    now,
+                )
+            )
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def get(self, item_id):
+        """The payload of an item without its `LIVE_FIELDS`, None if unknown."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data FROM items WHERE item_id = ?", (str(item_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def nearby(self, latitude, longitude, radius, max_age=None):
+        """The items within `radius` km of a point."""
+        return self._within(latitude, longitude, radius, "1", [], max_age)
+
+    def search(self, text, latitude=None, longitude=None, radius=None, max_age=None):
+        """The items whose store, name, category or address contain `text`.
+
+        Case insensitive. With a point and a `radius`, only the items within.
+        """
+        condition = "search_text LIKE ? ESCAPE '\\'"
+        parameters = [f"%{_escape_like(text.casefold())}%"]
+        if latitude is None or longitude is None or radius is None:
+            rows = self._select(condition, parameters, max_age)
+            return [CatalogEntry(self, row) for row in rows]
+        return self._within(latitude, longitude, radius, condition, parameters, max_age)
+
+    def prune(self, max_age):
+        """Forget the items not seen for `max_age` seconds, return how many."""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM items WHERE updated_at < ?", (time.time() - max_age,)
+            ).rowcount
+
+    def _select(self, condition, parameters, max_age):
+        if max_age is not None:
+            condition = f"({condition}) AND updated_at >= ?"
+            parameters = [*parameters, time.time() - max_age]
+        with self._lock:
+            return self._connection.execute(
+                "SELECT item_id, store_id, display_name, latitude, longitude "
+                f"FROM items WHERE {condition}",
+                parameters,
+            ).fetchall()
+
+    def _within(self, latitude, longitude, radius, condition, parameters, max_age):
+        ranges = cell_ranges(latitude, longitude, radius)
+        cells = " OR ".join(["cell BETWEEN ? AND ?"] * len(ranges))
+        # the cells overlap the circle, most of what is outside is cut here
+        delta = radius / _KM_PER_DEGREE
+        rows = self._select(
+            f"({cells}) AND latitude BETWEEN ? AND ? AND {condition}",
+            [bound for cell_range in ranges for bound in cell_range]
+            + [latitude - delta, latitude + delta]
+            + parameters,
+            max_age,
+        )
+        # haversine, compared before its square root and arc sine
+        origin = math.radians(latitude)
+        cos_origin = math.cos(origin)
+        limit = math.sin(min(radius / EARTH_RADIUS, math.pi) / 2) ** 2
+        found = []
+        for row in rows:
+            item_latitude = math.radians(row[3])
+            a = (
+                math.sin((item_latitude - origin) / 2) ** 2
+                + cos_origin
+                * math.cos(item_latitude)
+                * math.sin(math.radians(row[4] - longitude) / 2) ** 2
+            )
+            if a <= limit:
+                found.append((a, row))
+        found.sort(key=lambda entry: entry[0])
+        return [
+            CatalogEntry(self, row, 2000 * EARTH_RADIUS * math.asin(math.sqrt(a)))
+            for a, row in found
+        ]
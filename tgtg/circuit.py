@@ -0,0 +1,111 @@
+import threading
+import time
+from http import HTTPStatus
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# first matching path prefix gives the family of an endpoint
+ENDPOINT_FAMILIES = (
+    ("auth/", "auth"),
+    ("token/", "auth"),
+    ("item/", "item"),
+    ("user/favorite/", "item"),
+    ("order/", "order"),
+    ("discover/", "bucket"),
+)
+
+
+def endpoint_family(path):
+    for prefix, family in ENDPOINT_FAMILIES:
+        if path.startswith(prefix):
+            return family
+    return path
+
+
+def is_failure(status_code):
+    """Whether an answer tells that the API is down, None meaning no answer."""
+    return status_code is None or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at", "probe_at")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probe_at = None
+
+
+class CircuitBreaker:
+    """Fail fast on an endpoint family (auth, item, order, bucket) that is down.
+
+    After `failure_threshold` consecutive failures (5xx answers, connection
+    errors or timeouts) of a family, its circuit opens and its calls raise
+    `TgtgCircuitOpenError` without any request for `recovery_time` seconds.
+    Then a single probe request goes through: its success closes the circuit,
+    its failure opens it again. `on_transition(family, old_state, new_state)`
+    is called on every state change.
+    """
+
+    def __init__(self, failure_threshold=5, recovery_time=30, on_transition=None):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.on_transition = on_transition
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, family):
+        circuit = self._circuits.get(family)
+        return circuit.state if circuit else CLOSED
+
+    def states(self):
+        return {family: circuit.state for family, circuit in self._circuits.items()}
+
+    def allow(self, family):
+        """Whether a request of `family` may be sent now."""
+        circuit = self._circuits.get(family)
+        if circuit is None or circuit.state == CLOSED:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if circuit.state == OPEN:
+                if now - circuit.opened_at < self.recovery_time:
+                    return False
+                self._transition(family, circuit, HALF_OPEN)
+            elif circuit.probe_at is not None:
+                # a probe whose outcome was never recorded does not block forever
+                if now - circuit.probe_at < self.recovery_time:
+                    return False
+            circuit.probe_at = now
+            return True
+
+    def record(self, family, status_code=None):
+        """Record the answer to a request of `family`, None if there was none."""
+        failed = is_failure(status_code)
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            if not failed:
+                return
+            with self._lock:
+                circuit = self._circuits.setdefault(family, _Circuit())
+        with self._lock:
+            circuit.probe_at = None
+            if not failed:
+                circuit.failures = 0
+                if circuit.state != CLOSED:
+                    self._transition(family, circuit, CLOSED)
+                return
+            circuit.failures += 1
+            if circuit.state == HALF_OPEN or (
+                circuit.state == CLOSED and circuit.failures >= self.failure_threshold
+            ):
+                circuit.opened_at = time.monotonic()
+                self._transition(family, circuit, OPEN)
+
+    def _transition(self, family, circuit, state):
+        previous, circuit.state = circuit.state, state
+        if self.on_transition is not None:
+            self.on_transition(family, previous, state)
@@ -0,0 +1,98 @@
+"""Share one in-flight request between concurrent identical calls.
+
+While a read request is in flight, the same request made by other threads
+(`SingleFlight`) or tasks (`AsyncSingleFlight`) waits for its answer instead
+of being sent again. Nothing is kept once the request completed: unlike the
+`ResponseCache`, a later call always sends a new request.
+"""
+
+import threading
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Counters:
+    def __init__(self):
+        self.sent = 0
+        self.coalesced = 0
+        self._flights = {}
+
+    def stats(self):
+        """Requests `sent`, calls `coalesced` into one of them, and `in_flight`."""
+        return {
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
+
+
+class SingleFlight(_Counters):
+    """Coalesce identical calls made by several threads at once."""
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Return `function()`, or the result of the running call for `key`.
+
+        An error raised by the running call is raised to every caller sharing it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.sent += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+class AsyncSingleFlight(_Counters):
+    """Coalesce identical calls made by several tasks at once."""
+
+    async def do(self, key, function):
+        """Await `function()`, or the result of the running call for `key`.
+
+        The call runs in its own task: a caller cancelled while waiting does
+        not cancel it for the others.
+        """
+        import asyncio
+
+        task = self._flights.get(key)
+        if task is None:
+            task = self._flights[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda task: self._done(key, task))
+            self.sent += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        del self._flights[key]
+        # retrieved even when every caller was cancelled, for asyncio not to warn
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,54 @@
+"""JSON encoding of request bodies and decoding of responses.
+
+`default_codec()` uses orjson when it is installed (`pip install tgtg[fast]`),
+the standard library otherwise. Any object with `dumps(obj) -> bytes` and
+`loads(bytes_or_str)` can be given to a client as `codec`.
+"""
+
+import functools
+import json
+
+
+@functools.lru_cache(maxsize=None)
+def _orjson():
+    # imported with the first client, importing orjson costs more than tgtg
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover
+        return None
+    return orjson
+
+
+class JsonCodec:
+    """Standard library codec."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(self, content):
+        return json.loads(content)
+
+
+class OrjsonCodec:
+    """orjson codec, several times faster on large item lists."""
+
+    name = "orjson"
+
+    def __init__(self):
+        self._orjson = _orjson()
+        if self._orjson is None:
+            raise ImportError(
+                "OrjsonCodec requires orjson, install it with `pip install orjson`"
+            )
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj)
+
+    def loads(self, content):
+        return self._orjson.loads(content)
+
+
+def default_codec():
+    return OrjsonCodec() if _orjson() is not None else JsonCodec()
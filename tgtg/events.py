@@ -0,0 +1,108 @@
+"""What the clients report about each request to their listeners.
+
+A listener is any callable taking a `RequestEvent`, added with
+`client.add_listener(listener)`. Events are only built when at least one
+listener is attached.
+"""
+
+import functools
+import math
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+_ID_SEGMENT = re.compile(r"^(?!v\d+$).*\d")
+
+
+@functools.lru_cache(maxsize=1024)
+def endpoint_name(path):
+    """Path of an endpoint with its ids replaced, e.g. `order/v8/{id}/status`."""
+    return "/".join(
+        "{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/")
+    )
+
+
+class RequestEvent:
+    """One request to the API, retries included.
+
+    Durations are in seconds. `dns`, `connect` and `ttfb` (until the response
+    headers were received) are those of the last attempt, None when the
+    transport does not tell them. `status_code` is None and `error` set when
+    no answer was received.
+    """
+
+    __slots__ = (
+        "path",
+        "status_code",
+        "error",
+        "attempts",
+        "refreshed",
+        "request_size",
+        "response_size",
+        "started",
+        "total",
+        "dns",
+        "connect",
+        "ttfb",
+    )
+
+    def __init__(self, path, request_size, refreshed=False):
+        self.path = path
+        self.request_size = request_size
+        self.refreshed = refreshed
+        self.status_code = self.error = self.response_size = None
+        self.total = self.dns = self.connect = self.ttfb = None
+        self.attempts = 0
+        self.started = time.perf_counter()
+
+    @property
+    def endpoint(self):
+        return endpoint_name(self.path)
+
+    @property
+    def retries(self):
+        return max(self.attempts - 1, 0)
+
+    def __repr__(self):
+        return (
+            f"RequestEvent({self.endpoint!r}, status_code={self.status_code}, "
+            f"total={self.total!r}, retries={self.retries})"
+        )
+
+
+def _percentile(ordered, fraction):
+    # nearest rank
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class LatencyStats:
+    """Listener computing latency percentiles per endpoint.
+
+    Only the last `window` requests of each endpoint are kept.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._latencies = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self._latencies[event.endpoint].append(event.total)
+
+    def report(self):
+        """{endpoint: {"count", "p50", "p95", "p99"}} with latencies in seconds."""
+        with self._lock:
+            latencies = {
+                name: sorted(values) for name, values in self._latencies.items()
+            }
+        return {
+            name: {
+                "count": len(values),
+                "p50": _percentile(values, 0.50),
+                "p95": _percentile(values, 0.95),
+                "p99": _percentile(values, 0.99),
+            }
+            for name, values in latencies.items()
+        }
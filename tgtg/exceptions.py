@@ -8,3 +8,19 @@ class TgtgAPIError(Exception):
 
 class TgtgPollingError(Exception):
     pass
+
+
+class TgtgTimeoutError(TgtgAPIError):
+    pass
+
+
+class TgtgCircuitOpenError(TgtgAPIError):
+    pass
+
+
+class TgtgCassetteError(Exception):
+    pass
+
+
+class TgtgPlayStoreError(Exception):
+    pass
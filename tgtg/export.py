@@ -0,0 +1,192 @@
+"""Export the orders of an account to a JSONL or CSV file.
+
+    export_orders(client, "orders.jsonl")
+
+The history is read one page at a time and appended to the file, so memory
+stays bounded whatever its length. Progress is saved to a checkpoint file
+after every page: an interrupted export resumes where it stopped, and once an
+export completed, the next ones only fetch the orders that are newer. Active
+orders are written when first seen, then again with their final state once
+they show up in the history.
+"""
+
+import csv
+import json
+import os
+
+from . import _split_inactive_page
+from .filelock import atomic_write
+from .models import Order
+
+DEFAULT_EXPORT_PAGE_SIZE = 50
+CSV_FIELDS = (
+    "order_id",
+    "state",
+    "item_id",
+    "item_name",
+    "store_id",
+    "store_name",
+    "quantity",
+    "price",
+    "currency",
+    "pickup_start",
+    "pickup_end",
+    "time_of_purchase",
+)
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def csv_row(order):
+    """The `CSV_FIELDS` of an order payload."""
+    model = Order(order)
+    price = model.price
+    interval = model.pickup_interval
+    return {
+        "order_id": model.order_id,
+        "state": model.state,
+        "item_id": model.item_id,
+        "item_name": order.get("item_name"),
+        "store_id": order.get("store_id"),
+        "store_name": model.store_name,
+        "quantity": model.quantity,
+        "price": price.amount if price else None,
+        "currency": price.code if price else None,
+        "pickup_start": _isoformat(interval and interval.start),
+        "pickup_end": _isoformat(interval and interval.end),
+        "time_of_purchase": order.get("time_of_purchase"),
+    }
+
+
+class _JsonLinesWriter:
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, order):
+        self.output.write(json.dumps(order, ensure_ascii=False))
+        self.output.write("\n")
+
+
+class _CsvWriter:
+    def __init__(self, output):
+        self.writer = csv.DictWriter(output, CSV_FIELDS)
+        if output.tell() == 0:
+            self.writer.writeheader()
+
+    def write(self, order):
+        self.writer.writerow(csv_row(order))
+
+
+def _load_checkpoint(path):
+    try:
+        with open(path) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path, checkpoint):
+    atomic_write(path, json.dumps(checkpoint))
+
+
+def _order_id(order):
+    return Order(order).order_id
+
+
+def _new_orders(orders, last_written, stop_at):
+    """Drop the orders up to `last_written` and from `stop_at` on."""
+    ids = [_order_id(order) for order in orders]
+    start = ids.index(last_written) + 1 if last_written in ids else 0
+    end = ids.index(stop_at) if stop_at in ids else len(ids)
+    return orders[start:end], stop_at in ids
+
+
+class _Export:
+    def __init__(self, client, output, writer, checkpoint, checkpoint_path):
+        self.client = client
+        self.output = output
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.checkpoint_path = checkpoint_path
+        self.written = 0
+
+    def write(self, orders):
+        for order in orders:
+            self.writer.write(order)
+        self.written += len(orders)
+
+    def save_progress(self, run):
+        self.output.flush()
+        os.fsync(self.output.fileno())
+        run["offset"] = self.output.tell()
+        self.checkpoint["run"] = run
+        _save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+    def active(self):
+        known = set(self.checkpoint.get("active_order_ids", ()))
+        active = self.client.get_active().get("orders", [])
+        self.write([order for order in active if _order_id(order) not in known])
+        self.checkpoint["active_order_ids"] = [_order_id(order) for order in active]
+
+    def inactive(self, run, page_size):
+        stop_at = self.checkpoint.get("newest_order_id")
+        while True:
+            orders, is_last = _split_inactive_page(
+                self.client.get_inactive(page=run["page"], page_size=page_size)
+            )
+            if run["page"] == 0 and orders:
+                run["newest_order_id"] = _order_id(orders[0])
+            orders, reached = _new_orders(orders, run["last_order_id"], stop_at)
+            self.write(orders)
+            if orders:
+                run["last_order_id"] = _order_id(orders[-1])
+            run["page"] += 1
+            self.save_progress(run)
+            if is_last or reached:
+                return
+
+
+def export_orders(
+    client,
+    path,
+    *,
+    file_format=None,
+    page_size=DEFAULT_EXPORT_PAGE_SIZE,
+    checkpoint_path=None,
+):
+    """Append the orders of `client` (a `TgtgClient`) missing from `path`.
+
+    `file_format` is "jsonl" or "csv", by default guessed from the extension.
+    The checkpoint is kept in `checkpoint_path`, `<path>.checkpoint` by
+    default. Return the number of orders written.
+    """
+    path = os.fspath(path)
+    if file_format is None:
+        file_format = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if file_format not in ("jsonl", "csv"):
+        raise ValueError(f"Unsupported export format {file_format!r}")
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    checkpoint = _load_checkpoint(checkpoint_path)
+
+    with open(path, "a", newline="", encoding="utf-8") as output:
+        run = checkpoint.get("run")
+        if run is not None:
+            # forget what was written after the last checkpoint
+            output.truncate(run["offset"])
+            # truncate leaves the position, and so tell(), at the old end
+            output.seek(run["offset"])
+        writer = (_CsvWriter if file_format == "csv" else _JsonLinesWriter)(output)
+        export = _Export(client, output, writer, checkpoint, checkpoint_path)
+        if run is None:
+            export.active()
+            run = {"page": 0, "last_order_id": None, "newest_order_id": None}
+            export.save_progress(run)
+        export.inactive(run, page_size)
+
+    del checkpoint["run"]
+    if run["newest_order_id"] is not None:
+        checkpoint["newest_order_id"] = run["newest_order_id"]
+    _save_checkpoint(checkpoint_path, checkpoint)
+    return export.written
@@ -0,0 +1,200 @@
+"""Report what changed in the favorites since the last poll.
+
+    snapshot = FavoritesSnapshot.load("favorites.json")
+    for event in snapshot.poll(client):
+        print(event)
+    snapshot.save("favorites.json")
+
+Each favorite is reduced to a fingerprint: items available, price and pickup
+interval. Polls compare the items to their fingerprint field by field and
+only build something for the items added, removed or changed, so an unchanged
+list costs no event, no output and no allocation per item.
+"""
+
+import json
+import os
+
+from .filelock import atomic_write
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+FINGERPRINT_FIELDS = (
+    "items_available",
+    "price_minor_units",
+    "price_decimals",
+    "price_code",
+    "pickup_start",
+    "pickup_end",
+)
+SNAPSHOT_VERSION = 1
+
+_EMPTY = {}
+
+
+def _price(raw):
+    item = raw.get("item") or _EMPTY
+    return item.get("item_price") or item.get("price_including_taxes") or _EMPTY
+
+
+def item_id(raw):
+    return (raw.get("item") or _EMPTY).get("item_id")
+
+
+def fingerprint(raw):
+    """Tuple of the `FINGERPRINT_FIELDS` of an item payload."""
+    price = _price(raw)
+    interval = raw.get("pickup_interval") or _EMPTY
+    return (
+        raw.get("items_available", 0),
+        price.get("minor_units"),
+        price.get("decimals"),
+        price.get("code"),
+        interval.get("start"),
+        interval.get("end"),
+    )
+
+
+def _matches(fingerprint, raw):
+    # compared in place, building a fingerprint would allocate for every item
+    available, minor_units, decimals, code, start, end = fingerprint
+    if raw.get("items_available", 0) != available:
+        return False
+    interval = raw.get("pickup_interval") or _EMPTY
+    if interval.get("start") != start or interval.get("end") != end:
+        return False
+    price = _price(raw)
+    return (
+        price.get("minor_units") == minor_units
+        and price.get("decimals") == decimals
+        and price.get("code") == code
+    )
+
+
+class FavoriteEvent:
+    """An item `ADDED` to, `REMOVED` from or `CHANGED` in the favorites.
+
+    `item` is the current payload, None once removed. `previous` and
+    `fingerprint` are the fingerprints before and after, None when missing.
+    """
+
+    __slots__ = ("kind", "item_id", "name", "item", "previous", "fingerprint")
+
+    def __init__(self, kind, item_id, name, item=None, previous=None, fingerprint=None):
+        self.kind = kind
+        self.item_id = item_id
+        self.name = name
+        self.item = item
+        self.previous = previous
+        self.fingerprint = fingerprint
+
+    @property
+    def changes(self):
+        """{field: (before, after)} of the fingerprint fields that changed."""
+        if self.previous is None or self.fingerprint is None:
+            return {}
+        return {
+            field: (before, after)
+            for field, before, after in zip(
+                FINGERPRINT_FIELDS, self.previous, self.fingerprint
+            )
+            if before != after
+        }
+
+    def __str__(self):
+        if self.kind == CHANGED:
+            changes = ", ".join(
+                f"{field} {before} -> {after}"
+                for field, (before, after) in self.changes.items()
+            )
+            return f"~ {self.name} ({self.item_id}): {changes}"
+        sign = "+" if self.kind == ADDED else "-"
+        available = f": {self.fingerprint[0]} available" if self.fingerprint else ""
+        return f"{sign} {self.name} ({self.item_id}){available}"
+
+    def __repr__(self):
+        return f"FavoriteEvent({self.kind!r}, {self.item_id!r}, {self.name!r})"
+
+
+class FavoritesSnapshot:
+    """Fingerprints of the favorites seen by the last `update`."""
+
+    def __init__(self, fingerprints=None, names=None):
+        # item id -> [generation of the last poll listing it, fingerprint, name]
+        self._entries = {
+            item_id: [0, tuple(value), (names or _EMPTY).get(item_id)]
+            for item_id, value in (fingerprints or _EMPTY).items()
+        }
+        self._generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item_id):
+        return item_id in self._entries
+
+    def fingerprints(self):
+        return {item_id: entry[1] for item_id, entry in self._entries.items()}
+
+    def update(self, items):
+        """Take `items` as the complete favorites, return the `FavoriteEvent`s."""
+        self._generation += 1
+        generation = self._generation
+        events = []
+        for item in items:
+            raw = getattr(item, "raw", item)
+            key = item_id(raw)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [generation, fingerprint(raw), raw.get("display_name")]
+                self._entries[key] = entry
+                events.append(FavoriteEvent(ADDED, key, entry[2], raw, None, entry[1]))
+                continue
+            entry[0] = generation
+            if not _matches(entry[1], raw):
+                previous, entry[1] = entry[1], fingerprint(raw)
+                events.append(
+                    FavoriteEvent(CHANGED, key, entry[2], raw, previous, entry[1])
+                )
+        removed = [
+            key for key, entry in self._entries.items() if entry[0] != generation
+        ]
+        for key in removed:
+            _, previous, name = self._entries.pop(key)
+            events.append(FavoriteEvent(REMOVED, key, name, previous=previous))
+        return events
+
+    def poll(self, client, **kwargs):
+        """`update` with every page of `client.get_favorites(**kwargs)`.
+
+        All pages are fetched before the snapshot changes, so a failing page
+        leaves it as it was and the next poll reports the same events.
+        """
+        return self.update(list(client.iter_favorites(**kwargs)))
+
+    async def apoll(self, client, **kwargs):
+        """`poll` with an `AsyncTgtgClient`."""
+        return self.update([item async for item in client.iter_favorites(**kwargs)])
+
+    @classmethod
+    def load(cls, path):
+        """Snapshot saved to `path`, empty if there is none."""
+        try:
+            with open(path) as snapshot_file:
+                data = json.load(snapshot_file)
+        except FileNotFoundError:
+            return cls()
+        return cls(data["fingerprints"], data.get("names"))
+
+    def save(self, path):
+        atomic_write(
+            os.fspath(path),
+            json.dumps(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "fingerprints": self.fingerprints(),
+                    "names": {key: entry[2] for key, entry in self._entries.items()},
+                },
+                ensure_ascii=False,
+            ),
+        )
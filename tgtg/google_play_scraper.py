@@ -1,17 +1,236 @@
+import codecs
+import contextlib
+import functools
 import json
-import re
+import math
+import os
+import time
 
-import requests
+from .exceptions import TgtgPlayStoreError
+from .filelock import atomic_write, locked
 
-RE_SCRIPT = re.compile(
+PLAY_STORE_URL = (
+    "https://play.google.com/store/apps/details?id=com.app.tgtg&hl=en&gl=US"
+)
+# (connect, read) in seconds, the Play Store must never block client startup
+DEFAULT_TIMEOUT = (3.05, 5)
+# seconds for the whole lookup, checked between the reads of the page
+DEFAULT_DEADLINE = 10
+DEFAULT_CACHE_TTL = 3600 * 24  # 1 day
+# seconds before a failed lookup is tried again, clients use their default version
+DEFAULT_FAILURE_TTL = 600
+
+# kept for callers of RE_SCRIPT, the page is now scanned without it
+RE_SCRIPT_PATTERN = (
     r"AF_initDataCallback\({key:\s*'ds:5'.*?data:([\s\S]*?), sideChannel:.+<\/script"
 )
+DS5_START_PATTERN = r"AF_initDataCallback\(\{key:\s*'ds:5'[^{}]*?data:"
+DS5_END = ", sideChannel:"
+# where the version is in the ds:5 data
+VERSION_PATH = (1, 2, 140, 0, 0, 0)
+CHUNK_SIZE = 64 * 1024
+# longest start of the ds:5 callback kept from one chunk to the next
+_MAX_START_LENGTH = 256
+
 
+@functools.lru_cache(maxsize=None)
+def _patterns():
+    # compiled on first use, most runs read the version from the cache file
+    import re
 
-def get_last_apk_version():
-    response = requests.get(
-        "https://play.google.com/store/apps/details?id=com.app.tgtg&hl=en&gl=US"
+    return (
+        re.compile(RE_SCRIPT_PATTERN),
+        re.compile(DS5_START_PATTERN),
     )
-    match = RE_SCRIPT.search(response.text)
-    data = json.loads(match.group(1))
-    return data[1][2][140][0][0][0]
+
+
+def __getattr__(name):
+    if name == "RE_SCRIPT":
+        return _patterns()[0]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _ds5_data(chunks):
+    """JSON text of the ds:5 data, reading `chunks` only until it is complete."""
+    start_pattern = _patterns()[1]
+    buffer = ""
+    started = False
+    for chunk in chunks:
+        searched = max(len(buffer) - len(DS5_END), 0)
+        buffer += chunk
+        if not started:
+            match = start_pattern.search(buffer)
+            if match is None:
+                buffer = buffer[-_MAX_START_LENGTH:]
+                continue
+            start = match.end()
+            buffer = buffer[start:]
+            started = True
+            searched = 0
+        end = buffer.find(DS5_END, searched)
+        if end != -1:
+            return buffer[:end]
+    raise TgtgPlayStoreError(
+        "ds:5 data not found in the Play Store page"
+        if not started
+        else "Play Store page ended inside the ds:5 data"
+    )
+
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in " \t\n\r":
+        pos += 1
+    return pos
+
+
+def _array_element(decoder, text, pos, index):
+    """Position of element `index` of the JSON array starting at `pos`.
+
+    The elements before it are decoded and dropped, the ones after are not read.
+    """
+    if not text.startswith("[", pos):
+        raise TgtgPlayStoreError(f"Expected an array at offset {pos} of ds:5")
+    pos = _skip_whitespace(text, pos + 1)
+    for _ in range(index):
+        if text.startswith("]", pos):
+            break
+        _, pos = decoder.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if not text.startswith(",", pos):
+            break
+        pos = _skip_whitespace(text, pos + 1)
+    else:
+        if not text.startswith("]", pos):
+            return pos
+    raise TgtgPlayStoreError(f"Array at offset {pos} of ds:5 is too short")
+
+
+def find_apk_version(chunks):
+    """Read the app version from the Play Store page given in text `chunks`.
+
+    Only the page up to the end of the ds:5 data is read, and only the
+    version is decoded. Raise `TgtgPlayStoreError` when the layout changed.
+    """
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    data = _ds5_data(chunks)
+    decoder = json.JSONDecoder()
+    try:
+        pos = _skip_whitespace(data, 0)
+        for index in VERSION_PATH:
+            pos = _array_element(decoder, data, pos, index)
+        version, _ = decoder.raw_decode(data, pos)
+    except ValueError as exc:
+        raise TgtgPlayStoreError(f"Invalid ds:5 data: {exc}") from exc
+    if not isinstance(version, str):
+        raise TgtgPlayStoreError(f"Expected a version, found {version!r}")
+    return version
+
+
+def _iter_text(response, expires_at=None):
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in response.iter_content(CHUNK_SIZE):
+        if expires_at is not None and time.monotonic() >= expires_at:
+            raise TgtgPlayStoreError("Play Store lookup exceeded its deadline")
+        yield decoder.decode(chunk)
+
+
+def get_last_apk_version(timeout=DEFAULT_TIMEOUT, deadline=DEFAULT_DEADLINE):
+    """Read the app version from the Play Store.
+
+    `timeout` bounds connecting and each read. `deadline` bounds the whole
+    lookup: it is checked between reads, so it may be exceeded by up to one
+    read timeout.
+    """
+    import requests
+
+    expires_at = None if deadline is None else time.monotonic() + deadline
+    # the page is closed as soon as the version is read, usually far from its end
+    with requests.get(PLAY_STORE_URL, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        return find_apk_version(_iter_text(response, expires_at))
+
+
+def default_cache_path():
+    cache_dir = os.environ.get("TGTG_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "tgtg"
+    )
+    return os.path.join(cache_dir, "apk_version.json")
+
+
+def _read_cache(path):
+    try:
+        with open(path) as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    return cached if isinstance(cached, dict) else {}
+
+
+def _cached_version(cached, ttl, failure_ttl):
+    """Version of `cached` younger than `ttl`, None if there is none.
+
+    Raise `TgtgPlayStoreError` when the last lookup failed less than
+    `failure_ttl` seconds ago.
+    """
+    now = time.time()
+    try:
+        failed_for = now - cached.get("failed_at", -math.inf)
+        if failed_for < failure_ttl:
+            raise TgtgPlayStoreError(
+                f"Play Store lookup failed {failed_for:.0f} seconds ago, "
+                f"not tried again before {failure_ttl} seconds"
+            )
+        if now - cached["fetched_at"] < ttl:
+            return cached["version"]
+    except (KeyError, TypeError):
+        pass
+    return None
+
+
+def get_cached_apk_version(
+    cache_path=None,
+    ttl=DEFAULT_CACHE_TTL,
+    timeout=DEFAULT_TIMEOUT,
+    deadline=DEFAULT_DEADLINE,
+    failure_ttl=DEFAULT_FAILURE_TTL,
+):
+    """Return the last apk version, hitting the Play Store at most once per `ttl`.
+
+    The cache file is shared by every process of the host: readers never block,
+    and only one process refreshes an expired entry while the others wait for it.
+    A failed lookup is recorded too: for `failure_ttl` seconds, calls raise
+    `TgtgPlayStoreError` at once instead of trying again.
+    """
+    if not ttl:
+        return get_last_apk_version(timeout=timeout, deadline=deadline)
+
+    path = cache_path or default_cache_path()
+    cached = _read_cache(path)
+    version = _cached_version(cached, ttl, failure_ttl)
+    if version:
+        return version
+
+    with contextlib.ExitStack() as stack:
+        try:
+            stack.enter_context(locked(path))
+        except OSError:
+            pass  # cache directory is not writable, fetch without sharing
+        else:
+            # another process may have refreshed it while we were waiting
+            cached = _read_cache(path)
+            version = _cached_version(cached, ttl, failure_ttl)
+            if version:
+                return version
+        try:
+            version = get_last_apk_version(timeout=timeout, deadline=deadline)
+        except Exception:
+            if failure_ttl:
+                with contextlib.suppress(OSError):
+                    atomic_write(path, json.dumps({**cached, "failed_at": time.time()}))
+            raise
+        with contextlib.suppress(OSError):
+            atomic_write(
+                path, json.dumps({"version": version, "fetched_at": time.time()})
+            )
+    return version
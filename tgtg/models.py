@@ -0,0 +1,271 @@
+"""Typed views over the API payloads.
+
+A model built from the JSON text of its payload (`source`) keeps that text
+and the few top-level values it exposes, not the decoded dict. The nested
+models (store, price, pickup interval) are built the first time one of them
+is accessed, then cached; `raw` is decoded the first time it is accessed,
+then cached. Built from a dict, a model keeps a reference to it.
+"""
+
+import datetime
+import json
+
+_UNSET = object()
+
+
+def _parse_datetime(value):
+    if not value:
+        return None
+    # fromisoformat only understands "Z" since python 3.11
+    if value.endswith("Z"):
+        value = f"{value[:-1]}+00:00"
+    return datetime.datetime.fromisoformat(value)
+
+
+class Model:
+    __slots__ = ("_raw", "_source")
+
+    def __init__(self, raw, source=None):
+        self._raw = raw if source is None else None
+        self._source = source
+
+    @property
+    def raw(self):
+        raw = self._raw
+        if raw is None:
+            raw = self._payload()
+            self._raw, self._source = raw, None
+        return raw
+
+    def _payload(self):
+        """`raw`, decoded again each time while only the JSON text is kept."""
+        raw = self._raw
+        if raw is None:
+            # another thread may have cached `raw` since, _raw is set first
+            source = self._source
+            raw = self._raw if source is None else json.loads(source)
+        return raw
+
+    @classmethod
+    def wrap(cls, value):
+        """Wrap one payload or each payload of a list, None stays None."""
+        if value is None:
+            return None
+        if isinstance(value, list):
+            return [cls(raw) for raw in value]
+        return cls(value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.raw == other.raw
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._repr_value()!r})"
+
+    def _repr_value(self):
+        return self.raw
+
+    def _cached(self, slot, build):
+        value = getattr(self, slot)
+        if value is _UNSET:
+            value = build()
+            setattr(self, slot, value)
+        return value
+
+
+class Price(Model):
+    __slots__ = ()
+
+    @property
+    def code(self):
+        return self.raw.get("code")
+
+    @property
+    def minor_units(self):
+        return self.raw.get("minor_units", 0)
+
+    @property
+    def decimals(self):
+        return self.raw.get("decimals", 0)
+
+    @property
+    def amount(self):
+        from decimal import Decimal
+
+        return Decimal(self.minor_units).scaleb(-self.decimals)
+
+    def __str__(self):
+        return f"{self.amount} {self.code}"
+
+    def _repr_value(self):
+        return str(self)
+
+
+class PickupInterval(Model):
+    __slots__ = ("_start", "_end")
+
+    def __init__(self, raw, source=None):
+        super().__init__(raw, source)
+        self._start = self._end = _UNSET
+
+    @property
+    def start(self):
+        return self._cached("_start", lambda: _parse_datetime(self.raw.get("start")))
+
+    @property
+    def end(self):
+        return self._cached("_end", lambda: _parse_datetime(self.raw.get("end")))
+
+
+class Store(Model):
+    __slots__ = ()
+
+    @property
+    def store_id(self):
+        return self.raw.get("store_id")
+
+    @property
+    def store_name(self):
+        return self.raw.get("store_name")
+
+    @property
+    def branch(self):
+        return self.raw.get("branch")
+
+    @property
+    def address(self):
+        location = self.raw.get("store_location") or {}
+        return (location.get("address") or {}).get("address_line")
+
+    @property
+    def location(self):
+        """(latitude, longitude) of the store, None if unknown."""
+        location = (self.raw.get("store_location") or {}).get("location")
+        if not location:
+            return None
+        return location["latitude"], location["longitude"]
+
+    @property
+    def time_zone(self):
+        return self.raw.get("store_time_zone")
+
+    def _repr_value(self):
+        return self.store_name
+
+
+class Item(Model):
+    """One entry of `get_items`, `get_favorites` or `get_item`."""
+
+    __slots__ = (
+        "item_id",
+        "name",
+        "display_name",
+        "items_available",
+        "favorite",
+        "in_sales_window",
+        "distance",
+        "_store",
+        "_pickup_interval",
+        "_price",
+        "_value",
+    )
+
+    def __init__(self, raw, source=None):
+        super().__init__(raw, source)
+        item = raw.get("item") or {}
+        self.item_id = item.get("item_id")
+        self.name = item.get("name")
+        self.display_name = raw.get("display_name")
+        self.items_available = raw.get("items_available", 0)
+        self.favorite = raw.get("favorite", False)
+        self.in_sales_window = raw.get("in_sales_window", False)
+        self.distance = raw.get("distance")
+        self._store = self._pickup_interval = self._price = self._value = _UNSET
+
+    @property
+    def store(self):
+        if self._store is _UNSET:
+            self._build_nested()
+        return self._store
+
+    @property
+    def pickup_interval(self):
+        if self._pickup_interval is _UNSET:
+            self._build_nested()
+        return self._pickup_interval
+
+    @property
+    def price(self):
+        if self._price is _UNSET:
+            self._build_nested()
+        return self._price
+
+    @property
+    def value(self):
+        if self._value is _UNSET:
+            self._build_nested()
+        return self._value
+
+    def _build_nested(self):
+        # one decoding for all of them, only their part of the payload is kept
+        raw = self._payload()
+        item = raw.get("item") or {}
+        self._store = Store.wrap(raw.get("store"))
+        self._pickup_interval = PickupInterval.wrap(raw.get("pickup_interval"))
+        self._price = Price.wrap(
+            item.get("item_price") or item.get("price_including_taxes")
+        )
+        self._value = Price.wrap(
+            item.get("item_value") or item.get("value_including_taxes")
+        )
+
+    def _repr_value(self):
+        return self.display_name
+
+
+class Order(Model):
+    """One order of `get_active`, `get_inactive`, `create_order`..."""
+
+    __slots__ = (
+        "order_id",
+        "item_id",
+        "state",
+        "quantity",
+        "store_name",
+        "_pickup_interval",
+        "_price",
+    )
+
+    def __init__(self, raw, source=None):
+        super().__init__(raw, source)
+        self.order_id = raw.get("order_id") or raw.get("id")
+        self.item_id = raw.get("item_id")
+        self.state = raw.get("state")
+        if "quantity" in raw:
+            self.quantity = raw["quantity"]
+        else:
+            self.quantity = (raw.get("order_line") or {}).get("quantity")
+        self.store_name = raw.get("store_name")
+        self._pickup_interval = self._price = _UNSET
+
+    @property
+    def pickup_interval(self):
+        if self._pickup_interval is _UNSET:
+            self._build_nested()
+        return self._pickup_interval
+
+    @property
+    def price(self):
+        if self._price is _UNSET:
+            self._build_nested()
+        return self._price
+
+    def _build_nested(self):
+        raw = self._payload()
+        self._pickup_interval = PickupInterval.wrap(raw.get("pickup_interval"))
+        self._price = Price.wrap(
+            raw.get("price_including_taxes")
+            or (raw.get("order_line") or {}).get("total_price_including_taxes")
+        )
+
+    def _repr_value(self):
+        return self.order_id
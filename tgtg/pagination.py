@@ -0,0 +1,59 @@
+# asyncio and concurrent.futures are only imported by the code using them,
+# they weigh more than the rest of the package
+
+
+def iter_pages(fetch, first_page, split, prefetch=False):
+    """Yield the elements of `fetch(first_page)`, `fetch(first_page + 1)`...
+
+    `split(result)` returns the elements of a page and whether it is the last
+    one. With `prefetch`, page N + 1 is fetched in a background thread while
+    the elements of page N are consumed. At most two pages are held at once.
+    """
+    if not prefetch:
+        page = first_page
+        while True:
+            elements, is_last = split(fetch(page))
+            yield from elements
+            if is_last:
+                return
+            page += 1
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tgtg-prefetch")
+    try:
+        future = executor.submit(fetch, first_page)
+        page = first_page
+        while future is not None:
+            elements, is_last = split(future.result())
+            page += 1
+            future = None if is_last else executor.submit(fetch, page)
+            yield from elements
+    finally:
+        # when the consumer stops early, do not wait for an unused page
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_pages(fetch, first_page, split, prefetch=False):
+    """Same as `iter_pages` for a `fetch` returning awaitables."""
+    import asyncio
+
+    page = first_page
+    next_page = asyncio.ensure_future(fetch(page))
+    try:
+        while next_page is not None:
+            elements, is_last = split(await next_page)
+            page += 1
+            next_page = None
+            if not is_last:
+                next_page = (
+                    asyncio.ensure_future(fetch(page)) if prefetch else fetch(page)
+                )
+            for element in elements:
+                yield element
+    finally:
+        if next_page is not None:
+            if isinstance(next_page, asyncio.Future):
+                next_page.cancel()
+            else:
+                next_page.close()
@@ -0,0 +1,101 @@
+import datetime
+from http import HTTPStatus
+
+RETRY_STATUSES = frozenset(
+    (
+        HTTPStatus.TOO_MANY_REQUESTS,
+        HTTPStatus.INTERNAL_SERVER_ERROR,
+        HTTPStatus.BAD_GATEWAY,
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        HTTPStatus.GATEWAY_TIMEOUT,
+    )
+)
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a `Retry-After` header, in seconds or as a date."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    # email.utils is slow to import and the API rarely sends dates
+    from email.utils import parsedate_to_datetime
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((retry_at - now).total_seconds(), 0)
+
+
+class RetryPolicy:
+    """When and how long to wait before sending a failed request again.
+
+    Connection errors and the `statuses` answers are retried up to
+    `max_attempts` requests in total, as long as the whole call stays under
+    `max_elapsed` seconds. The wait follows `Retry-After` when the API sends
+    it, else an exponential backoff from `backoff` seconds capped at
+    `max_backoff`, both with random jitter. Calls that are not idempotent
+    (creating an order, refreshing the token...) are only retried with
+    `retry_non_idempotent=True`. The API refuses throttled requests without
+    running them, so calls sent with `retry_throttled` (login, token refresh)
+    are also retried after a 429.
+    """
+
+    def __init__(
+        self,
+        max_attempts=3,
+        max_elapsed=60,
+        backoff=0.5,
+        max_backoff=30,
+        statuses=RETRY_STATUSES,
+        retry_non_idempotent=False,
+    ):
+        self.max_attempts = max_attempts
+        self.max_elapsed = max_elapsed
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def delay(
+        self,
+        attempt,
+        elapsed,
+        idempotent,
+        status_code=None,
+        headers=None,
+        retry_throttled=False,
+    ):
+        """Seconds to wait before attempt `attempt + 1`, None to give up.
+
+        `status_code` is None when the attempt failed without an answer.
+        """
+        if status_code is not None and status_code not in self.statuses:
+            return None
+        if attempt >= self.max_attempts:
+            return None
+        if not (
+            idempotent
+            or self.retry_non_idempotent
+            or (retry_throttled and status_code == HTTPStatus.TOO_MANY_REQUESTS)
+        ):
+            return None
+
+        import random
+
+        retry_after = parse_retry_after(headers.get("Retry-After")) if headers else None
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.backoff)
+        else:
+            delay = random.uniform(
+                0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            )
+        if elapsed + delay > self.max_elapsed:
+            return None
+        return delay
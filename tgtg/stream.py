@@ -0,0 +1,148 @@
+"""Incremental decoding of the array of a JSON document, e.g. its "items".
+
+Feed `JsonStream` the body as it arrives and it returns the elements of the
+array completed so far. Only the element being decoded and the unread part of
+the last chunk are kept in memory, whatever the size of the array.
+"""
+
+import codecs
+import json
+import re
+
+STREAM_CHUNK_SIZE = 16 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DELIMITERS = frozenset(",]} \t\n\r")
+# returned by the parser when it needs more of the body
+_MORE = object()
+
+
+class JsonStream:
+    """Decode the array found at `path` (keys from the root) of a JSON document.
+
+    Everything else in the document is decoded into `rest`, complete once
+    `close()` returned. When a key of `path` is missing or not of the expected
+    type, no element is returned and its value is left in `rest`. With
+    `sources`, elements are returned as (element, its JSON text as bytes).
+    """
+
+    def __init__(self, path, sources=False):
+        self.path = tuple(path)
+        self.sources = sources
+        self.rest = {}
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._value_start = 0
+        self._eof = False
+        self._done = False
+        self._parser = self._document()
+
+    def feed(self, chunk):
+        """Add the next part of the body, return the elements it completed."""
+        pos, self._pos = self._pos, 0
+        self._buffer = self._buffer[pos:] + self._text.decode(chunk)
+        return self._run()
+
+    def close(self):
+        """End of the body, return the last elements.
+
+        Raises `ValueError` when the document is truncated or invalid.
+        """
+        self._buffer += self._text.decode(b"", final=True)
+        self._eof = True
+        elements = self._run()
+        if not self._done:
+            raise ValueError("Truncated JSON document")
+        return elements
+
+    def _run(self):
+        elements = []
+        for element in self._parser:
+            if element is _MORE:
+                break
+            elements.append(element)
+        return elements
+
+    # the parser is a generator yielding the elements, or _MORE to get fed
+
+    def _document(self):
+        yield from self._object(self.path, self.rest)
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+        if self._pos < len(self._buffer):
+            raise ValueError(f"Extra data after the JSON document: {self._excerpt()}")
+        self._done = True
+
+    def _peek(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof:
+                raise ValueError("Truncated JSON document")
+            yield _MORE
+
+    def _expect(self, chars):
+        char = yield from self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r}: {self._excerpt()}")
+        self._pos += 1
+        return char
+
+    def _value(self):
+        yield from self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            else:
+                if self._eof or self._complete(value, end):
+                    self._value_start, self._pos = self._pos, end
+                    return value
+            yield _MORE
+
+    def _complete(self, value, end):
+        # "12" may go on as "123" or "12.5" in the next chunk
+        if type(value) not in (int, float):
+            return True
+        return end < len(self._buffer) and self._buffer[end] in _DELIMITERS
+
+    def _object(self, path, rest):
+        yield from self._expect("{")
+        if (yield from self._peek()) == "}":
+            self._pos += 1
+            return
+        while True:
+            key = yield from self._value()
+            yield from self._expect(":")
+            opening = (yield from self._peek()) if path and key == path[0] else None
+            if opening == "{" and len(path) > 1:
+                rest[key] = {}
+                yield from self._object(path[1:], rest[key])
+            elif opening == "[" and len(path) == 1:
+                yield from self._array()
+            else:
+                rest[key] = yield from self._value()
+            if (yield from self._expect(",}")) == "}":
+                return
+
+    def _array(self):
+        yield from self._expect("[")
+        if (yield from self._peek()) == "]":
+            self._pos += 1
+            return
+        while True:
+            value = yield from self._value()
+            if self.sources:
+                start, end = self._value_start, self._pos
+                value = value, self._buffer[start:end].encode()
+            yield value
+            if (yield from self._expect(",]")) == "]":
+                return
+
+    def _excerpt(self):
+        pos = self._pos
+        return repr(self._buffer[pos:][:40])
@@ -0,0 +1,113 @@
+import abc
+import datetime
+import json
+import logging
+import os
+import sqlite3
+
+from .filelock import atomic_write, locked
+
+logger = logging.getLogger(__name__)
+
+
+class TokenStore(abc.ABC):
+    """Where a client keeps its credentials between runs.
+
+    `load` returns the last saved credentials or None, `save` persists a dict
+    with `access_token`, `refresh_token`, `cookie` and
+    `last_time_token_refreshed`. `lock` serializes refreshes between the
+    processes sharing the store, so a rotated refresh token is never lost.
+    """
+
+    @abc.abstractmethod
+    def load(self):
+        pass
+
+    @abc.abstractmethod
+    def save(self, credentials):
+        pass
+
+    @abc.abstractmethod
+    def lock(self):
+        pass
+
+
+def _serialize(credentials):
+    data = dict(credentials)
+    refreshed = data.get("last_time_token_refreshed")
+    if refreshed:
+        data["last_time_token_refreshed"] = refreshed.isoformat()
+    return json.dumps(data)
+
+
+def _deserialize(raw):
+    data = json.loads(raw)
+    refreshed = data.get("last_time_token_refreshed")
+    if refreshed:
+        data["last_time_token_refreshed"] = datetime.datetime.fromisoformat(refreshed)
+    return data
+
+
+class FileTokenStore(TokenStore):
+    """Credentials in a JSON file, replaced atomically on every save."""
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+
+    def load(self):
+        try:
+            with open(self.path) as token_file:
+                return _deserialize(token_file.read())
+        except FileNotFoundError:
+            return None
+        except (ValueError, AttributeError) as exc:
+            # logging in again is better than failing every run
+            logger.warning("Ignoring unreadable token file %s: %s", self.path, exc)
+            return None
+
+    def save(self, credentials):
+        atomic_write(self.path, _serialize(credentials))
+
+    def lock(self):
+        return locked(self.path)
+
+
+class SQLiteTokenStore(TokenStore):
+    """Credentials of one or several accounts, one row per `key`."""
+
+    def __init__(self, path, key="default"):
+        self.path = os.fspath(path)
+        self.key = key
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS tokens "
+                "(key TEXT PRIMARY KEY, credentials TEXT NOT NULL)"
+            )
+        connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def load(self):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT credentials FROM tokens WHERE key = ?", (self.key,)
+            ).fetchone()
+        finally:
+            connection.close()
+        return _deserialize(row[0]) if row else None
+
+    def save(self, credentials):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO tokens (key, credentials) VALUES (?, ?)",
+                    (self.key, _serialize(credentials)),
+                )
+        finally:
+            connection.close()
+
+    def lock(self):
+        return locked(self.path)
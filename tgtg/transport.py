@@ -0,0 +1,195 @@
+"""Connection pooling of `TgtgClient`.
+
+    transport = PooledTransport(max_per_host=8, keep_alive=30, idle_timeout=50)
+    client = TgtgClient(..., transport=transport, proxies={"https": "http://proxy:3128"})
+    client.transport.stats()  # {"requests": 120, "opened": 8, "reused": 112, ...}
+
+The transport is the `requests` adapter every request of the client goes
+through: pass any other adapter, e.g. one answering canned responses in tests.
+"""
+
+import os
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import get_environ_proxies
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_PER_HOST = 10
+STATS_FIELDS = ("requests", "opened", "reused", "discarded", "expired")
+
+
+def keep_alive_options(interval):
+    """Socket options sending TCP keep-alive probes after `interval` idle seconds."""
+    options = [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # TCP_KEEPIDLE on Linux, TCP_KEEPALIVE on macOS
+    idle = getattr(socket, "TCP_KEEPIDLE", getattr(socket, "TCP_KEEPALIVE", None))
+    if idle is not None:
+        options.append((socket.IPPROTO_TCP, idle, interval))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, interval))
+    return options
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(STATS_FIELDS, 0)
+
+    def add(self, name):
+        with self._lock:
+            self._values[name] += 1
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+
+def _is_closed(conn):
+    # urllib3 < 2 connections have no is_closed
+    is_closed = getattr(conn, "is_closed", None)
+    return conn.sock is None if is_closed is None else is_closed
+
+
+class _CountingPool:
+    """Connection pool counting how its connections are used.
+
+    Connections idle for more than `idle_timeout` seconds are closed rather
+    than reused: the server or a middlebox may have dropped them silently.
+    """
+
+    idle_timeout = None
+    counters = None
+
+    def _get_conn(self, timeout=None):
+        conn = super()._get_conn(timeout)
+        self.counters.add("requests")
+        idle_since = getattr(conn, "tgtg_idle_since", None)
+        if (
+            self.idle_timeout is not None
+            and idle_since is not None
+            and not _is_closed(conn)
+            and time.monotonic() - idle_since > self.idle_timeout
+        ):
+            conn.close()
+            self.counters.add("expired")
+        # new and closed connections connect when sending
+        self.counters.add("opened" if _is_closed(conn) else "reused")
+        return conn
+
+    def _put_conn(self, conn):
+        was_open = conn is not None and not _is_closed(conn)
+        if was_open:
+            conn.tgtg_idle_since = time.monotonic()
+        super()._put_conn(conn)
+        # closed by the pool because it is full
+        if was_open and _is_closed(conn):
+            self.counters.add("discarded")
+
+
+def _pool_classes(idle_timeout, counters):
+    def pool_class(base):
+        return type(
+            base.__name__,
+            (_CountingPool, base),
+            {"idle_timeout": idle_timeout, "counters": counters},
+        )
+
+    return {
+        "http": pool_class(HTTPConnectionPool),
+        "https": pool_class(HTTPSConnectionPool),
+    }
+
+
+class PooledTransport(HTTPAdapter):
+    """`HTTPAdapter` with tunable pooling and connection reuse statistics.
+
+    Connections to up to `pool_size` hosts are kept, with up to
+    `max_per_host` idle connections each. More concurrent requests to a host
+    open more connections, closed once done, unless `block` is set: they then
+    wait for a pooled connection instead. With `keep_alive`, TCP keep-alive
+    probes are sent after as many idle seconds, and connections idle for more
+    than `idle_timeout` seconds are reconnected before being reused.
+    """
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["keep_alive", "idle_timeout"]
+
+    def __init__(
+        self,
+        pool_size=DEFAULT_POOL_SIZE,
+        max_per_host=DEFAULT_MAX_PER_HOST,
+        *,
+        block=False,
+        keep_alive=None,
+        idle_timeout=None,
+        max_retries=0,
+    ):
+        self.keep_alive = keep_alive
+        self.idle_timeout = idle_timeout
+        self._counters = _Counters()
+        self._pool_classes = _pool_classes(idle_timeout, self._counters)
+        super().__init__(
+            pool_connections=pool_size,
+            pool_maxsize=max_per_host,
+            max_retries=max_retries,
+            pool_block=block,
+        )
+
+    def __setstate__(self, state):
+        self._counters = _Counters()
+        self._pool_classes = _pool_classes(state["idle_timeout"], self._counters)
+        super().__setstate__(state)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if self.keep_alive is not None:
+            pool_kwargs.setdefault(
+                "socket_options",
+                HTTPConnection.default_socket_options
+                + keep_alive_options(self.keep_alive),
+            )
+        super().init_poolmanager(connections, maxsize, block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool_classes
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        fresh = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if fresh:
+            manager.pool_classes_by_scheme = self._pool_classes
+        return manager
+
+    def stats(self):
+        """How the connections were used since the transport was built.
+
+        `requests` sent, on a connection `opened` for them or `reused`.
+        `discarded` connections were closed after a request because
+        `max_per_host` were already idle, a sign the pool is too small.
+        `expired` ones were idle for longer than `idle_timeout`.
+        """
+        return self._counters.values()
+
+
+def build_session(transport, proxies=None, url=None):
+    """`requests.Session` sending through `transport`, with `proxies` set once.
+
+    `requests` reads the proxy and CA bundle settings of the environment on
+    every request, which costs more than the rest of the client-side work of a
+    call. They are read here instead, once, for requests to `url`.
+    """
+    session = requests.Session()
+    if url is not None:
+        session.proxies.update(get_environ_proxies(url))
+        ca_bundle = os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get(
+            "CURL_CA_BUNDLE"
+        )
+        if ca_bundle:
+            session.verify = ca_bundle
+        session.trust_env = False
+    session.proxies.update(proxies or {})
+    session.mount("https://", transport)
+    session.mount("http://", transport)
+    return session